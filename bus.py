@@ -0,0 +1,135 @@
+# bus.py
+# Cache invalidation that works across worker processes
+# Modules subscribe a callback per topic ("tenant", "admins", "reset", ...)
+# and call publish() after changing data. The callback runs in-process
+# right away; with several workers the event is also appended to the
+# cache_events table, which every worker polls (BUS_POLL_INTERVAL) and
+# replays, so each process drops its own stale copy. Each worker prunes
+# events older than KEEP_POLLS poll intervals as it polls.
+
+import logging
+import os
+import time
+
+from database import connect
+
+logger = logging.getLogger(__name__)
+
+RETENTION = 3600  # seconds of events kept at startup
+KEEP_POLLS = 30   # while running, events outlive this many poll intervals
+
+# topic -> [callback(key)]
+_subscribers = {}
+
+_shared = False
+_last_id = 0
+_origin = os.getpid()
+_keep = RETENTION
+_pruned_at = 0.0
+
+
+def subscribe(topic, callback):
+    """callback(key) runs whenever `topic` is published (key may be None)."""
+    _subscribers.setdefault(topic, []).append(callback)
+
+
+def _dispatch(topic, key):
+    for callback in _subscribers.get(topic, ()):
+        try:
+            callback(key)
+        except Exception:
+            logger.exception("Cache invalidation for %s failed", topic)
+
+
+def publish(topic, key=None):
+    """Invalidate locally and, in multi-process mode, in every other worker."""
+    _dispatch(topic, key)
+
+    if not _shared:
+        return
+
+    conn = connect()
+    conn.execute(
+        "INSERT INTO cache_events (topic, key, origin, created_at) VALUES (?, ?, ?, ?)",
+        (topic, key, _origin, time.time())
+    )
+    conn.commit()
+    conn.close()
+
+
+def clear_events():
+    """/reset_all: drop queued events; the "reset" published next supersedes them."""
+    if not _shared:
+        return
+
+    conn = connect()
+    conn.execute("DELETE FROM cache_events")
+    conn.commit()
+    conn.close()
+
+
+# =====================================================
+# 📌 MULTI-PROCESS MODE
+# =====================================================
+
+def init_bus():
+    """Create the event table (once, before workers start)."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cache_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT,
+            key INTEGER,
+            origin INTEGER,
+            created_at REAL
+        )
+    """)
+    cur.execute("DELETE FROM cache_events WHERE created_at < ?", (time.time() - RETENTION,))
+    conn.commit()
+    conn.close()
+
+
+def enable_shared(job_queue, interval):
+    """Called by each worker: start publishing to and polling the table."""
+    global _shared, _last_id, _origin, _keep, _pruned_at
+
+    _shared = True
+    _origin = os.getpid()
+    _keep = KEEP_POLLS * interval
+    _pruned_at = time.time()
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS last FROM cache_events")
+    _last_id = cur.fetchone()["last"]
+    conn.close()
+
+    job_queue.run_repeating(poll_events, interval, name="cache_bus")
+
+
+async def poll_events(context):
+    """Replay events published by other workers since the last poll."""
+    global _last_id, _pruned_at
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, topic, key, origin FROM cache_events WHERE id > ? ORDER BY id",
+        (_last_id,)
+    )
+    rows = cur.fetchall()
+
+    # Every worker has long replayed these; without pruning the table
+    # grows with every deal change for as long as the cluster runs
+    now = time.time()
+    if now - _pruned_at >= _keep:
+        _pruned_at = now
+        cur.execute("DELETE FROM cache_events WHERE created_at < ?", (now - _keep,))
+        conn.commit()
+    conn.close()
+
+    for r in rows:
+        _last_id = r["id"]
+        if r["origin"] != _origin:
+            _dispatch(r["topic"], r["key"])
@@ -0,0 +1,114 @@
+# cache.py
+# Small in-process caches shared by handlers (view cache, settings, ...)
+
+import time
+from collections import OrderedDict
+
+
+# =====================================================
+# 📌 TTL CACHE
+# =====================================================
+
+class TTLCache:
+    """Dict-like cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires, value = entry
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value):
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._evict()
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_set(self, key, factory):
+        """Return the cached value, computing it with factory() on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def _evict(self):
+        now = time.monotonic()
+        self._data = {k: e for k, e in self._data.items() if e[0] >= now}
+
+        # Still full: drop the oldest half (dicts keep insertion order)
+        if len(self._data) >= self.maxsize:
+            for k in list(self._data)[: self.maxsize // 2]:
+                del self._data[k]
+
+
+# =====================================================
+# 📌 LRU CACHE
+# =====================================================
+
+class LRUCache:
+    """
+    TTLCache for hot-key traffic: a full cache drops the least recently
+    read entry instead of scanning for expired ones.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+
+_MISSING = object()
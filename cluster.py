@@ -0,0 +1,205 @@
+# cluster.py
+# Multi-process deployment (WORKERS > 1 in config.py)
+# One ingress process receives Telegram webhooks and hands every update to
+# a worker chosen by chat_id, so all updates of one chat are handled, in
+# order, by the same process and per-chat in-memory state (flood history,
+# welcome batches, ban gate, rate-limit buckets) stays consistent.
+# Shared caches are kept in sync through bus.py.
+#
+# The ingress speaks plain HTTP; put it behind a TLS reverse proxy that
+# forwards WEBHOOK_URL to WEBHOOK_LISTEN:WEBHOOK_PORT.
+
+import asyncio
+import hmac
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+INBOX_SIZE = 10_000         # updates buffered per worker
+SUPERVISE_INTERVAL = 5      # seconds between worker liveness checks
+
+# Set inside each worker process
+WORKER_INDEX = 0
+WORKER_COUNT = 1
+
+
+# =====================================================
+# 📌 PARTITIONING
+# =====================================================
+
+_CHAT_KEYS = (
+    "message", "edited_message", "channel_post", "edited_channel_post",
+    "my_chat_member", "chat_member", "chat_join_request",
+)
+_USER_KEYS = (
+    "inline_query", "chosen_inline_result", "shipping_query",
+    "pre_checkout_query", "poll_answer",
+)
+
+
+def update_chat_id(data):
+    """Chat an update belongs to (the user for inline/payment updates)."""
+    for key in _CHAT_KEYS:
+        obj = data.get(key)
+        if obj and "chat" in obj:
+            return obj["chat"]["id"]
+
+    query = data.get("callback_query")
+    if query:
+        if query.get("message"):
+            return query["message"]["chat"]["id"]
+        return query["from"]["id"]
+
+    for key in _USER_KEYS:
+        obj = data.get(key)
+        if obj:
+            return (obj.get("from") or obj.get("user") or {}).get("id", 0)
+
+    return data.get("update_id", 0)
+
+
+def owns(chat_id):
+    """True if this process handles `chat_id` (always, with one worker)."""
+    return WORKER_COUNT == 1 or (chat_id or 0) % WORKER_COUNT == WORKER_INDEX
+
+
+# =====================================================
+# 📌 WORKER
+# =====================================================
+
+def _worker_main(index, count, inbox):
+    global WORKER_INDEX, WORKER_COUNT
+    WORKER_INDEX, WORKER_COUNT = index, count
+
+    asyncio.run(_serve(inbox))
+
+
+async def _serve(inbox):
+    from telegram import Update
+    from bus import enable_shared
+    from config import BUS_POLL_INTERVAL, METRICS_LISTEN, METRICS_PORT
+    from main import build_application, load_state
+    from perf import serve_metrics
+
+    load_state()
+    app = build_application(updater=False, share=WORKER_COUNT)
+    enable_shared(app.job_queue, BUS_POLL_INTERVAL)
+    if METRICS_PORT:
+        serve_metrics(METRICS_LISTEN, METRICS_PORT + WORKER_INDEX)
+
+    loop = asyncio.get_running_loop()
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    logger.info("👷 Worker %s/%s ready", WORKER_INDEX + 1, WORKER_COUNT)
+
+    try:
+        while True:
+            data = await loop.run_in_executor(None, inbox.get)
+            if data is None:
+                break
+            await app.update_queue.put(Update.de_json(data, app.bot))
+    finally:
+        await app.stop()
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+# =====================================================
+# 📌 INGRESS
+# =====================================================
+
+def _ingress_handler(path, secret, inboxes):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != path:
+                return self._reply(404)
+
+            token = self.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if secret and not hmac.compare_digest(token, secret):
+                return self._reply(403)
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length))
+            except ValueError:
+                return self._reply(400)
+
+            inboxes[update_chat_id(data) % len(inboxes)].put(data)
+            self._reply(200)
+
+        def _reply(self, code):
+            self.send_response(code)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt, *args)
+
+    return WebhookHandler
+
+
+async def _set_webhook(token, url, secret):
+    from telegram import Bot, Update
+
+    async with Bot(token) as bot:
+        await bot.set_webhook(
+            url,
+            secret_token=secret or None,
+            allowed_updates=Update.ALL_TYPES,
+        )
+
+
+def run_cluster(token, workers, webhook_url, listen, port, secret):
+    """Start `workers` bot processes and serve the webhook until Ctrl+C."""
+    if not webhook_url:
+        raise SystemExit("WORKERS > 1 needs WEBHOOK_URL (long polling is single-process)")
+
+    ctx = multiprocessing.get_context("spawn")
+    inboxes = [ctx.Queue(INBOX_SIZE) for _ in range(workers)]
+
+    def spawn(i):
+        p = ctx.Process(target=_worker_main, args=(i, workers, inboxes[i]), name=f"worker-{i}")
+        p.start()
+        return p
+
+    procs = [spawn(i) for i in range(workers)]
+    stopping = threading.Event()
+
+    def supervise():
+        # A crashed worker is restarted on the same inbox; its queued updates survive
+        while not stopping.wait(SUPERVISE_INTERVAL):
+            for i, p in enumerate(procs):
+                if not p.is_alive():
+                    logger.error("💥 Worker %s exited (%s), restarting", i, p.exitcode)
+                    procs[i] = spawn(i)
+
+    threading.Thread(target=supervise, name="supervisor", daemon=True).start()
+
+    asyncio.run(_set_webhook(token, webhook_url, secret))
+
+    path = urlparse(webhook_url).path or "/"
+    server = ThreadingHTTPServer((listen, port), _ingress_handler(path, secret, inboxes))
+    logger.info("🌐 Ingress on %s:%s%s → %s workers", listen, port, path, workers)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        server.server_close()
+        for inbox in inboxes:
+            inbox.put(None)
+        deadline = time.monotonic() + 30
+        for p in procs:
+            p.join(max(0, deadline - time.monotonic()))
@@ -0,0 +1,114 @@
+# config.py
+# Runtime configuration for Era Escrow Bot
+# Values come from the environment, falling back to a KEY=VALUE file
+# (config.env, or the path in ESCROW_CONFIG). Nothing secret lives in source.
+#
+#   BOT_TOKEN=123:abc
+#   OWNER_ID=6847499628
+#   WORKERS=4
+#   WEBHOOK_URL=https://bot.example.com/telegram
+
+import os
+
+CONFIG_FILE = os.environ.get("ESCROW_CONFIG", "config.env")
+
+
+def _load_file(path):
+    values = {}
+    if not os.path.exists(path):
+        return values
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            values[key.strip()] = value.strip().strip("'\"")
+    return values
+
+
+_FILE = _load_file(CONFIG_FILE)
+
+
+def get(key, default=None):
+    """Environment first, then the config file, then `default`."""
+    value = os.environ.get(key)
+    if value is None:
+        value = _FILE.get(key, default)
+    return value
+
+
+# =====================================================
+# 🔐 BOT
+# =====================================================
+
+BOT_TOKEN = get("BOT_TOKEN", "")
+OWNER_ID = int(get("OWNER_ID", "0"))
+
+# Bot API server; point at a local telegram-bot-api server (or a stub, see
+# loadtest.py) instead of Telegram's cloud endpoint
+BOT_API_URL = get("BOT_API_URL", "https://api.telegram.org/bot")
+BOT_API_FILE_URL = get("BOT_API_FILE_URL", "https://api.telegram.org/file/bot")
+
+BOT_NAME = get("BOT_NAME", "Era Escrow Bot")
+POWERED_BY = get("POWERED_BY", "@LuffyBots")
+
+
+# =====================================================
+# 🗄 STORAGE
+# =====================================================
+
+DATABASE_URL = get("DATABASE_URL", "")
+DATABASE_POOL_SIZE = int(get("DATABASE_POOL_SIZE", "20"))
+SHARD_COUNT = max(1, int(get("ESCROW_SHARDS", "1")))
+
+
+# =====================================================
+# 🌐 DEPLOYMENT
+# =====================================================
+
+# WORKERS > 1 runs one webhook ingress plus N worker processes (cluster.py)
+WORKERS = max(1, int(get("WORKERS", "1")))
+
+# Empty -> long polling (single process only)
+WEBHOOK_URL = get("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(get("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET = get("WEBHOOK_SECRET", "")
+
+# Seconds between cross-process cache invalidation polls (see bus.py)
+BUS_POLL_INTERVAL = float(get("BUS_POLL_INTERVAL", "1.0"))
+
+# Write-behind buffers (see writebehind.py): flushed every FLUSH_MS or once a
+# buffer holds MAX_ROWS rows; rows a failing database can't take are kept
+# up to MAX_PENDING per buffer
+WRITE_BEHIND_FLUSH_MS = int(get("WRITE_BEHIND_FLUSH_MS", "2000"))
+WRITE_BEHIND_MAX_ROWS = int(get("WRITE_BEHIND_MAX_ROWS", "500"))
+WRITE_BEHIND_MAX_PENDING = int(get("WRITE_BEHIND_MAX_PENDING", "100000"))
+
+# Daily digest (IST, off-peak): recompute the last DIGEST_DAYS days and post
+# yesterday's digest to the log channels; the weekly one on DIGEST_WEEKDAY
+# (0 = Monday)
+DIGEST_TIME = get("DIGEST_TIME", "03:30")
+DIGEST_WEEKDAY = int(get("DIGEST_WEEKDAY", "0"))
+DIGEST_DAYS = max(7, int(get("DIGEST_DAYS", "7")))
+
+# Deepest /search page (results are ranked, so each page re-reads the top)
+SEARCH_MAX_PAGES = int(get("SEARCH_MAX_PAGES", "20"))
+
+
+# =====================================================
+# 📈 MONITORING
+# =====================================================
+
+# Queries slower than this are kept as samples for /perf and written,
+# with their parameters and query plan, to SLOW_QUERY_LOG (see slowlog.py)
+SLOW_QUERY_MS = float(get("SLOW_QUERY_MS", "100"))
+SLOW_QUERY_LOG = get("SLOW_QUERY_LOG", "data/slow_queries.log")
+SLOW_QUERY_LOG_BYTES = int(get("SLOW_QUERY_LOG_BYTES", str(5 * 1024 * 1024)))
+
+# Prometheus /metrics endpoint; 0 disables it. Worker i of a cluster
+# listens on METRICS_PORT + i.
+METRICS_LISTEN = get("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(get("METRICS_PORT", "0"))
@@ -2,32 +2,45 @@
 # Database layer for Era Escrow Bot
 # Auto-creates all tables, handles read/write operations
 
-import sqlite3
-import os
+from backends import create_backend
+from config import DATABASE_URL, DATABASE_POOL_SIZE
+from perf import track
+from participants import create_participants_table
+from parsing import normalize_username
+from search import create_deal_search, create_note_search
 
 DB_PATH = "data/escrow.db"
 
+# Empty DATABASE_URL -> SQLite at DB_PATH; postgresql://... -> PostgreSQL
+BACKEND = create_backend(DATABASE_URL, DB_PATH, DATABASE_POOL_SIZE)
+
+# Tenant id used for bot-wide settings (private chats, defaults)
+GLOBAL_TENANT = 0
+
 
 # =====================================================
 # 📌 CONNECT DATABASE
 # =====================================================
 
 def connect():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return track(BACKEND.connect())
+
+
+def _columns(cur, table):
+    return BACKEND.columns(cur, table)
+
+
+def _ensure_column(cur, table, column, decl):
+    """Add a column to an existing table created by an older version."""
+    if column not in _columns(cur, table):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
 
 
 # =====================================================
-# 📌 INITIALIZE DATABASE (Auto-create tables)
+# 📌 DEALS TABLE (main file and every shard)
 # =====================================================
 
-def init_database():
-    conn = connect()
-    cur = conn.cursor()
-
-    # Deals table
+def create_deals_table(cur):
     cur.execute("""
         CREATE TABLE IF NOT EXISTS deals (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,31 +54,78 @@ def init_database():
             admin_earning REAL DEFAULT 0,
             status TEXT,
             created_at TEXT,
-            updated_at TEXT
+            updated_at TEXT,
+            chat_id INTEGER
         )
     """)
+    _ensure_column(cur, "deals", "chat_id", "INTEGER")
+
+    # Keyset pagination (see pagination.py)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_deals_status ON deals (status, id)")
+
+    # Tenancy: every per-group query leads with chat_id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_deals_chat_status ON deals (chat_id, status, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_deals_chat_created ON deals (chat_id, created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_deals_created ON deals (created_at)")
+
+    # Per-user lookups go through deal_participants (see participants.py)
+    create_participants_table(cur)
+
+    # /search (see search.py)
+    create_deal_search(cur, BACKEND.name)
+
+
+# =====================================================
+# 📌 INITIALIZE DATABASE (Auto-create tables)
+# =====================================================
+
+def init_database():
+    conn = connect()
+    cur = conn.cursor()
+
+    # Deals table (also created in every shard, see shards.py)
+    create_deals_table(cur)
 
     # Admins table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS admins (
-            user_id INTEGER PRIMARY KEY
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            name TEXT
         )
     """)
+    _ensure_column(cur, "admins", "username", "TEXT")
+    _ensure_column(cur, "admins", "name", "TEXT")
 
     # Fee settings
     cur.execute("""
         CREATE TABLE IF NOT EXISTS fees (
-            id INTEGER PRIMARY KEY,
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
             percent REAL,
-            min_fee REAL
+            min_fee REAL,
+            chat_id INTEGER
         )
     """)
+    _ensure_column(cur, "fees", "chat_id", "INTEGER")
+    cur.execute("UPDATE fees SET chat_id=? WHERE chat_id IS NULL", (GLOBAL_TENANT,))
 
     # Logs table
     cur.execute("""
         CREATE TABLE IF NOT EXISTS logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            chat_id INTEGER
+            chat_id INTEGER,
+            group_id INTEGER
+        )
+    """)
+    _ensure_column(cur, "logs", "group_id", "INTEGER")
+    cur.execute("UPDATE logs SET group_id=? WHERE group_id IS NULL", (GLOBAL_TENANT,))
+
+    # Per-group admin rosters (global admins live in `admins`)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS group_admins (
+            group_id INTEGER,
+            user_id INTEGER,
+            PRIMARY KEY (group_id, user_id)
         )
     """)
 
@@ -91,11 +151,120 @@ def init_database():
         )
     """)
 
-    # Bans
+    # Per-user warn counters, maintained on every warn write. escalated is
+    # the highest warn rule applied so far (see mark_escalated).
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS warn_counts (
+            group_id INTEGER,
+            user_id INTEGER,
+            count INTEGER DEFAULT 0,
+            escalated INTEGER DEFAULT 0,
+            PRIMARY KEY (group_id, user_id)
+        )
+    """)
+    if "escalated" not in _columns(cur, "warn_counts"):
+        # Rules up to the current count fired under the old exact-match check
+        _ensure_column(cur, "warn_counts", "escalated", "INTEGER DEFAULT 0")
+        cur.execute("UPDATE warn_counts SET escalated = count")
+
+    # Bans (per group). Older databases had a global user_id-only table;
+    # keep it aside as bans_legacy instead of dropping it.
+    old_bans = _columns(cur, "bans")
+    if old_bans and "group_id" not in old_bans:
+        cur.execute("ALTER TABLE bans RENAME TO bans_legacy")
+
     cur.execute("""
         CREATE TABLE IF NOT EXISTS bans (
+            group_id INTEGER,
+            user_id INTEGER,
+            reason TEXT,
+            banned_by INTEGER,
+            timestamp TEXT,
+            PRIMARY KEY (group_id, user_id)
+        )
+    """)
+
+    # Escalation rules: reaching `warns` triggers `action` for `duration` seconds
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS warn_rules (
+            group_id INTEGER,
+            warns INTEGER,
+            action TEXT,
+            duration INTEGER,
+            PRIMARY KEY (group_id, warns)
+        )
+    """)
+
+    # Per-group warn expiry (seconds)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS warn_settings (
+            group_id INTEGER PRIMARY KEY,
+            expiry INTEGER
+        )
+    """)
+
+    # Pending timed actions (unmute / unban / warn expiry), replayed at startup
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action TEXT,
+            group_id INTEGER,
+            user_id INTEGER,
+            ref INTEGER,
+            run_at REAL
+        )
+    """)
+
+    # Member joins (for bulk actions on a join-time window)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS member_joins (
+            group_id INTEGER,
+            user_id INTEGER,
+            joined_at REAL,
+            PRIMARY KEY (group_id, user_id)
+        )
+    """)
+
+    # Per-tenant, per-day deal totals written by the digest jobs (handlers/digest.py);
+    # day is the IST date, chat_id 0 holds every tenant
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_summaries (
+            chat_id INTEGER,
+            day TEXT,
+            total INTEGER,
+            volume REAL,
+            completed INTEGER,
+            active INTEGER,
+            computed_at REAL,
+            PRIMARY KEY (chat_id, day)
+        )
+    """)
+
+    # Known users (user_id <-> @username) for resolving command targets;
+    # username_key is the normalized form (parsing.normalize_username)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
             user_id INTEGER PRIMARY KEY,
-            reason TEXT
+            username TEXT,
+            username_key TEXT,
+            updated_at REAL
+        )
+    """)
+    _ensure_column(cur, "users", "username_key", "TEXT")
+    _ensure_column(cur, "users", "updated_at", "REAL")
+    cur.execute("""
+        UPDATE users SET username_key = LOWER(LTRIM(username, '@'))
+        WHERE username_key IS NULL AND username IS NOT NULL
+    """)
+
+    # Every username a user has been seen with (current and past)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_usernames (
+            username_key TEXT,
+            user_id INTEGER,
+            first_seen REAL,
+            last_seen REAL,
+            PRIMARY KEY (username_key, user_id)
         )
     """)
 
@@ -109,6 +278,38 @@ def init_database():
         )
     """)
 
+    # Live dashboards (one pinned message per admin group)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS dashboards (
+            chat_id INTEGER PRIMARY KEY,
+            message_id INTEGER
+        )
+    """)
+
+    # Indexes for keyset pagination (see pagination.py) and tenancy
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fees_chat ON fees (chat_id)")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_logs_group ON logs (group_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notes_user ON notes (user_id, id)")
+    create_note_search(cur, BACKEND.name)
+
+    # Moderation lookups
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_actions_run_at ON scheduled_actions (run_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_joins_time ON member_joins (group_id, joined_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_warns_group_user ON warns (group_id, user_id, id)")
+    cur.execute("DROP INDEX IF EXISTS idx_users_username")
+    cur.execute("DROP INDEX IF EXISTS idx_users_username_lower")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_users_username_key ON users (username_key)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_usernames_user ON user_usernames (user_id)")
+
+    # Backfill counters for warns written before warn_counts existed
+    cur.execute("""
+        INSERT INTO warn_counts (group_id, user_id, count, escalated)
+        SELECT group_id, user_id, COUNT(*), COUNT(*) FROM warns
+        WHERE user_id IS NOT NULL
+        GROUP BY group_id, user_id
+        ON CONFLICT DO NOTHING
+    """)
+
     conn.commit()
     conn.close()
 
@@ -126,10 +327,15 @@ def is_admin(user_id: int) -> bool:
     return row is not None
 
 
-def add_admin(user_id: int):
+def add_admin(user_id: int, username=None, name=None):
     conn = connect()
     cur = conn.cursor()
-    cur.execute("INSERT OR IGNORE INTO admins (user_id) VALUES (?)", (user_id,))
+    cur.execute("""
+        INSERT INTO admins (user_id, username, name) VALUES (?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = COALESCE(excluded.username, admins.username),
+            name = COALESCE(excluded.name, admins.name)
+    """, (user_id, username, name))
     conn.commit()
     conn.close()
 
@@ -145,7 +351,35 @@ def remove_admin(user_id: int):
 def list_admins():
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT user_id FROM admins")
+    cur.execute("SELECT user_id, username, name FROM admins")
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def add_group_admin(group_id, user_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO group_admins (group_id, user_id) VALUES (?, ?) ON CONFLICT DO NOTHING",
+        (group_id, user_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def remove_group_admin(group_id, user_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM group_admins WHERE group_id=? AND user_id=?", (group_id, user_id))
+    conn.commit()
+    conn.close()
+
+
+def list_group_admins(group_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT user_id FROM group_admins WHERE group_id=?", (group_id,))
     rows = cur.fetchall()
     conn.close()
     return rows
@@ -155,19 +389,25 @@ def list_admins():
 # 📌 FEES
 # =====================================================
 
-def set_fee(percent, min_fee):
+def set_fee(percent, min_fee, chat_id=GLOBAL_TENANT):
     conn = connect()
     cur = conn.cursor()
-    cur.execute("DELETE FROM fees")
-    cur.execute("INSERT INTO fees (id, percent, min_fee) VALUES (1, ?, ?)", (percent, min_fee))
+    cur.execute("""
+        INSERT INTO fees (chat_id, percent, min_fee) VALUES (?, ?, ?)
+        ON CONFLICT (chat_id) DO UPDATE SET percent=excluded.percent, min_fee=excluded.min_fee
+    """, (chat_id, percent, min_fee))
     conn.commit()
     conn.close()
 
 
-def get_fee():
+def get_fee(chat_id=GLOBAL_TENANT):
+    """Fee for a group, falling back to the global fee, then the default."""
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT percent, min_fee FROM fees LIMIT 1")
+    cur.execute("""
+        SELECT percent, min_fee FROM fees WHERE chat_id IN (?, ?)
+        ORDER BY chat_id = ? DESC LIMIT 1
+    """, (chat_id, GLOBAL_TENANT, chat_id))
     row = cur.fetchone()
     conn.close()
 
@@ -180,31 +420,48 @@ def get_fee():
 # 📌 LOG CHANNELS
 # =====================================================
 
-def set_logs(chat_id):
+def set_logs(chat_id, group_id=GLOBAL_TENANT):
     conn = connect()
     cur = conn.cursor()
-    cur.execute("INSERT OR REPLACE INTO logs (id, chat_id) VALUES (1, ?)", (chat_id,))
+    cur.execute("""
+        INSERT INTO logs (group_id, chat_id) VALUES (?, ?)
+        ON CONFLICT (group_id) DO UPDATE SET chat_id=excluded.chat_id
+    """, (group_id, chat_id))
     conn.commit()
     conn.close()
 
 
-def remove_logs():
+def remove_logs(group_id=GLOBAL_TENANT):
     conn = connect()
     cur = conn.cursor()
-    cur.execute("DELETE FROM logs WHERE id=1")
+    cur.execute("DELETE FROM logs WHERE group_id=?", (group_id,))
     conn.commit()
     conn.close()
 
 
-def get_logs():
+def get_logs(group_id=GLOBAL_TENANT):
+    """Log channel for a group, falling back to the global one."""
     conn = connect()
     cur = conn.cursor()
-    cur.execute("SELECT chat_id FROM logs WHERE id=1")
+    cur.execute("""
+        SELECT chat_id FROM logs WHERE group_id IN (?, ?)
+        ORDER BY group_id = ? DESC LIMIT 1
+    """, (group_id, GLOBAL_TENANT, group_id))
     row = cur.fetchone()
     conn.close()
     return row["chat_id"] if row else None
 
 
+def list_logs():
+    """(group_id, chat_id) of every configured log channel."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT group_id, chat_id FROM logs")
+    rows = cur.fetchall()
+    conn.close()
+    return [(r["group_id"], r["chat_id"]) for r in rows]
+
+
 # =====================================================
 # 📌 GROUP SETTINGS
 # =====================================================
@@ -213,8 +470,10 @@ def set_group(chat_id, welcome, farewell):
     conn = connect()
     cur = conn.cursor()
     cur.execute("""
-        INSERT OR REPLACE INTO groups (chat_id, welcome_text, farewell_text)
+        INSERT INTO groups (chat_id, welcome_text, farewell_text)
         VALUES (?, ?, ?)
+        ON CONFLICT (chat_id) DO UPDATE SET
+            welcome_text=excluded.welcome_text, farewell_text=excluded.farewell_text
     """, (chat_id, welcome, farewell))
     conn.commit()
     conn.close()
@@ -254,6 +513,423 @@ def get_group_settings(chat_id):
     return row
 
 
+# =====================================================
+# 📌 LIVE DASHBOARDS
+# =====================================================
+
+def set_dashboard(chat_id, message_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO dashboards (chat_id, message_id) VALUES (?, ?) "
+        "ON CONFLICT (chat_id) DO UPDATE SET message_id=excluded.message_id",
+        (chat_id, message_id)
+    )
+    conn.commit()
+    conn.close()
+
+
+def remove_dashboard(chat_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM dashboards WHERE chat_id=?", (chat_id,))
+    conn.commit()
+    conn.close()
+
+
+def get_dashboards():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT chat_id, message_id FROM dashboards")
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+# =====================================================
+# 📌 MODERATION (warns / bans keyed by group_id, user_id)
+# =====================================================
+
+# Dropping below a rule's threshold lets that rule fire again
+_REARM = "CASE WHEN escalated > count - 1 THEN count - 1 ELSE escalated END"
+
+
+def add_warn(group_id, user_id, reason, timestamp):
+    """Record a warning and return (warn_id, new warn count)."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO warns (user_id, group_id, reason, timestamp) VALUES (?, ?, ?, ?) RETURNING id",
+        (user_id, group_id, reason, timestamp)
+    )
+    warn_id = cur.fetchone()["id"]
+    cur.execute("""
+        INSERT INTO warn_counts (group_id, user_id, count) VALUES (?, ?, 1)
+        ON CONFLICT (group_id, user_id) DO UPDATE SET count = warn_counts.count + 1
+    """, (group_id, user_id))
+    cur.execute(
+        "SELECT count FROM warn_counts WHERE group_id=? AND user_id=?",
+        (group_id, user_id)
+    )
+    count = cur.fetchone()["count"]
+    conn.commit()
+    conn.close()
+    return warn_id, count
+
+
+def remove_warn(group_id, user_id):
+    """Remove the latest warning. Returns False if there was none."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        DELETE FROM warns WHERE id = (
+            SELECT id FROM warns WHERE group_id=? AND user_id=?
+            ORDER BY id DESC LIMIT 1
+        )
+    """, (group_id, user_id))
+    removed = cur.rowcount > 0
+    if removed:
+        cur.execute(
+            f"UPDATE warn_counts SET count = count - 1, escalated = {_REARM} "
+            "WHERE group_id=? AND user_id=?",
+            (group_id, user_id)
+        )
+    conn.commit()
+    conn.close()
+    return removed
+
+
+def remove_warn_by_id(warn_id):
+    """Delete one warning (used by warn expiry)."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT group_id, user_id FROM warns WHERE id=?", (warn_id,))
+    row = cur.fetchone()
+    if row:
+        cur.execute("DELETE FROM warns WHERE id=?", (warn_id,))
+        cur.execute(
+            f"UPDATE warn_counts SET count = count - 1, escalated = {_REARM} "
+            "WHERE group_id=? AND user_id=?",
+            (row["group_id"], row["user_id"])
+        )
+    conn.commit()
+    conn.close()
+
+
+def clear_warns(group_id, user_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM warns WHERE group_id=? AND user_id=?", (group_id, user_id))
+    cur.execute("DELETE FROM warn_counts WHERE group_id=? AND user_id=?", (group_id, user_id))
+    conn.commit()
+    conn.close()
+
+
+def mark_escalated(group_id, user_id, warns):
+    """
+    Claim the warn rule for `warns` for this user. Returns False if it or
+    a higher rule was already applied since their count last went below it.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE warn_counts SET escalated=? WHERE group_id=? AND user_id=? AND escalated < ?",
+        (warns, group_id, user_id, warns)
+    )
+    claimed = cur.rowcount > 0
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def get_warn_count(group_id, user_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT count FROM warn_counts WHERE group_id=? AND user_id=?",
+        (group_id, user_id)
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row["count"] if row else 0
+
+
+def add_ban(group_id, user_id, reason, banned_by, timestamp):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO bans (group_id, user_id, reason, banned_by, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (group_id, user_id) DO UPDATE SET
+            reason=excluded.reason, banned_by=excluded.banned_by, timestamp=excluded.timestamp
+    """, (group_id, user_id, reason, banned_by, timestamp))
+    conn.commit()
+    conn.close()
+
+
+def remove_ban(group_id, user_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM bans WHERE group_id=? AND user_id=?", (group_id, user_id))
+    conn.commit()
+    conn.close()
+
+
+def list_bans():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT group_id, user_id FROM bans")
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def set_warn_rule(group_id, warns, action, duration):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO warn_rules (group_id, warns, action, duration)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (group_id, warns) DO UPDATE SET
+            action=excluded.action, duration=excluded.duration
+    """, (group_id, warns, action, duration))
+    conn.commit()
+    conn.close()
+
+
+def remove_warn_rule(group_id, warns):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM warn_rules WHERE group_id=? AND warns=?", (group_id, warns))
+    conn.commit()
+    conn.close()
+
+
+def get_warn_rules(group_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT warns, action, duration FROM warn_rules WHERE group_id=? ORDER BY warns",
+        (group_id,)
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def set_warn_expiry(group_id, seconds):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO warn_settings (group_id, expiry) VALUES (?, ?) "
+        "ON CONFLICT (group_id) DO UPDATE SET expiry=excluded.expiry",
+        (group_id, seconds)
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_warn_expiry(group_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT expiry FROM warn_settings WHERE group_id=?", (group_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row["expiry"] if row else None
+
+
+# =====================================================
+# 📌 SCHEDULED ACTIONS
+# =====================================================
+
+def add_scheduled_action(action, group_id, user_id, run_at, ref=None):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO scheduled_actions (action, group_id, user_id, ref, run_at)
+        VALUES (?, ?, ?, ?, ?)
+        RETURNING id
+    """, (action, group_id, user_id, ref, run_at))
+    action_id = cur.fetchone()["id"]
+    conn.commit()
+    conn.close()
+    return action_id
+
+
+def remove_scheduled_action(action_id):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM scheduled_actions WHERE id=?", (action_id,))
+    conn.commit()
+    conn.close()
+
+
+def get_scheduled_actions():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM scheduled_actions ORDER BY run_at")
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+# =====================================================
+# 📌 MEMBER JOINS
+# =====================================================
+
+def record_joins(group_id, user_ids, joined_at):
+    conn = connect()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO member_joins (group_id, user_id, joined_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (group_id, user_id) DO UPDATE SET joined_at=excluded.joined_at",
+        [(group_id, uid, joined_at) for uid in user_ids]
+    )
+    conn.commit()
+    conn.close()
+
+
+def joined_since(group_id, since):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT user_id FROM member_joins WHERE group_id=? AND joined_at>=? ORDER BY joined_at",
+        (group_id, since)
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return [r["user_id"] for r in rows]
+
+
+# =====================================================
+# 📌 KNOWN USERS
+# =====================================================
+
+def save_users(rows):
+    """
+    Upsert (user_id, username, username_key, seen_at) rows into users and
+    the username history (see identity.py, which batches them).
+    """
+    conn = connect()
+    cur = conn.cursor()
+    cur.executemany("""
+        INSERT INTO users (user_id, username, username_key, updated_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT (user_id) DO UPDATE SET
+            username = excluded.username,
+            username_key = excluded.username_key,
+            updated_at = excluded.updated_at
+    """, rows)
+    cur.executemany("""
+        INSERT INTO user_usernames (username_key, user_id, first_seen, last_seen) VALUES (?, ?, ?, ?)
+        ON CONFLICT (username_key, user_id) DO UPDATE SET last_seen = excluded.last_seen
+    """, [(key, user_id, seen, seen) for user_id, _, key, seen in rows if key])
+    conn.commit()
+    conn.close()
+
+
+def resolve_username(username):
+    """@name -> user_id (current holder first, then past holders), or None."""
+    key = normalize_username(username)
+    if not key:
+        return None
+
+    conn = connect()
+    cur = conn.cursor()
+    # Usernames are unique on Telegram, but a user who gave one up may not
+    # have been seen since: the one who showed it last holds it
+    cur.execute(
+        "SELECT user_id FROM users WHERE username_key=? ORDER BY updated_at DESC LIMIT 1",
+        (key,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        cur.execute(
+            "SELECT user_id FROM user_usernames WHERE username_key=? ORDER BY last_seen DESC LIMIT 1",
+            (key,)
+        )
+        row = cur.fetchone()
+    conn.close()
+    return row["user_id"] if row else None
+
+
+def usernames_of(user_id):
+    """
+    Normalized usernames `user_id` has been seen with, newest first,
+    leaving out the ones another user holds now.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT h.username_key FROM user_usernames h
+        WHERE h.user_id=? AND NOT EXISTS (
+            SELECT 1 FROM users u WHERE u.username_key=h.username_key AND u.user_id<>h.user_id
+        )
+        ORDER BY h.last_seen DESC
+    """, (user_id,))
+    keys = [r["username_key"] for r in cur.fetchall()]
+    conn.close()
+    return keys
+
+
+# =====================================================
+# 📌 DAILY SUMMARIES (digest cache)
+# =====================================================
+
+def save_daily_summaries(days, rows, computed_at):
+    """Replace the summaries of `days` (IST date strings) with `rows`."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.executemany("DELETE FROM daily_summaries WHERE day=?", [(d,) for d in days])
+    cur.executemany("""
+        INSERT INTO daily_summaries (chat_id, day, total, volume, completed, active, computed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, [(*row, computed_at) for row in rows])
+    conn.commit()
+    conn.close()
+
+
+def forget_daily_summary(day):
+    """
+    Drop every tenant's summary of `day` (IST date string) after a deal
+    created that day changes status; it is counted live until recomputed.
+    """
+    conn = connect()
+    conn.execute("DELETE FROM daily_summaries WHERE day=?", (day,))
+    conn.commit()
+    conn.close()
+
+
+def get_daily_summaries(chat_id, first_day, last_day):
+    """
+    {day: row} for chat_id between two IST dates (inclusive), plus the set
+    of days the digest has computed at all (a tenant without deals that
+    day has no row of its own).
+    """
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT * FROM daily_summaries WHERE chat_id IN (?, 0) AND day >= ? AND day <= ?",
+        (chat_id, str(first_day), str(last_day))
+    )
+    rows = cur.fetchall()
+    conn.close()
+    computed = {r["day"] for r in rows if r["chat_id"] == 0}
+    return {r["day"]: r for r in rows if r["chat_id"] == chat_id}, computed
+
+
+def summary_stamps(first_day, last_day):
+    """{day: computed_at} of the days between two IST dates the digest has computed."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT day, computed_at FROM daily_summaries WHERE chat_id=0 AND day >= ? AND day <= ?",
+        (str(first_day), str(last_day))
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return {r["day"]: r["computed_at"] for r in rows}
+
+
 # =====================================================
 # 📌 END DATABASE MODULE
 # =====================================================
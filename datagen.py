@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# datagen.py
+# Synthetic deal ledger for scale testing
+# Fills data/ under --workdir with millions of deals shaped like real
+# traffic: a few heavy traders and many occasional ones (Zipf), a handful
+# of escrow admins, log-normal amounts, busier recent days and IST
+# evenings, and statuses that depend on a deal's age. Timestamps use the
+# ist_now().isoformat() format and ids grow with created_at, as they do
+# when deals come in through /add.
+#
+#   python datagen.py --workdir /tmp/escrow-bench --deals 10000000
+#   python loadtest.py --workdir /tmp/escrow-bench
+#
+# Group ids and trader usernames match loadtest.py. Rows go in with bulk
+# executemany batches, secondary indexes (and the search triggers) are
+# dropped during the load and rebuilt at the end; on SQLite journaling and
+# fsync are off while loading.
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+from loadtest import ADMIN_ID, bench_groups, has_deals, trader_username
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BATCH = 50_000
+COMMIT_EVERY = 1_000_000
+
+# Trade ids above the 6-digit range used by generate_trade_id()
+TRADE_ID_BASE = 10_000_000
+
+# Relative activity per IST hour (quiet nights, busy evenings)
+HOUR_WEIGHTS = [
+    2, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 9,
+    9, 9, 8, 8, 9, 10, 12, 14, 15, 14, 10, 5,
+]
+
+# (status, weight) once a deal is older than RESOLVE_DAYS
+SETTLED_STATUSES = [("completed", 62), ("released", 18), ("refunded", 11), ("cancelled", 7), ("active", 2)]
+RESOLVE_DAYS = 3
+
+SECONDARY_INDEXES = (
+    "idx_deals_status", "idx_deals_chat_status", "idx_deals_chat_created", "idx_deals_created",
+    "idx_participants_username", "idx_participants_user",
+)
+
+
+# =====================================================
+# 📌 DISTRIBUTIONS
+# =====================================================
+
+class Weighted:
+    """random.choices() with the cumulative weights computed once."""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cum = list(itertools.accumulate(weights))
+        self.total = self.cum[-1]
+
+    def pick(self):
+        return self.values[bisect.bisect(self.cum, random.random() * self.total)]
+
+    def sample(self, k):
+        return random.choices(self.values, cum_weights=self.cum, k=k)
+
+
+def zipf(n, s=1.1):
+    return Weighted(range(n), [1 / (rank + 1) ** s for rank in range(n)])
+
+
+def daily_counts(total, days, growth):
+    """Deals per day, oldest first; day i weighs (1 + growth)^(i / days)."""
+    weights = [(1 + growth) ** (i / days) for i in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[-1 - i % days] += 1
+    return counts
+
+
+def amount():
+    # Median ≈ ₹2,400 with a long tail, rounded like typed amounts
+    value = random.lognormvariate(7.8, 1.1)
+    step = 10 if value < 10_000 else 100
+    return float(max(step, round(value / step) * step))
+
+
+def status_for(age_days):
+    if age_days >= RESOLVE_DAYS:
+        return SETTLED.pick()
+    # Fresh deals are mostly still open
+    return "active" if random.random() < 0.75 - age_days * 0.2 else SETTLED.pick()
+
+
+SETTLED = Weighted(*zip(*SETTLED_STATUSES))
+HOURS = Weighted(range(24), HOUR_WEIGHTS)
+
+
+# =====================================================
+# 📌 LOADER
+# =====================================================
+
+def _prepare(conn, backend_name):
+    from search import search_triggers
+
+    cur = conn.cursor()
+    if backend_name == "sqlite":
+        cur.execute("PRAGMA journal_mode=OFF")
+        cur.execute("PRAGMA synchronous=OFF")
+        cur.execute("PRAGMA cache_size=-200000")
+        # The search index is rebuilt in one pass at the end
+        for name in search_triggers("deals"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for name in SECONDARY_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def generate(args):
+    from database import BACKEND, add_admin, create_deals_table, get_fee
+    from shards import all_shards, connect_shard, shard_for
+    from participants import INSERT_PARTICIPANT, participant_rows
+    from search import rebuild
+    from utils import ist_now
+
+    groups = bench_groups(args.groups)
+    traders = zipf(args.traders)
+    admins = zipf(args.admins, s=0.8)
+    admin_names = [f"@escrow_admin{i}" for i in range(args.admins)]
+    for i, name in enumerate(admin_names):
+        add_admin(ADMIN_ID + 1 + i, name, f"Escrow Admin {i}")
+
+    fees = {chat_id: get_fee(chat_id) for chat_id in groups + [0]}
+
+    # Shard 0 is the main file, so the catalog shares its connection
+    shards = {shard: connect_shard(shard) for shard in all_shards()}
+    for conn in shards.values():
+        _prepare(conn, BACKEND.name)
+    catalog = shards[0]
+
+    cur = catalog.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) AS last FROM deal_catalog")
+    next_id = cur.fetchone()["last"] + 1
+
+    pending = {shard: [] for shard in shards}
+    catalog_rows = []
+    written = committed = 0
+    started = time.perf_counter()
+
+    def flush(force=False):
+        nonlocal written, committed
+        if catalog_rows:
+            cur.executemany(
+                "INSERT INTO deal_catalog (id, trade_id, chat_id, shard) VALUES (?, ?, ?, ?)",
+                catalog_rows
+            )
+            catalog_rows.clear()
+        for shard, rows in pending.items():
+            if not rows:
+                continue
+            shards[shard].cursor().executemany("""
+                INSERT INTO deals (
+                    id, trade_id, buyer_username, seller_username,
+                    created_by, created_by_username,
+                    amount, fee, admin_earning,
+                    status, created_at, updated_at, chat_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            shards[shard].cursor().executemany(INSERT_PARTICIPANT, [
+                p for r in rows for p in participant_rows(r[0], r[2], r[3], r[4], r[5], r[9], r[10])
+            ])
+            written += len(rows)
+            rows.clear()
+
+        if force or written - committed >= COMMIT_EVERY:
+            for conn in shards.values():
+                conn.commit()
+            committed = written
+            rate = written / (time.perf_counter() - started)
+            print(f"  {written:>12,} deals  ({rate:,.0f}/s)")
+
+    today = ist_now().replace(hour=0, minute=0, second=0, microsecond=0)
+    counts = daily_counts(args.deals, args.days, args.growth)
+
+    for day, count in enumerate(counts):
+        age_days = args.days - 1 - day
+        midnight = today - timedelta(days=age_days)
+
+        offsets = sorted(h * 3600 + random.random() * 3600 for h in HOURS.sample(count))
+        buyers, sellers = traders.sample(count), traders.sample(count)
+        handlers = admins.sample(count)
+
+        for offset, buyer, seller, admin in zip(offsets, buyers, sellers, handlers):
+            created = midnight + timedelta(seconds=offset)
+
+            chat_id = 0 if random.random() < args.private else random.choice(groups)
+            shard = shard_for(chat_id)
+
+            if seller == buyer:
+                seller = (seller + 1) % args.traders
+
+            value = amount()
+            percent, min_fee = fees[chat_id]
+            fee = max(value * percent / 100, min_fee)
+
+            status = status_for(age_days + (1 - offset / 86400))
+            if status == "active":
+                updated = created
+            else:
+                updated = created + timedelta(minutes=random.lognormvariate(4.5, 1.2))
+
+            deal_id = next_id
+            next_id += 1
+            trade_id = f"TID{TRADE_ID_BASE + deal_id}"
+
+            catalog_rows.append((deal_id, trade_id, chat_id, shard))
+            pending[shard].append((
+                deal_id, trade_id, trader_username(buyer), trader_username(seller),
+                ADMIN_ID + 1 + admin, admin_names[admin],
+                value, fee, fee,
+                status, created.isoformat(), updated.isoformat(), chat_id,
+            ))
+
+            if len(catalog_rows) >= BATCH:
+                flush()
+
+    flush(force=True)
+
+    if BACKEND.name == "postgresql":
+        # Explicit ids do not advance the BIGSERIAL sequence
+        cur.execute("SELECT setval(pg_get_serial_sequence('deal_catalog', 'id'), (SELECT MAX(id) FROM deal_catalog))")
+        catalog.commit()
+
+    print("Rebuilding indexes...")
+    for conn in shards.values():
+        c = conn.cursor()
+        create_deals_table(c)
+        if BACKEND.name == "sqlite":
+            rebuild(c, "deals")
+        c.execute("ANALYZE")
+        conn.commit()
+        conn.close()
+
+    return written, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the deal ledger with synthetic deals.")
+    parser.add_argument("--workdir", required=True, help="directory whose data/ receives the deals")
+    parser.add_argument("--deals", type=int, default=1_000_000, help="deals to create (default 1,000,000)")
+    parser.add_argument("--days", type=int, default=365, help="history length in days (default 365)")
+    parser.add_argument("--growth", type=float, default=3.0, help="last day vs first day volume growth (default 3 → 4x)")
+    parser.add_argument("--groups", type=int, default=8, help="group chats (default 8, as loadtest.py)")
+    parser.add_argument("--private", type=float, default=0.15, help="share of deals made in private chat (default 0.15)")
+    parser.add_argument("--traders", type=int, default=200_000, help="distinct traders (default 200,000)")
+    parser.add_argument("--admins", type=int, default=12, help="escrow admins (default 12)")
+    parser.add_argument("--append", action="store_true", help="add to a ledger that already has deals")
+    parser.add_argument("--random-seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.days < 1 or args.traders < 2 or args.admins < 1 or args.groups < 1:
+        raise SystemExit("--days, --groups and --admins must be ≥ 1 and --traders ≥ 2")
+    random.seed(args.random_seed)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, HERE)
+    os.environ.setdefault("ESCROW_CONFIG", os.path.join(os.getcwd(), "config.env"))
+
+    from database import init_database
+    from shards import init_shards
+
+    init_database()
+    init_shards()
+
+    if has_deals() and not args.append:
+        raise SystemExit(f"{args.workdir} already has deals; pass --append to add more")
+
+    print(f"Generating {args.deals:,} deals over {args.days} days in {os.getcwd()}")
+    written, elapsed = generate(args)
+    print(f"Done: {written:,} deals in {elapsed:.0f}s ({written / max(elapsed, 1e-9):,.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,68 @@
 # handlers/admin.py
 # Admin & Owner command handlers for Era Escrow Bot
 
+import html
+import os
+from datetime import datetime, timezone
+
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, TelegramError
 
-from utils import ist_now, format_username, reply_and_clean
+from utils import IST_OFFSET, ist_now, format_username, reply_and_clean
 from database import (
-    is_admin,
     add_admin,
     remove_admin,
+    add_group_admin,
+    remove_group_admin,
     list_admins,
     set_fee,
-    get_fee,
     set_logs,
     remove_logs,
-    get_logs,
     connect
 )
+from pagination import Paginator
+from cache import TTLCache
+from handlers.deals import ONGOING_PAGES, holding_text
+from handlers.user import global_stats_text
+from tenancy import GLOBAL_TENANT, tenant, tenant_id, scope, is_tenant_admin, invalidate_tenant
+from shards import all_shards, connect_shard, fan_out, fan_out_grouped, tenant_shards
+from bus import subscribe, publish, clear_events
+from config import OWNER_ID, SLOW_QUERY_LOG, SLOW_QUERY_MS
+import perf
+import slowlog
+import writebehind
 
 DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 OWNER_ONLY = "⛔ *Owner only command!*"
 ADMIN_ONLY = "⛔ *Admin only command!*"
 
+# Tables covered by /export_data and /reset_all
+DATA_TABLES = [
+    "deal_catalog", "admins", "group_admins", "fees", "bans", "warns", "warn_counts", "notes",
+    "groups", "logs", "users", "user_usernames", "warn_rules", "warn_settings",
+    "scheduled_actions", "member_joins", "dashboards", "daily_summaries",
+]
+
+# Tables spread over every shard (see shards.py)
+SHARDED_TABLES = ["deals", "deal_participants"]
+
+
+def _is_admin(update):
+    return is_tenant_admin(update.effective_user.id, tenant_id(update.effective_chat))
+
+
+def _scope_label(chat_id):
+    return "global" if chat_id == GLOBAL_TENANT else "this group"
+
 
 # ============================================================
 # 📌 /cmds – FULL ADMIN COMMAND LIST
 # ============================================================
 
 async def cmds_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
     text = (
@@ -44,13 +77,16 @@ async def cmds_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/status <tradeid>\n"
         "/ongoing\n"
         "/holding\n"
-        "/notify <tradeid>\n\n"
+        "/notify <tradeid>\n"
+        "/livedash\n"
+        "/stopdash\n\n"
         
         "📊 *User & Summary*\n"
         "/stats\n"
         "/stats @user\n"
         "/mydeals\n"
         "/find @user\n"
+        "/search <words>\n"
         "/today\n"
         "/week\n"
         "/escrow\n"
@@ -75,6 +111,9 @@ async def cmds_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/setlogs <chatid>\n"
         "/removelogs\n"
         "/tlogs\n"
+        "/perf\n"
+        "/slowlog\n"
+        "/digest\n"
     )
 
     await update.message.reply_text(text, parse_mode="Markdown")
@@ -84,32 +123,84 @@ async def cmds_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 📌 /menu – INLINE ADMIN DASHBOARD
 # ============================================================
 
-async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
-        return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
+VIEW_TTL = 15  # seconds a rendered dashboard view is reused
+
+VIEW_CACHE = TTLCache(ttl=VIEW_TTL)
+subscribe("admins", lambda key: VIEW_CACHE.invalidate())
+subscribe("reset", lambda key: VIEW_CACHE.invalidate())
+
+DASHBOARD_TEXT = "📋 *Admin Dashboard*\nChoose an option:"
+
+DASHBOARD_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📂 Ongoing Deals", callback_data="ongoing")],
+    [InlineKeyboardButton("💰 Holding Amount", callback_data="holding")],
+    [InlineKeyboardButton("📊 Global Stats", callback_data="gstats")],
+    [InlineKeyboardButton("👑 Admin List", callback_data="admins")],
+])
 
-    buttons = [
-        [InlineKeyboardButton("📂 Ongoing Deals", callback_data="ongoing")],
-        [InlineKeyboardButton("💰 Holding Amount", callback_data="holding")],
-        [InlineKeyboardButton("📊 Global Stats", callback_data="gstats")],
-        [InlineKeyboardButton("👑 Admin List", callback_data="admins")],
-    ]
 
-    keyboard = InlineKeyboardMarkup(buttons)
+# view -> render(chat_id); each tenant gets its own cached copy
+DASHBOARD_VIEWS = {
+    "ongoing": lambda chat_id: ONGOING_PAGES.preview(str(chat_id)),
+    "holding": holding_text,
+    "gstats": global_stats_text,
+    "admins": lambda chat_id: ADMIN_PAGES.preview(),
+}
+
+
+def _view_keyboard(view):
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("⬅️ Back", callback_data="menu"),
+        InlineKeyboardButton("🔄 Refresh", callback_data=view),
+    ]])
+
+
+async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _is_admin(update):
+        return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
     await update.message.reply_text(
-        "📋 *Admin Dashboard*\nChoose an option:",
+        DASHBOARD_TEXT,
         parse_mode="Markdown",
-        reply_markup=keyboard
+        reply_markup=DASHBOARD_KEYBOARD
     )
 
 
+async def menu_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route dashboard button presses and edit the dashboard in place."""
+    query = update.callback_query
+
+    chat_id = tenant_id(query.message.chat if query.message else None)
+    if not is_tenant_admin(query.from_user.id, chat_id):
+        return await query.answer("⛔ Admin only!", show_alert=True)
+
+    view = query.data
+
+    if view == "menu":
+        text, markup = DASHBOARD_TEXT, DASHBOARD_KEYBOARD
+    elif view in DASHBOARD_VIEWS:
+        # Repeated presses within VIEW_TTL skip the aggregate queries
+        text = VIEW_CACHE.get_or_set((view, chat_id), lambda: DASHBOARD_VIEWS[view](chat_id))
+        markup = _view_keyboard(view)
+    else:
+        return await query.answer("❗ Unknown option.")
+
+    await query.answer()
+
+    try:
+        await query.edit_message_text(text, parse_mode="Markdown", reply_markup=markup)
+    except BadRequest as e:
+        # Refresh served from cache renders the same text
+        if "not modified" not in str(e).lower():
+            raise
+
+
 # ============================================================
 # 📌 /panel – OWNER PANEL
 # ============================================================
 
 async def panel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     await update.message.reply_text(
@@ -122,7 +213,10 @@ async def panel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/export_data\n"
         "/setlogs <chatid>\n"
         "/removelogs\n"
-        "/tlogs",
+        "/tlogs\n"
+        "/perf [reset]\n"
+        "/slowlog [count|file]\n"
+        "/digest [week]",
         parse_mode="Markdown"
     )
 
@@ -132,7 +226,7 @@ async def panel_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def set_fee_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     if len(context.args) < 1:
@@ -144,10 +238,12 @@ async def set_fee_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except:
         return await update.message.reply_text("❗ Invalid numbers.", parse_mode="Markdown")
 
-    set_fee(percent, min_fee)
+    chat_id = tenant_id(update.effective_chat)
+    set_fee(percent, min_fee, chat_id)
+    invalidate_tenant(chat_id)
 
     await update.message.reply_text(
-        f"✅ *Fee Updated Successfully*\n"
+        f"✅ *Fee Updated Successfully* ({_scope_label(chat_id)})\n"
         f"{DIVIDER}\n"
         f"• Percent: `{percent}%`\n"
         f"• Minimum: `₹{min_fee}`",
@@ -160,7 +256,7 @@ async def set_fee_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def add_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     if not context.args:
@@ -171,7 +267,26 @@ async def add_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except:
         return await update.message.reply_text("❗ Invalid ID.", parse_mode="Markdown")
 
-    add_admin(admin_id)
+    # In a group the admin is added to that group's roster only
+    chat_id = tenant_id(update.effective_chat)
+    if chat_id != GLOBAL_TENANT:
+        add_group_admin(chat_id, admin_id)
+        invalidate_tenant(chat_id)
+        return await update.message.reply_text(
+            f"👮 *Group Admin Added:* `{admin_id}`", parse_mode="Markdown"
+        )
+
+    # Names feed the impersonation index; only known if the user met the bot
+    username = name = None
+    try:
+        chat = await context.bot.get_chat(admin_id)
+        username, name = chat.username, chat.full_name
+    except TelegramError:
+        pass
+
+    add_admin(admin_id, username, name)
+    invalidate_tenant(GLOBAL_TENANT)
+    publish("admins")
 
     await update.message.reply_text(f"👮 *Admin Added:* `{admin_id}`", parse_mode="Markdown")
 
@@ -181,7 +296,7 @@ async def add_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def remove_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     if not context.args:
@@ -192,7 +307,17 @@ async def remove_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     except:
         return await update.message.reply_text("❗ Invalid ID.", parse_mode="Markdown")
 
+    chat_id = tenant_id(update.effective_chat)
+    if chat_id != GLOBAL_TENANT:
+        remove_group_admin(chat_id, admin_id)
+        invalidate_tenant(chat_id)
+        return await update.message.reply_text(
+            f"❌ *Group Admin Removed:* `{admin_id}`", parse_mode="Markdown"
+        )
+
     remove_admin(admin_id)
+    invalidate_tenant(GLOBAL_TENANT)
+    publish("admins")
 
     await update.message.reply_text(f"❌ *Admin Removed:* `{admin_id}`", parse_mode="Markdown")
 
@@ -201,18 +326,24 @@ async def remove_admin_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 # 📌 /adminlist – ALL ADMINS
 # ============================================================
 
-async def admin_list_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
-        return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
-
-    admins = list_admins()
+ADMIN_PAGES = Paginator(
+    name="admins",
+    table="admins",
+    key="user_id",
+    columns="user_id",
+    where=lambda arg, user: ("", ()),
+    header=lambda arg: "👑 *Admin List*\n" + DIVIDER + "\n\n",
+    row=lambda a: f"• `{a['user_id']}`\n",
+    empty="ℹ️ No admins added yet.",
+    admin_only=True,
+)
 
-    text = "👑 *Admin List*\n" + DIVIDER + "\n\n"
 
-    for a in admins:
-        text += f"• `{a['user_id']}`\n"
+async def admin_list_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not _is_admin(update):
+        return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await ADMIN_PAGES.send(update.message, update.effective_user)
 
 
 # ============================================================
@@ -220,32 +351,38 @@ async def admin_list_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # ============================================================
 
 async def set_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     if not context.args:
         return await update.message.reply_text("Usage: `/setlogs <chatid>`", parse_mode="Markdown")
 
     chat_id = int(context.args[0])
-    set_logs(chat_id)
+    group_id = tenant_id(update.effective_chat)
+    set_logs(chat_id, group_id)
+    invalidate_tenant(group_id)
 
-    await update.message.reply_text(f"📡 Logs channel set to `{chat_id}`", parse_mode="Markdown")
+    await update.message.reply_text(
+        f"📡 Logs channel ({_scope_label(group_id)}) set to `{chat_id}`", parse_mode="Markdown"
+    )
 
 
 async def remove_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
-    remove_logs()
+    group_id = tenant_id(update.effective_chat)
+    remove_logs(group_id)
+    invalidate_tenant(group_id)
 
     await update.message.reply_text("🗑 Logs removed.", parse_mode="Markdown")
 
 
 async def show_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    chat_id = get_logs()
+    chat_id = tenant(tenant_id(update.effective_chat))["logs"]
 
     if not chat_id:
         return await update.message.reply_text("ℹ️ No logs channel set.", parse_mode="Markdown")
@@ -258,13 +395,13 @@ async def show_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def export_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     conn = connect()
     cur = conn.cursor()
 
-    tables = ["deals", "admins", "fees", "bans", "warns", "notes", "groups", "logs"]
+    tables = DATA_TABLES
     data = {}
 
     for t in tables:
@@ -274,6 +411,9 @@ async def export_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     conn.close()
 
+    for t in SHARDED_TABLES:
+        data[t] = [dict(r) for r in fan_out(f"SELECT * FROM {t}")]
+
     import json
     dump = json.dumps(data, indent=4)
 
@@ -289,7 +429,7 @@ async def export_data_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 # ============================================================
 
 async def reset_all_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != 6847499628:
+    if update.effective_user.id != OWNER_ID:
         return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
 
     if not context.args or context.args[0] != "confirm":
@@ -301,37 +441,162 @@ async def reset_all_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     conn = connect()
     cur = conn.cursor()
 
-    tables = ["deals", "admins", "fees", "bans", "warns", "notes", "groups", "logs"]
+    tables = DATA_TABLES
     for t in tables:
         cur.execute(f"DELETE FROM {t}")
 
     conn.commit()
     conn.close()
 
+    for shard in all_shards():
+        conn = connect_shard(shard)
+        for t in SHARDED_TABLES:
+            conn.execute(f"DELETE FROM {t}")
+        conn.commit()
+        conn.close()
+
+    # Every process drops bans, rules, settings, tenants and views
+    clear_events()
+    publish("reset")
+
     await update.message.reply_text("🔥 *All data reset successfully!*", parse_mode="Markdown")
 
 
+# ============================================================
+# 📌 /perf – HANDLER & QUERY TIMINGS (OWNER ONLY)
+# ============================================================
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds != float("inf") else ">10s"
+
+
+def perf_text():
+    lines = [f"📈 *Performance* (last {perf.uptime() / 3600:.1f}h)", DIVIDER, "⏱ *Handlers* (by total time)"]
+    for name, s in perf.top_handlers():
+        calls = s.calls or 1
+        lines.append(
+            f"`{name}` ×{s.calls} avg {_ms(s.latency.total / calls)} "
+            f"p95≤{_ms(s.latency.quantile(0.95))} db {_ms(s.db_time / calls)}"
+            + (f" ⚠️{s.errors}" if s.errors else "")
+        )
+
+    lines += ["", "🗄 *Queries* (by total time)"]
+    for sql, s in perf.top_queries(8):
+        lines.append(
+            f"`{sql[:60]}` ×{s.calls} avg {_ms(s.latency.total / (s.calls or 1))} rows {s.rows}"
+        )
+
+    if perf.SLOW:
+        lines += ["", f"🐢 *Slow queries* ({len(perf.SLOW)} recent)"]
+        for at, sql, seconds in list(perf.SLOW)[-5:]:
+            lines.append(f"`{sql[:60]}` {_ms(seconds)}")
+
+    snap = perf.outbound_snapshot()
+    if snap:
+        lines += [
+            "",
+            f"📤 *Outbound* sent {snap['sent']} · retried {snap['retried']} · failed {snap['failed']}",
+            f"throttled {snap['throttled']} · wait avg {_ms(snap['wait_avg'])} max {_ms(snap['wait_max'])}",
+        ]
+
+    if writebehind.BUFFERS:
+        lines += ["", "💾 *Write-behind*"]
+        for b in writebehind.BUFFERS:
+            lines.append(
+                f"`{b.name}` pending {len(b)} · written {b.written}"
+                + (f" ⚠️{b.failures}" if b.failures else "")
+            )
+    return "\n".join(lines)
+
+
+async def perf_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
+
+    if context.args and context.args[0] == "reset":
+        perf.reset()
+        return await update.message.reply_text("♻️ Performance counters reset.")
+
+    await update.message.reply_text(perf_text(), parse_mode="Markdown")
+
+
+# ============================================================
+# 📌 /slowlog – SLOW QUERIES WITH PLANS (OWNER ONLY)
+# ============================================================
+
+SLOWLOG_MESSAGE_LIMIT = 3900
+
+
+def slowlog_text(count):
+    entries = slowlog.recent(count)
+    if not entries:
+        return "✅ No slow queries logged."
+
+    blocks = []
+    for e in entries:
+        at = datetime.fromtimestamp(e["at"], timezone.utc) + IST_OFFSET
+        plan = "\n".join(e["plan"]) or "(no plan)"
+        blocks.append(
+            f"🐢 {at:%d %b %H:%M:%S} · {e['ms']:.0f}ms\n"
+            f"<code>{html.escape(e['sql'][:400], quote=False)}</code>\n"
+            f"params: <code>{html.escape(str(e['params'])[:200], quote=False)}</code>\n"
+            f"<pre>{html.escape(plan[:600], quote=False)}</pre>"
+        )
+
+    text = f"<b>Slow queries</b> (newest first, ≥{SLOW_QUERY_MS:.0f}ms)\n\n"
+    for block in blocks:
+        if len(text) + len(block) > SLOWLOG_MESSAGE_LIMIT:
+            break
+        text += block + "\n\n"
+    return text
+
+
+async def slowlog_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return await update.message.reply_text(OWNER_ONLY, parse_mode="Markdown")
+
+    arg = context.args[0] if context.args else ""
+
+    if arg == "file":
+        if not os.path.exists(SLOW_QUERY_LOG):
+            return await update.message.reply_text("✅ No slow queries logged.")
+        with open(SLOW_QUERY_LOG, "rb") as f:
+            return await update.message.reply_document(f, filename="slow_queries.log")
+
+    count = int(arg) if arg.isdigit() else 5
+    await update.message.reply_text(slowlog_text(min(count, 20)), parse_mode=ParseMode.HTML)
+
+
 # ============================================================
 # 📌 EARNINGS PANEL
 # ============================================================
 
+def _earnings(chat_id, admin_id=None):
+    """{admin id: earnings} over one tenant's deals (a group sees only its own)."""
+    tenant_sql, params = scope(chat_id)
+    if admin_id is not None:
+        tenant_sql += " AND created_by=?"
+        params += (admin_id,)
+    return fan_out_grouped(
+        f"SELECT created_by, SUM(admin_earning) AS total FROM deals "
+        f"WHERE {tenant_sql} GROUP BY created_by",
+        params, tenant_shards(chat_id)
+    )
+
+
 async def earnings_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT created_by, SUM(admin_earning) AS total FROM deals GROUP BY created_by")
-    rows = cur.fetchall()
-    conn.close()
+    totals = _earnings(tenant_id(update.effective_chat))
 
-    if not rows:
+    if not totals:
         return await update.message.reply_text("ℹ️ No earnings yet.")
 
     text = "💰 *Admin Earnings*\n" + DIVIDER + "\n\n"
 
-    for r in rows:
-        text += f"• `{r['created_by']}` → ₹{r['total']:.2f}\n"
+    for admin_id, total in totals.items():
+        text += f"• `{admin_id}` → ₹{total:.2f}\n"
 
     await update.message.reply_text(text, parse_mode="Markdown")
 
@@ -343,16 +608,10 @@ async def earnings_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def admin_earnings_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     uid = update.effective_user.id
 
-    if not is_admin(uid):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT SUM(admin_earning) AS total FROM deals WHERE created_by=?", (uid,))
-    row = cur.fetchone()
-    conn.close()
-
-    total = row["total"] or 0
+    total = _earnings(tenant_id(update.effective_chat), uid).get(uid, 0)
 
     await update.message.reply_text(
         f"💸 *Your Earnings:* ₹{total:.2f}",
@@ -365,22 +624,18 @@ async def admin_earnings_handler(update: Update, context: ContextTypes.DEFAULT_T
 # ============================================================
 
 async def admin_compare_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT created_by, SUM(admin_earning) AS total FROM deals GROUP BY created_by")
-    rows = cur.fetchall()
-    conn.close()
+    totals = _earnings(tenant_id(update.effective_chat))
 
-    if not rows:
+    if not totals:
         return await update.message.reply_text("ℹ️ No earnings found.")
 
     text = "📊 *Admin Earnings Comparison*\n" + DIVIDER + "\n\n"
 
-    for r in rows:
-        text += f"• `{r['created_by']}` → ₹{r['total']:.2f}\n"
+    for admin_id, total in totals.items():
+        text += f"• `{admin_id}` → ₹{total:.2f}\n"
 
     await update.message.reply_text(text, parse_mode="Markdown")
 
@@ -390,20 +645,16 @@ async def admin_compare_handler(update: Update, context: ContextTypes.DEFAULT_TY
 # ============================================================
 
 async def top_admins_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id):
+    if not _is_admin(update):
         return await update.message.reply_text(ADMIN_ONLY, parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT created_by, SUM(admin_earning) AS total FROM deals GROUP BY created_by")
-    rows = cur.fetchall()
-    conn.close()
+    totals = _earnings(tenant_id(update.effective_chat))
 
-    ranking = sorted(rows, key=lambda x: x["total"], reverse=True)
+    ranking = sorted(totals.items(), key=lambda x: x[1], reverse=True)
 
     text = "🏆 *Top Admins by Earnings*\n" + DIVIDER + "\n\n"
 
-    for idx, r in enumerate(ranking, start=1):
-        text += f"#{idx} — `{r['created_by']}` → ₹{r['total']:.2f}\n"
+    for idx, (admin_id, total) in enumerate(ranking, start=1):
+        text += f"#{idx} — `{admin_id}` → ₹{total:.2f}\n"
 
     await update.message.reply_text(text, parse_mode="Markdown")
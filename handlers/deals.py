@@ -1,11 +1,13 @@
 # handlers/deals.py
 # Deal creation, refund, close, cancel, status, and summary handlers
 
+import logging
 import random
-import re
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, TelegramError
+from telegram.helpers import escape_markdown
 
 from utils import (
     ist_now,
@@ -16,9 +18,29 @@ from utils import (
 )
 
 from database import (
-    connect,
-    get_fee
+    forget_daily_summary,
+    set_dashboard,
+    remove_dashboard,
+    get_dashboards
 )
+from outbound import PRIORITY_HIGH
+from identity import resolve
+from pagination import Paginator
+from parsing import parse_amount, parse_deal_form, parse_trade_id
+from participants import add_participants, set_deal_status
+from tenancy import GLOBAL_TENANT, tenant, tenant_id, scope, can_manage
+from cluster import owns
+from bus import publish, subscribe
+from shards import (
+    connect_deal,
+    connect_shard,
+    register_deal,
+    unregister_deal,
+    tenant_shards,
+    fan_out_totals
+)
+
+logger = logging.getLogger(__name__)
 
 DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 
@@ -31,41 +53,9 @@ def generate_trade_id():
     return f"TID{random.randint(100000, 999999)}"
 
 
-# ================================================================
-# 💬 Extract usernames from text (Buyer/Seller)
-# ================================================================
-
-def extract_user(text: str, key: str):
-    pattern = rf"{key}\s*[:\-]\s*(@\w+)"
-    m = re.search(pattern, text, re.IGNORECASE)
-    return m.group(1) if m else None
-
-
-# ================================================================
-# 💵 Extract Amount (supports: 100, 1k, 2.5k, 1m etc)
-# ================================================================
-
-def parse_amount(amount_str: str):
-    if not amount_str:
-        return None
-
-    s = amount_str.replace(",", "").lower()
-
-    # Pattern
-    m = re.match(r"(\d+(?:\.\d+)?)([km]?)", s)
-
-    if not m:
-        return None
-
-    value = float(m.group(1))
-    suffix = m.group(2)
-
-    if suffix == "k":
-        value *= 1000
-    elif suffix == "m":
-        value *= 1_000_000
-
-    return value
+def _in_scope(deal, update):
+    """Group admins cannot touch deals that belong to another group."""
+    return can_manage(deal, update.effective_user.id, tenant_id(update.effective_chat))
 
 
 # ================================================================
@@ -93,9 +83,8 @@ async def add_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return await msg.reply_text("❗ Invalid amount.", parse_mode="Markdown")
 
     # Extract Buyer/Seller
-    source = msg.reply_to_message.text or ""
-    buyer = extract_user(source, "buyer")
-    seller = extract_user(source, "seller")
+    form = parse_deal_form(msg.reply_to_message.text or "")
+    buyer, seller = form["buyer"], form["seller"]
 
     if not buyer or not seller:
         return await msg.reply_text(
@@ -105,35 +94,48 @@ async def add_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     trade_id = generate_trade_id()
 
-    conn = connect()
-    cur = conn.cursor()
-
     now = ist_now().isoformat()
     admin_user = update.effective_user
+    chat_id = tenant_id(update.effective_chat)
 
-    # Fees
-    percent, min_fee = get_fee()
+    # Fees (the group's own, else the global fee)
+    percent, min_fee = tenant(chat_id)["fee"]
     fee = max((amount * percent) / 100, min_fee)
     admin_earning = fee
 
-    # Save
-    cur.execute("""
-        INSERT INTO deals (
-            trade_id, buyer_username, seller_username,
-            created_by, created_by_username,
+    # Save: the catalog assigns the id, the group's shard stores the row
+    deal_id, shard = register_deal(trade_id, chat_id)
+
+    conn = connect_shard(shard)
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO deals (
+                id, trade_id, buyer_username, seller_username,
+                created_by, created_by_username,
+                amount, fee, admin_earning,
+                status, created_at, updated_at, chat_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            deal_id, trade_id, buyer, seller,
+            admin_user.id, format_username(admin_user),
             amount, fee, admin_earning,
-            status, created_at, updated_at
+            "active", now, now, chat_id
+        ))
+        add_participants(
+            cur, deal_id, buyer, seller,
+            admin_user.id, format_username(admin_user), "active", now,
+            resolve(buyer), resolve(seller)
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        trade_id, buyer, seller,
-        admin_user.id, format_username(admin_user),
-        amount, fee, admin_earning,
-        "active", now, now
-    ))
+        conn.commit()
+    except Exception:
+        unregister_deal(trade_id)
+        raise
+    finally:
+        conn.close()
 
-    conn.commit()
-    conn.close()
+    publish("dashboard", chat_id)
 
     text = (
         "💼 *New Escrow Deal Created*\n"
@@ -146,7 +148,7 @@ async def add_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"• Escrower: {format_username(admin_user)}\n"
     )
 
-    await reply_and_clean(update, text)
+    await reply_and_clean(msg, text, priority=PRIORITY_HIGH)
 
 
 # ================================================================
@@ -163,15 +165,15 @@ async def close_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not context.args:
         return await msg.reply_text("Usage: `/close <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
     deal = cur.fetchone()
 
-    if not deal:
+    if not deal or not _in_scope(deal, update):
         return await msg.reply_text("❗ No such Trade ID.", parse_mode="Markdown")
 
     if deal["status"] != "active":
@@ -182,9 +184,13 @@ async def close_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     now = ist_now().isoformat()
 
-    cur.execute("UPDATE deals SET status='released', updated_at=? WHERE trade_id=?", (now, trade_id))
+    set_deal_status(cur, deal["id"], "released", now)
     conn.commit()
     conn.close()
+    publish("deal", deal["id"])
+    forget_daily_summary(deal["created_at"][:10])
+
+    publish("dashboard", deal["chat_id"])
 
     txt = (
         "✅ *Funds Released*\n"
@@ -196,7 +202,7 @@ async def close_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"• Status: released\n"
     )
 
-    await reply_and_clean(update, txt)
+    await reply_and_clean(msg, txt, priority=PRIORITY_HIGH)
 
 
 # ================================================================
@@ -213,15 +219,15 @@ async def refund_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not context.args:
         return await msg.reply_text("Usage: `/refund <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
     deal = cur.fetchone()
 
-    if not deal:
+    if not deal or not _in_scope(deal, update):
         return await msg.reply_text("❗ Invalid Trade ID.", parse_mode="Markdown")
 
     if deal["status"] != "active":
@@ -232,9 +238,13 @@ async def refund_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     now = ist_now().isoformat()
 
-    cur.execute("UPDATE deals SET status='refunded', updated_at=? WHERE trade_id=?", (now, trade_id))
+    set_deal_status(cur, deal["id"], "refunded", now)
     conn.commit()
     conn.close()
+    publish("deal", deal["id"])
+    forget_daily_summary(deal["created_at"][:10])
+
+    publish("dashboard", deal["chat_id"])
 
     txt = (
         "♻️ *Deal Refunded*\n"
@@ -245,7 +255,7 @@ async def refund_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         f"• Seller: {deal['seller_username']}\n"
     )
 
-    await reply_and_clean(update, txt)
+    await reply_and_clean(msg, txt, priority=PRIORITY_HIGH)
 
 
 # ================================================================
@@ -262,15 +272,15 @@ async def cancel_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not context.args:
         return await msg.reply_text("Usage: `/cancel <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
     deal = cur.fetchone()
 
-    if not deal:
+    if not deal or not _in_scope(deal, update):
         return await msg.reply_text("❗ Invalid Trade ID.", parse_mode="Markdown")
 
     if deal["status"] != "active":
@@ -280,10 +290,14 @@ async def cancel_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
 
     now = ist_now().isoformat()
-    cur.execute("UPDATE deals SET status='cancelled', updated_at=? WHERE trade_id=?", (now, trade_id))
+    set_deal_status(cur, deal["id"], "cancelled", now)
 
     conn.commit()
     conn.close()
+    publish("deal", deal["id"])
+    forget_daily_summary(deal["created_at"][:10])
+
+    publish("dashboard", deal["chat_id"])
 
     txt = (
         "❌ *Deal Cancelled*\n"
@@ -294,7 +308,7 @@ async def cancel_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         f"• Seller: {deal['seller_username']}\n"
     )
 
-    await reply_and_clean(update, txt)
+    await reply_and_clean(msg, txt, priority=PRIORITY_HIGH)
 
 
 # ================================================================
@@ -311,22 +325,26 @@ async def update_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not context.args:
         return await msg.reply_text("Usage: `/update <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
     deal = cur.fetchone()
 
-    if not deal:
+    if not deal or not _in_scope(deal, update):
         return await msg.reply_text("❗ Invalid Trade ID.", parse_mode="Markdown")
 
     now = ist_now().isoformat()
 
-    cur.execute("UPDATE deals SET status='completed', updated_at=? WHERE trade_id=?", (now, trade_id))
+    set_deal_status(cur, deal["id"], "completed", now)
     conn.commit()
     conn.close()
+    publish("deal", deal["id"])
+    forget_daily_summary(deal["created_at"][:10])
+
+    publish("dashboard", deal["chat_id"])
 
     txt = (
         "🏁 *Deal Completed*\n"
@@ -338,7 +356,7 @@ async def update_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         f"• Status: completed\n"
     )
 
-    await reply_and_clean(update, txt)
+    await reply_and_clean(msg, txt, priority=PRIORITY_HIGH)
 
 
 # ================================================================
@@ -352,9 +370,9 @@ async def status_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not context.args:
         return await msg.reply_text("Usage: `/status <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
@@ -382,63 +400,67 @@ async def status_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 # 📂 ONGOING DEALS /ongoing
 # ================================================================
 
+def _scoped(sql, arg):
+    tenant_sql, params = scope(int(arg) if arg else GLOBAL_TENANT)
+    return f"{sql} AND {tenant_sql}", params
+
+
+ONGOING_PAGES = Paginator(
+    name="ongoing",
+    table="deals",
+    columns="trade_id, buyer_username, seller_username, amount",
+    # arg is the tenant (chat_id) the list was opened in
+    where=lambda arg, user: _scoped("status='active'", arg),
+    shards=lambda arg, user: tenant_shards(int(arg) if arg else GLOBAL_TENANT),
+    header=lambda arg: "📂 *Ongoing Deals*\n" + DIVIDER + "\n\n",
+    row=lambda r: (
+        f"`#{r['trade_id']}` | "
+        f"{escape_markdown(r['buyer_username'] or '')} → {escape_markdown(r['seller_username'] or '')} | "
+        f"₹{r['amount']:.2f}\n"
+    ),
+    empty="ℹ️ No ongoing deals.",
+    admin_only=True,
+)
+
+
 async def ongoing_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if not await ensure_bot_admin(update, context):
         return
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT trade_id, buyer_username, seller_username, amount
-        FROM deals
-        WHERE status='active'
-        ORDER BY id DESC
-    """)
-
-    rows = cur.fetchall()
-    conn.close()
-
-    if not rows:
-        return await update.message.reply_text("ℹ️ No ongoing deals.", parse_mode="Markdown")
-
-    txt = "📂 *Ongoing Deals*\n" + DIVIDER + "\n\n"
-
-    for r in rows:
-        txt += (
-            f"`#{r['trade_id']}` | "
-            f"{r['buyer_username']} → {r['seller_username']} | "
-            f"₹{r['amount']:.2f}\n"
-        )
-
-    await update.message.reply_text(txt, parse_mode="Markdown")
+    chat_id = tenant_id(update.effective_chat)
+    await ONGOING_PAGES.send(update.message, update.effective_user, arg=str(chat_id))
 
 
 # ================================================================
 # 💰 HOLDING AMOUNT /holding
 # ================================================================
 
-async def holding_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-
-    if not await ensure_bot_admin(update, context):
-        return
+def holding_text(chat_id=GLOBAL_TENANT):
+    tenant_sql, params = scope(chat_id)
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT COUNT(*) AS c, SUM(amount) AS total FROM deals WHERE status='active'")
-    row = cur.fetchone()
-    conn.close()
+    row = fan_out_totals(
+        f"SELECT COUNT(*) AS c, SUM(amount) AS total FROM deals "
+        f"WHERE status='active' AND {tenant_sql}",
+        params,
+        tenant_shards(chat_id)
+    )
 
-    txt = (
+    return (
         "💰 *Current Holding Amount*\n"
         f"{DIVIDER}\n"
         f"• Active Deals: `{row['c']}`\n"
-        f"• Total Holding: ₹{(row['total'] or 0):.2f}`\n"
+        f"• Total Holding: `₹{(row['total'] or 0):.2f}`\n"
     )
 
-    await update.message.reply_text(txt, parse_mode="Markdown")
+
+async def holding_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+
+    if not await ensure_bot_admin(update, context):
+        return
+
+    chat_id = tenant_id(update.effective_chat)
+    await update.message.reply_text(holding_text(chat_id), parse_mode="Markdown")
 
 
 # ================================================================
@@ -455,9 +477,9 @@ async def notify_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         return await msg.reply_text("Usage: `/notify <tradeid>`", parse_mode="Markdown")
 
-    trade_id = context.args[0].upper().replace("#", "")
+    trade_id = parse_trade_id(context.args[0])
 
-    conn = connect()
+    conn = connect_deal(trade_id)
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM deals WHERE trade_id=?", (trade_id,))
@@ -478,3 +500,102 @@ async def notify_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
     await update.message.reply_text(txt, parse_mode="Markdown")
+
+
+# ================================================================
+# 📌 LIVE DASHBOARD /livedash /stopdash
+# ================================================================
+
+DASHBOARD_DEBOUNCE = 5  # seconds; changes inside this window share one edit
+DASHBOARD_JOB = "live_dashboard_refresh"
+
+_dashboard_jobs = None  # this worker's JobQueue, see start_dashboards()
+
+
+def live_dashboard_text(chat_id):
+    return (
+        f"{holding_text(chat_id)}\n"
+        f"{ONGOING_PAGES.preview(str(chat_id))}\n"
+        f"🕒 Updated: `{ist_now().strftime('%d %b %I:%M:%S %p')}`"
+    )
+
+
+def start_dashboards(job_queue):
+    """Refresh this worker's dashboards on `job_queue` when their deals change."""
+    global _dashboard_jobs
+    _dashboard_jobs = job_queue
+
+
+def schedule_dashboard_refresh(chat_id):
+    """
+    "dashboard" subscriber: a deal of `chat_id` changed. Deals can be closed
+    from any chat, so the change goes over the bus and the worker owning the
+    group schedules the edit; bursts are coalesced into one.
+    """
+    jq = _dashboard_jobs
+    if jq is None or not owns(chat_id) or jq.get_jobs_by_name(DASHBOARD_JOB):
+        return
+
+    jq.run_once(refresh_live_dashboards, DASHBOARD_DEBOUNCE, name=DASHBOARD_JOB)
+
+
+subscribe("dashboard", schedule_dashboard_refresh)
+
+
+async def refresh_live_dashboards(context: ContextTypes.DEFAULT_TYPE):
+    dashboards = [d for d in get_dashboards() if owns(d["chat_id"])]
+    if not dashboards:
+        return
+
+    for d in dashboards:
+        # Each group's dashboard shows only that group's deals
+        text = live_dashboard_text(d["chat_id"])
+        try:
+            await context.bot.edit_message_text(
+                text,
+                chat_id=d["chat_id"],
+                message_id=d["message_id"],
+                parse_mode="Markdown"
+            )
+        except Forbidden:
+            # Bot kicked or blocked: this dashboard can never be edited again
+            remove_dashboard(d["chat_id"])
+        except BadRequest as e:
+            err = str(e).lower()
+            if "not modified" in err:
+                continue
+            if "not found" in err or "can't be edited" in err:
+                remove_dashboard(d["chat_id"])
+                continue
+            logger.warning("Dashboard refresh failed in %s: %s", d["chat_id"], e)
+        except TelegramError as e:
+            # Timeouts, flood waits: the next deal change tries again
+            logger.warning("Dashboard refresh failed in %s: %s", d["chat_id"], e)
+
+
+async def live_dashboard_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+
+    if not await ensure_bot_admin(update, context):
+        return
+
+    chat = update.effective_chat
+    if chat.type not in ["group", "supergroup"]:
+        return await update.message.reply_text("❗ This command can only be used in groups.")
+
+    sent = await context.bot.send_message(chat.id, live_dashboard_text(chat.id), parse_mode="Markdown")
+    set_dashboard(chat.id, sent.message_id)
+
+    try:
+        await sent.pin(disable_notification=True)
+    except TelegramError:
+        await update.message.reply_text("ℹ️ Dashboard posted. Give me pin rights to pin it.")
+
+
+async def stop_dashboard_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+
+    if not await ensure_bot_admin(update, context):
+        return
+
+    remove_dashboard(update.effective_chat.id)
+
+    await update.message.reply_text("🛑 Live dashboard stopped.", parse_mode="Markdown")
@@ -0,0 +1,221 @@
+# handlers/digest.py
+# Scheduled daily / weekly digests
+# Every day at DIGEST_TIME (IST, off-peak) one worker recounts the last
+# DIGEST_DAYS finished days into daily_summaries, one grouped pass over
+# each shard's idx_deals_created range for every tenant at once. It then
+# posts yesterday's digest (text + PDF of the day's deals) to each
+# configured log channel, and on DIGEST_WEEKDAY the last 7 days (text +
+# per-day PDF). period_summary() (/today, /week, the digests) reads those
+# days from daily_summaries and only counts days not summarized yet,
+# normally just today. Closing, refunding, cancelling or updating a deal
+# drops the summary of the day it was created, so that day is counted
+# live again until the next digest recomputes it.
+# Rendered digests (text + PDF) are cached per tenant and day, tagged with
+# the computed_at of the summaries they were built from: a recount or a
+# dropped summary changes the tag, and days still counted live are never
+# cached. /digest re-runs and tenants with several log channels reuse them.
+# Counting and PDF building run in a thread so updates keep flowing.
+
+import asyncio
+import logging
+import time
+from datetime import time as dtime, timedelta, timezone
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import DIGEST_DAYS, DIGEST_TIME, DIGEST_WEEKDAY, OWNER_ID
+from cache import TTLCache
+from database import GLOBAL_TENANT, list_logs, save_daily_summaries, summary_stamps
+from cluster import owns
+from handlers.user import period_summary
+from outbound import PRIORITY_LOW
+from shards import fan_out, tenant_shards
+from tenancy import scope
+from utils import IST_OFFSET, build_pdf, build_summary_pdf, divider, ist_now
+
+logger = logging.getLogger(__name__)
+
+MAX_PDF_DEALS = 2000   # deals listed in a daily digest PDF
+DIGEST_CACHE_TTL = 2 * 86400
+
+DIGEST_JOB = "digest"
+
+_IST = timezone(IST_OFFSET)
+
+# (kind, chat_id, last day) -> (summary stamps, text, pdf)
+_rendered = TTLCache(ttl=DIGEST_CACHE_TTL, maxsize=256)
+
+
+# ============================================================
+# 🧮 PRECOMPUTE
+# ============================================================
+
+def compute_daily_summaries(first_day, last_day):
+    """Recount [first_day, last_day] (IST dates) for every tenant; returns rows saved."""
+    days = []
+    day = first_day
+    while day <= last_day:
+        days.append(str(day))
+        day += timedelta(days=1)
+
+    # GROUP BY ordinals: "chat_id" alone would be ambiguous on PostgreSQL
+    merged = {}
+    for r in fan_out("""
+        SELECT COALESCE(chat_id, 0) AS chat_id, SUBSTR(created_at, 1, 10) AS day,
+               COUNT(*) AS total,
+               SUM(amount) AS volume,
+               SUM(CASE WHEN status IN ('completed','released') THEN 1 ELSE 0 END) AS completed,
+               SUM(CASE WHEN status='active' THEN 1 ELSE 0 END) AS active
+        FROM deals
+        WHERE created_at >= ? AND created_at < ?
+        GROUP BY 1, 2
+    """, (days[0], str(last_day + timedelta(days=1)))):
+        # Private-chat deals (chat 0) only count towards the global tenant
+        keys = [(GLOBAL_TENANT, r["day"])]
+        if r["chat_id"] != GLOBAL_TENANT:
+            keys.append((r["chat_id"], r["day"]))
+        for key in keys:
+            totals = merged.setdefault(key, [0, 0.0, 0, 0])
+            for i, column in enumerate(("total", "volume", "completed", "active")):
+                totals[i] += r[column] or 0
+
+    # The global row marks a day as computed, even with no deals
+    for d in days:
+        merged.setdefault((GLOBAL_TENANT, d), [0, 0.0, 0, 0])
+
+    rows = [(chat_id, d, *totals) for (chat_id, d), totals in merged.items()]
+    save_daily_summaries(days, rows, time.time())
+    return len(rows)
+
+
+# ============================================================
+# 📰 DIGESTS
+# ============================================================
+
+def _summary_text(title, period, s):
+    return (
+        f"📰 *{title}*\n{divider()}\n"
+        f"🗓 {period}\n"
+        f"• Deals: {s['total']}\n"
+        f"• Volume: ₹{s['volume']:.2f}\n"
+        f"• Completed: {s['completed']}\n"
+        f"• Active: {s['active']}\n"
+        f"• Cancelled: {s['cancelled']}"
+    )
+
+
+def _cached(kind, chat_id, first_day, last_day, build):
+    """build() -> (text, pdf), reused while the days' summaries are unchanged."""
+    stamps = summary_stamps(first_day, last_day)
+    if len(stamps) < (last_day - first_day).days + 1:
+        return build()  # Some day is still counted live
+
+    key = (kind, chat_id, str(last_day))
+    stamps = tuple(sorted(stamps.items()))
+    cached = _rendered.get(key)
+    if cached and cached[0] == stamps:
+        return cached[1:]
+
+    text, pdf = build()
+    _rendered.set(key, (stamps, text, pdf))
+    return text, pdf
+
+
+def daily_digest(chat_id, day):
+    """(text, pdf) for one tenant's deals created on `day`."""
+    return _cached("daily", chat_id, day, day, lambda: _build_daily(chat_id, day))
+
+
+def weekly_digest(chat_id, last_day):
+    """(text, pdf) for the 7 days ending with `last_day`."""
+    first_day = last_day - timedelta(days=6)
+    return _cached("weekly", chat_id, first_day, last_day, lambda: _build_weekly(chat_id, last_day))
+
+
+def _build_daily(chat_id, day):
+    s = period_summary(chat_id, day, day + timedelta(days=1))
+    text = _summary_text("Daily Digest", day.strftime("%d %b %Y"), s)
+
+    tenant_sql, params = scope(chat_id)
+    rows = fan_out(f"""
+        SELECT * FROM deals
+        WHERE {tenant_sql} AND created_at >= ? AND created_at < ?
+        ORDER BY id LIMIT {MAX_PDF_DEALS}
+    """, (*params, str(day), str(day + timedelta(days=1))), tenant_shards(chat_id))
+    rows.sort(key=lambda r: r["id"])
+    rows = rows[:MAX_PDF_DEALS]
+
+    title = f"Deals of {day.strftime('%d %b %Y')}"
+    if s["total"] > len(rows):
+        title += f" (first {len(rows)} of {s['total']})"
+    return text, build_pdf(rows, title=title)
+
+
+def _build_weekly(chat_id, last_day):
+    first_day = last_day - timedelta(days=6)
+    s = period_summary(chat_id, first_day, last_day + timedelta(days=1))
+    period = f"{first_day.strftime('%d %b')} – {last_day.strftime('%d %b %Y')}"
+    text = _summary_text("Weekly Digest", period, s)
+
+    days = []
+    for i in range(7):
+        day = first_day + timedelta(days=i)
+        days.append({"day": str(day), **period_summary(chat_id, day, day + timedelta(days=1))})
+    days.append({"day": "Total", **s})
+    return text, build_summary_pdf(days, title=f"Weekly Digest · {period}")
+
+
+async def _post(bot, log_chat_id, text, pdf, filename):
+    rate = {"priority": PRIORITY_LOW}
+    try:
+        await bot.send_message(log_chat_id, text, parse_mode="Markdown", rate_limit_args=rate)
+        await bot.send_document(log_chat_id, pdf, filename=filename, rate_limit_args=rate)
+    except Exception:
+        logger.exception("Could not post digest to %s", log_chat_id)
+
+
+async def run_digests(bot, weekly=None):
+    """Recount recent days, then post the digests to every log channel."""
+    today = ist_now().date()
+    yesterday = today - timedelta(days=1)
+    if weekly is None:
+        weekly = today.weekday() == DIGEST_WEEKDAY
+
+    started = time.perf_counter()
+    saved = await asyncio.to_thread(compute_daily_summaries, today - timedelta(days=DIGEST_DAYS), yesterday)
+    logger.info("📰 Daily summaries: %s rows in %.1fs", saved, time.perf_counter() - started)
+
+    for group_id, log_chat_id in list_logs():
+        text, pdf = await asyncio.to_thread(daily_digest, group_id, yesterday)
+        await _post(bot, log_chat_id, text, pdf, f"digest_{yesterday}.pdf")
+
+        if weekly:
+            text, pdf = await asyncio.to_thread(weekly_digest, group_id, yesterday)
+            await _post(bot, log_chat_id, text, pdf, f"weekly_{yesterday}.pdf")
+
+
+async def digest_job(context: ContextTypes.DEFAULT_TYPE):
+    # Every cluster worker schedules the job; the one owning the global tenant runs it
+    if not owns(GLOBAL_TENANT):
+        return
+    await run_digests(context.bot)
+
+
+def schedule_digests(job_queue):
+    hour, minute = (int(x) for x in DIGEST_TIME.split(":"))
+    job_queue.run_daily(digest_job, dtime(hour, minute, tzinfo=_IST), name=DIGEST_JOB)
+
+
+# ============================================================
+# 🔁 /digest — Run Now (OWNER ONLY)
+# ============================================================
+
+async def digest_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return await update.message.reply_text("⛔ *Owner only command!*", parse_mode="Markdown")
+
+    weekly = bool(context.args) and context.args[0].lower() == "week"
+    await update.message.reply_text("📰 Building digests...")
+    await run_digests(context.bot, weekly=weekly or None)
+    await update.message.reply_text("✅ Digests posted to the log channels.")
@@ -4,9 +4,41 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
+from telegram.error import TelegramError
 
-from database import connect
+from database import connect, get_group_settings
 from utils import DIVIDER, format_username
+from pagination import Paginator
+from cache import TTLCache
+from bus import subscribe, publish
+
+
+# ============================================================
+# ⚙️ PER-GROUP SETTINGS CACHE
+# ============================================================
+
+SETTINGS_TTL = 600          # seconds; writes below invalidate immediately
+WELCOME_BATCH_DELAY = 3     # seconds to collect a burst of joins into one message
+WELCOME_BATCH_MAX = 30      # members named in one welcome message
+
+SETTINGS_CACHE = TTLCache(ttl=SETTINGS_TTL)
+subscribe("group_settings", SETTINGS_CACHE.invalidate)
+subscribe("reset", lambda key: SETTINGS_CACHE.invalidate())
+
+# chat_id -> members waiting for the batched welcome
+_pending_welcomes = {}
+
+# chat_id -> message_id of the last welcome, deleted when the next one is sent
+_last_welcome = {}
+
+
+def group_settings(chat_id):
+    """Cached groups row as a dict ({} when the group is not registered)."""
+    def load():
+        row = get_group_settings(chat_id)
+        return dict(row) if row else {}
+
+    return SETTINGS_CACHE.get_or_set(chat_id, load)
 
 
 # ============================================================
@@ -22,13 +54,15 @@ async def set_group_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     conn = connect()
     cur = conn.cursor()
 
-    cur.execute(
-        "INSERT OR REPLACE INTO groups (chat_id, welcome_enabled) VALUES (?, ?)",
-        (chat.id, 1),
-    )
+    cur.execute("""
+        INSERT INTO groups (chat_id, welcome_enabled) VALUES (?, 1)
+        ON CONFLICT (chat_id) DO UPDATE SET welcome_enabled = 1
+    """, (chat.id,))
     conn.commit()
     conn.close()
 
+    publish("group_settings", chat.id)
+
     await update.message.reply_text(
         f"✅ Group successfully registered.\n\n"
         f"Chat ID: `{chat.id}`",
@@ -50,6 +84,8 @@ async def remove_group_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     conn.commit()
     conn.close()
 
+    publish("group_settings", chat.id)
+
     await update.message.reply_text("❌ Group removed from system.")
 
 
@@ -57,24 +93,19 @@ async def remove_group_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 # 📋 /groups — List all registered groups
 # ============================================================
 
-async def groups_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT chat_id, welcome_enabled FROM groups")
-    rows = cur.fetchall()
-    conn.close()
-
-    if not rows:
-        return await update.message.reply_text("ℹ️ No groups registered.")
+GROUP_PAGES = Paginator(
+    name="groups",
+    table="groups",
+    columns="chat_id, welcome_enabled",
+    where=lambda arg, user: ("", ()),
+    header=lambda arg: "📋 *Registered Groups*\n" + DIVIDER + "\n\n",
+    row=lambda g: f"• `{g['chat_id']}` — {'🟢 ON' if g['welcome_enabled'] else '🔴 OFF'}\n",
+    empty="ℹ️ No groups registered.",
+)
 
-    text = "📋 *Registered Groups*\n" + DIVIDER + "\n\n"
 
-    for g in rows:
-        status = "🟢 ON" if g["welcome_enabled"] else "🔴 OFF"
-        text += f"• `{g['chat_id']}` — {status}\n"
-
-    await update.message.reply_text(text, parse_mode="Markdown")
+async def groups_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await GROUP_PAGES.send(update.message, update.effective_user)
 
 
 # ============================================================
@@ -92,12 +123,18 @@ async def set_welcome_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     cur = conn.cursor()
 
     cur.execute(
-        "UPDATE groups SET welcome_message=? WHERE chat_id=?",
+        "UPDATE groups SET welcome_text=? WHERE chat_id=?",
         (text, chat.id)
     )
+    updated = cur.rowcount
     conn.commit()
     conn.close()
 
+    if not updated:
+        return await update.message.reply_text("❗ Group not registered. Use /setgroup first.")
+
+    publish("group_settings", chat.id)
+
     await update.message.reply_text("✨ Welcome message updated!")
 
 
@@ -119,12 +156,18 @@ async def set_farewell_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     cur = conn.cursor()
 
     cur.execute(
-        "UPDATE groups SET farewell_message=? WHERE chat_id=?",
+        "UPDATE groups SET farewell_text=? WHERE chat_id=?",
         (text, chat.id)
     )
+    updated = cur.rowcount
     conn.commit()
     conn.close()
 
+    if not updated:
+        return await update.message.reply_text("❗ Group not registered. Use /setgroup first.")
+
+    publish("group_settings", chat.id)
+
     await update.message.reply_text("✨ Farewell message updated!")
 
 
@@ -142,6 +185,7 @@ async def toggle_welcome_handler(update: Update, context: ContextTypes.DEFAULT_T
     row = cur.fetchone()
 
     if not row:
+        conn.close()
         return await update.message.reply_text("❗ Group not registered. Use /setgroup first.")
 
     new_status = 0 if row["welcome_enabled"] else 1
@@ -153,33 +197,69 @@ async def toggle_welcome_handler(update: Update, context: ContextTypes.DEFAULT_T
     conn.commit()
     conn.close()
 
+    publish("group_settings", chat.id)
+
     status_text = "🟢 Enabled" if new_status else "🔴 Disabled"
 
     await update.message.reply_text(f"Welcome system {status_text}!")
 
 
 # ============================================================
-# 🤝 AUTO-WELCOME
+# 🤝 AUTO-WELCOME (batched)
 # ============================================================
 
 async def welcome_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = update.effective_chat
-    member = update.message.new_chat_members[0]
 
-    conn = connect()
-    cur = conn.cursor()
+    settings = group_settings(chat.id)
+    if not settings.get("welcome_enabled"):
+        return
 
-    cur.execute("SELECT welcome_message, welcome_enabled FROM groups WHERE chat_id=?", (chat.id,))
-    row = cur.fetchone()
-    conn.close()
+    members = [m for m in update.message.new_chat_members if not m.is_bot]
+    if not members:
+        return
+
+    pending = _pending_welcomes.setdefault(chat.id, [])
+    first = not pending
+    pending.extend(members)
+
+    if context.job_queue is None:
+        return await send_welcome(context.bot, chat.id)
+
+    # A burst of joins shares one welcome, sent WELCOME_BATCH_DELAY later
+    if first:
+        context.job_queue.run_once(
+            send_welcome_job, WELCOME_BATCH_DELAY, chat_id=chat.id, name=f"welcome:{chat.id}"
+        )
 
-    if not row or not row["welcome_enabled"]:
+
+async def send_welcome_job(context: ContextTypes.DEFAULT_TYPE):
+    await send_welcome(context.bot, context.job.chat_id)
+
+
+async def send_welcome(bot, chat_id):
+    members = _pending_welcomes.pop(chat_id, [])
+    settings = group_settings(chat_id)
+    if not members or not settings.get("welcome_enabled"):
         return
 
-    text = row["welcome_message"] or "👋 Welcome {user}!"
-    text = text.replace("{user}", format_username(member))
+    names = [format_username(m) for m in members[:WELCOME_BATCH_MAX]]
+    if len(members) > WELCOME_BATCH_MAX:
+        names.append(f"+{len(members) - WELCOME_BATCH_MAX} more")
 
-    await update.message.reply_text(text)
+    text = settings.get("welcome_text") or "👋 Welcome {user}!"
+    text = text.replace("{user}", ", ".join(names))
+
+    # Only keep the newest welcome in the chat
+    previous = _last_welcome.pop(chat_id, None)
+    if previous:
+        try:
+            await bot.delete_message(chat_id, previous)
+        except TelegramError:
+            pass
+
+    sent = await bot.send_message(chat_id, text)
+    _last_welcome[chat_id] = sent.message_id
 
 
 # ============================================================
@@ -190,17 +270,11 @@ async def farewell_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = update.effective_chat
     member = update.message.left_chat_member
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT farewell_message, welcome_enabled FROM groups WHERE chat_id=?", (chat.id,))
-    row = cur.fetchone()
-    conn.close()
-
-    if not row or not row["welcome_enabled"]:
+    settings = group_settings(chat.id)
+    if not settings.get("welcome_enabled") or member.is_bot:
         return
 
-    text = row["farewell_message"] or "👋 Goodbye {user}!"
+    text = settings.get("farewell_text") or "👋 Goodbye {user}!"
     text = text.replace("{user}", format_username(member))
 
     await update.message.reply_text(text)
@@ -0,0 +1,191 @@
+# handlers/inline.py
+# Inline mode: typing "@bot TID123456" or "@bot @username" in any chat
+# offers deal cards to share (enable inline mode with @BotFather /setinline).
+# Cards are served from DEAL_CARDS, an LRU cache of recently looked-up
+# deals, dropped whenever a deal changes (bus topic "deal"). Partial trade
+# ids ("TID12") are completed with a range scan on deal_catalog's
+# UNIQUE(trade_id) index, so one query finds the shards of every match.
+# Telegram caches each answer for INLINE_CACHE_TIME seconds on its side.
+
+import re
+from collections import defaultdict
+
+from telegram import InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from bus import subscribe
+from cache import LRUCache, TTLCache
+from database import connect
+from identity import resolve, usernames
+from parsing import normalize_username, parse_trade_id
+from participants import deals_of
+from shards import connect_shard, fan_out
+from utils import ist_format
+
+DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+
+MAX_RESULTS = 10
+INLINE_CACHE_TIME = 30      # seconds Telegram reuses an answer (statuses change)
+CARD_CACHE_SIZE = 20_000    # deal cards kept in memory
+CARD_TTL = 600              # seconds; deal changes invalidate sooner
+
+CARD_COLUMNS = "id, trade_id, buyer_username, seller_username, amount, status, created_at, updated_at"
+
+_TRADE_ID = re.compile(r"^#?(?:TID)?\d*$", re.I)
+
+DEAL_CARDS = LRUCache(maxsize=CARD_CACHE_SIZE, ttl=CARD_TTL)
+_TRADE_IDS = {}  # deal id -> trade id of every card cached (bus keys are ids)
+
+# normalized username -> newest trade ids (matches INLINE_CACHE_TIME)
+_USER_DEALS = TTLCache(ttl=INLINE_CACHE_TIME, maxsize=4096)
+
+
+def _forget(deal_id):
+    trade_id = _TRADE_IDS.pop(deal_id, None)
+    if trade_id is not None:
+        DEAL_CARDS.invalidate(trade_id)
+
+
+def _forget_all(key=None):
+    DEAL_CARDS.invalidate()
+    _TRADE_IDS.clear()
+    _USER_DEALS.invalidate()
+
+
+subscribe("deal", _forget)
+subscribe("reset", _forget_all)
+
+
+# ============================================================
+# 🔎 LOOKUPS
+# ============================================================
+
+def _remember(row):
+    if len(_TRADE_IDS) >= 2 * CARD_CACHE_SIZE:
+        _forget_all()
+    _TRADE_IDS[row["id"]] = row["trade_id"]
+    DEAL_CARDS.set(row["trade_id"], {k: row[k] for k in row.keys()})
+
+
+def _load_cards(located):
+    """[(trade_id, shard)] -> cards in the same order, from cache or shards."""
+    missing = defaultdict(list)
+    for trade_id, shard in located:
+        if DEAL_CARDS.get(trade_id) is None:
+            missing[shard].append(trade_id)
+
+    for shard, trade_ids in missing.items():
+        conn = connect_shard(shard)
+        cur = conn.cursor()
+        cur.execute(
+            f"SELECT {CARD_COLUMNS} FROM deals WHERE trade_id IN ({', '.join('?' * len(trade_ids))})",
+            trade_ids
+        )
+        for row in cur.fetchall():
+            _remember(row)
+        conn.close()
+
+    cards = (DEAL_CARDS.get(trade_id) for trade_id, _ in located)
+    return [c for c in cards if c is not None]
+
+
+def cards_by_trade_id(text):
+    """Deals whose trade id starts with `text` (TID123, #tid123, 123)."""
+    prefix = parse_trade_id(text)
+    if not prefix.startswith("TID"):
+        prefix = "TID" + prefix
+
+    # Complete trade id already cached: no query at all
+    card = DEAL_CARDS.get(prefix)
+    if card is not None:
+        return [card]
+
+    # [prefix, prefix with its last character bumped) is a B-tree range
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT trade_id, shard FROM deal_catalog WHERE trade_id >= ? AND trade_id < ? "
+        "ORDER BY trade_id LIMIT ?",
+        (prefix, upper, MAX_RESULTS)
+    )
+    located = [(r["trade_id"], r["shard"]) for r in cur.fetchall()]
+    conn.close()
+    return _load_cards(located)
+
+
+def cards_by_username(text):
+    """Newest deals where @user was buyer or seller."""
+    key = normalize_username(text)
+    if not key:
+        return []
+
+    def newest():
+        user_id = resolve(key)
+        names = usernames(user_id, key) if user_id else [key]
+        ids_sql, params = deals_of(names, user_id, roles=("buyer", "seller"))
+        rows = fan_out(f"""
+            SELECT {CARD_COLUMNS} FROM deals
+            WHERE id IN ({ids_sql})
+            ORDER BY id DESC LIMIT {MAX_RESULTS}
+        """, params)
+        rows.sort(key=lambda r: r["id"], reverse=True)
+        for row in rows[:MAX_RESULTS]:
+            _remember(row)
+        return [r["trade_id"] for r in rows[:MAX_RESULTS]]
+
+    cards = (DEAL_CARDS.get(t) for t in _USER_DEALS.get_or_set(key, newest))
+    return [c for c in cards if c is not None]
+
+
+# ============================================================
+# 🃏 DEAL CARD
+# ============================================================
+
+def deal_card_text(card):
+    return (
+        "📄 *Escrow Deal*\n"
+        f"{DIVIDER}\n"
+        f"• Trade ID: `#{card['trade_id']}`\n"
+        f"• Buyer: {escape_markdown(card['buyer_username'] or '')}\n"
+        f"• Seller: {escape_markdown(card['seller_username'] or '')}\n"
+        f"• Amount: ₹{card['amount']:.2f}\n"
+        f"• Status: `{card['status']}`\n"
+        f"• Created: `{ist_format(card['created_at'])}`\n"
+        f"• Updated: `{ist_format(card['updated_at'])}`\n"
+    )
+
+
+def _result(card):
+    return InlineQueryResultArticle(
+        id=card["trade_id"],
+        title=f"#{card['trade_id']} · ₹{card['amount']:.2f} · {card['status']}",
+        description=f"{card['buyer_username']} → {card['seller_username']}",
+        input_message_content=InputTextMessageContent(deal_card_text(card), parse_mode=ParseMode.MARKDOWN),
+    )
+
+
+# ============================================================
+# 📨 INLINE QUERY
+# ============================================================
+
+async def inline_deal_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.inline_query
+    text = query.query.strip()
+
+    if not text:
+        cards = []
+    elif text.startswith("@"):
+        cards = cards_by_username(text)
+    elif _TRADE_ID.match(text):
+        cards = cards_by_trade_id(text)
+    else:
+        cards = cards_by_username(text)
+
+    await query.answer(
+        [_result(c) for c in cards],
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=False,
+    )
@@ -6,10 +6,10 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 
-from database import connect
+from database import set_logs, remove_logs
 from utils import DIVIDER, format_username
-
-OWNER_ID = 6847499628
+from tenancy import tenant, tenant_id, invalidate_tenant
+from config import OWNER_ID
 
 
 # ============================================================
@@ -58,14 +58,11 @@ async def set_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         return await update.message.reply_text("Usage: `/setlogs <chat_id>`", parse_mode="Markdown")
 
-    chat_id = context.args[0]
-
-    conn = connect()
-    cur = conn.cursor()
+    chat_id = int(context.args[0])
+    group_id = tenant_id(update.effective_chat)
 
-    cur.execute("INSERT OR REPLACE INTO logs (id, chat_id) VALUES (1, ?)", (chat_id,))
-    conn.commit()
-    conn.close()
+    set_logs(chat_id, group_id)
+    invalidate_tenant(group_id)
 
     await update.message.reply_text(
         "📡 Logging channel updated successfully!",
@@ -83,12 +80,10 @@ async def remove_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     if user.id != OWNER_ID:
         return await update.message.reply_text("⛔ *Owner only command!*", parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
+    group_id = tenant_id(update.effective_chat)
 
-    cur.execute("DELETE FROM logs WHERE id=1")
-    conn.commit()
-    conn.close()
+    remove_logs(group_id)
+    invalidate_tenant(group_id)
 
     await update.message.reply_text(
         "🧹 Logging disabled!",
@@ -101,19 +96,13 @@ async def remove_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 # ============================================================
 
 async def show_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT chat_id FROM logs WHERE id=1")
-    row = cur.fetchone()
-
-    conn.close()
+    log_id = tenant(tenant_id(update.effective_chat))["logs"]
 
-    if not row:
+    if not log_id:
         return await update.message.reply_text("ℹ️ Logging is currently disabled.")
 
     await update.message.reply_text(
-        f"📡 *Current Logging Channel:* `{row['chat_id']}`",
+        f"📡 *Current Logging Channel:* `{log_id}`",
         parse_mode="Markdown"
     )
 
@@ -123,19 +112,11 @@ async def show_logs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def test_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    conn = connect()
-    cur = conn.cursor()
+    log_id = tenant(tenant_id(update.effective_chat))["logs"]
 
-    cur.execute("SELECT chat_id FROM logs WHERE id=1")
-    row = cur.fetchone()
-
-    conn.close()
-
-    if not row:
+    if not log_id:
         return await update.message.reply_text("⚠️ Logging is disabled.")
 
-    log_id = row["chat_id"]
-
     await send_log(context, log_id, "🧪 *Log Test Successful!*")
 
     await update.message.reply_text(
@@ -1,82 +1,356 @@
 # handlers/moderation.py
 # All moderation features: warnings, bans, mute, kick, notes etc.
 
-from telegram import Update
-from telegram.ext import ContextTypes
+import asyncio
+import time
+
+from telegram import Update, ChatPermissions
+from telegram.ext import ContextTypes, ApplicationHandlerStop
 from telegram.constants import ParseMode
+from telegram.error import TelegramError
+from telegram.helpers import escape_markdown
+
+from database import (
+    connect,
+    add_warn,
+    mark_escalated,
+    remove_warn,
+    clear_warns,
+    get_warn_count,
+    add_ban,
+    remove_ban,
+    list_bans,
+    remove_warn_by_id,
+    set_warn_rule,
+    remove_warn_rule,
+    get_warn_rules,
+    set_warn_expiry,
+    get_warn_expiry,
+    add_scheduled_action,
+    remove_scheduled_action,
+    get_scheduled_actions,
+    record_joins,
+    joined_since
+)
+from utils import ensure_bot_admin, format_username, ist_now, DIVIDER
+from identity import resolve
+from pagination import Paginator
+from parsing import parse_duration, format_duration
+from bus import subscribe, publish
+from cluster import owns
+
+
+# ============================================================
+# 🚫 IN-MEMORY BAN SET (checked before every update)
+# ============================================================
+
+BANNED = set()  # {(group_id, user_id)}
+
+
+def load_bans():
+    """(Re)load the ban set from the database; called at startup."""
+    BANNED.clear()
+    BANNED.update((r["group_id"], r["user_id"]) for r in list_bans())
+
+
+async def ban_gate_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Registered in group -2: drop updates from users banned in that chat."""
+    chat, user = update.effective_chat, update.effective_user
+    if chat is None or user is None:
+        return
 
-from database import connect
-from utils import format_username, DIVIDER
+    if (chat.id, user.id) in BANNED:
+        raise ApplicationHandlerStop
 
 
 # ============================================================
-# ⚠️ /warn — Give a warning
+# 🎯 Resolve command target (reply, user ID or @username)
 # ============================================================
 
-async def warn_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args:
-        return await update.message.reply_text("Usage: `/warn @user`", parse_mode="Markdown")
+def resolve_target(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Return (user_id, label, rest_args). user_id is None when the
+    target can't be resolved.
+    """
+    msg = update.message
+    args = list(context.args or [])
 
-    target = context.args[0].lower()
+    if msg.reply_to_message:
+        user = msg.reply_to_message.from_user
+        return user.id, format_username(user), args
 
-    conn = connect()
-    cur = conn.cursor()
+    if not args:
+        return None, None, args
 
-    cur.execute("INSERT INTO warns (username) VALUES (?)", (target,))
-    conn.commit()
-    conn.close()
+    arg, rest = args[0], args[1:]
+
+    if arg.lstrip("-").isdigit():
+        return int(arg), f"`{arg}`", rest
+
+    return resolve(arg), arg, rest
+
+
+async def _unresolved(update, label, usage):
+    if label is None:
+        return await update.message.reply_text(usage, parse_mode="Markdown")
 
     await update.message.reply_text(
-        f"⚠️ Warning added to {target}.",
+        f"❗ I don't know {label} yet. Reply to one of their messages or use their ID.",
         parse_mode="Markdown"
     )
 
 
 # ============================================================
-# 🧹 /dwarn — Remove 1 warning
+# 📈 ESCALATION ENGINE (warn thresholds + timed actions)
 # ============================================================
 
-async def unwarn_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args:
-        return await update.message.reply_text("Usage: `/dwarn @user`", parse_mode="Markdown")
+MUTED = ChatPermissions(can_send_messages=False)
+UNMUTED = ChatPermissions.all_permissions()
 
-    user = context.args[0].lower()
+ESCALATION_ACTIONS = ("mute", "ban", "kick")
 
-    conn = connect()
-    cur = conn.cursor()
+# group_id -> ({warns: (action, duration)}, expiry); dropped on rule changes
+RULES_CACHE = {}
+subscribe("warn_rules", lambda group_id: RULES_CACHE.pop(group_id, None))
+subscribe("reset", lambda key: (load_bans(), RULES_CACHE.clear()))
+
+
+def get_group_rules(group_id):
+    cached = RULES_CACHE.get(group_id)
+    if cached is None:
+        rules = {r["warns"]: (r["action"], r["duration"]) for r in get_warn_rules(group_id)}
+        cached = RULES_CACHE[group_id] = (rules, get_warn_expiry(group_id))
+    return cached
+
+
+def schedule_action(job_queue, action, group_id, user_id, delay, ref=None):
+    """Persist a timed action and queue it on the JobQueue."""
+    run_at = time.time() + delay
+    action_id = add_scheduled_action(action, group_id, user_id, run_at, ref)
+    _queue_action(job_queue, action_id, action, group_id, user_id, ref, run_at)
+
+
+def _queue_action(job_queue, action_id, action, group_id, user_id, ref, run_at):
+    if job_queue is None:
+        return
+
+    job_queue.run_once(
+        run_scheduled_action,
+        max(run_at - time.time(), 0),
+        data={"id": action_id, "action": action, "group_id": group_id,
+              "user_id": user_id, "ref": ref},
+        name=f"modaction:{action_id}",
+    )
 
-    cur.execute("DELETE FROM warns WHERE username=? LIMIT 1", (user,))
-    conn.commit()
-    conn.close()
+
+def restore_scheduled_actions(job_queue):
+    """Re-queue actions saved before a restart; overdue ones run at once."""
+    for r in get_scheduled_actions():
+        # With several workers each one re-queues only its own groups
+        if not owns(r["group_id"]):
+            continue
+        _queue_action(job_queue, r["id"], r["action"], r["group_id"],
+                      r["user_id"], r["ref"], r["run_at"])
+
+
+async def run_scheduled_action(context: ContextTypes.DEFAULT_TYPE):
+    data = context.job.data
+    group_id, user_id = data["group_id"], data["user_id"]
+
+    try:
+        if data["action"] == "unmute":
+            await context.bot.restrict_chat_member(group_id, user_id, UNMUTED)
+        elif data["action"] == "unban":
+            remove_ban(group_id, user_id)
+            BANNED.discard((group_id, user_id))
+            await context.bot.unban_chat_member(group_id, user_id, only_if_banned=True)
+        elif data["action"] == "expire_warn":
+            remove_warn_by_id(data["ref"])
+    except TelegramError:
+        pass  # User left / bot lost rights; nothing left to undo
+    finally:
+        remove_scheduled_action(data["id"])
+
+
+async def escalate(context, group_id, user_id, label, action, duration):
+    """Apply a warn rule and return a line describing what happened."""
+    until = f" for `{format_duration(duration)}`" if duration else ""
+
+    try:
+        if action == "mute":
+            await context.bot.restrict_chat_member(group_id, user_id, MUTED)
+            if duration:
+                schedule_action(context.job_queue, "unmute", group_id, user_id, duration)
+            return f"🔇 {label} auto-muted{until}."
+
+        if action == "ban":
+            add_ban(group_id, user_id, "warn limit", context.bot.id, ist_now().isoformat())
+            BANNED.add((group_id, user_id))
+            await context.bot.ban_chat_member(group_id, user_id)
+            if duration:
+                schedule_action(context.job_queue, "unban", group_id, user_id, duration)
+            return f"🚫 {label} auto-banned{until}."
+
+        if action == "kick":
+            await context.bot.ban_chat_member(group_id, user_id)
+            await context.bot.unban_chat_member(group_id, user_id)
+            return f"👢 {label} auto-kicked."
+    except TelegramError:
+        return f"❗ Could not {action} {label} (missing rights?)."
+
+    return ""
+
+
+# ============================================================
+# 📏 /setwarnrule /delwarnrule /warnrules /warnexpiry
+# ============================================================
+
+async def set_warn_rule_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
+
+    args = context.args or []
+    usage = (
+        "Usage: `/setwarnrule <warns> <mute|ban|kick> [duration]`\nExample: `/setwarnrule 3 mute 24h`\n"
+        "A warn applies the highest rule reached, once; falling below it re-arms the rule."
+    )
+
+    if len(args) < 2 or not args[0].isdigit() or args[1].lower() not in ESCALATION_ACTIONS:
+        return await update.message.reply_text(usage, parse_mode="Markdown")
+
+    duration = None
+    if len(args) > 2:
+        duration = parse_duration(args[2])
+        if not duration:
+            return await update.message.reply_text("❗ Invalid duration.", parse_mode="Markdown")
+
+    chat_id = update.effective_chat.id
+    set_warn_rule(chat_id, int(args[0]), args[1].lower(), duration)
+    publish("warn_rules", chat_id)
+
+    await update.message.reply_text("✅ Warn rule saved.", parse_mode="Markdown")
+
+
+async def remove_warn_rule_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
+
+    if not context.args or not context.args[0].isdigit():
+        return await update.message.reply_text("Usage: `/delwarnrule <warns>`", parse_mode="Markdown")
+
+    chat_id = update.effective_chat.id
+    remove_warn_rule(chat_id, int(context.args[0]))
+    publish("warn_rules", chat_id)
+
+    await update.message.reply_text("🗑 Warn rule removed.", parse_mode="Markdown")
+
+
+async def warn_rules_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    rules, expiry = get_group_rules(update.effective_chat.id)
+
+    if not rules and not expiry:
+        return await update.message.reply_text("ℹ️ No warn rules set.", parse_mode="Markdown")
+
+    text = "📏 *Warn Rules*\n" + DIVIDER + "\n\n"
+    text += "".join(
+        f"• `{warns}` warns → {action}"
+        f"{' ' + format_duration(duration) if duration else ''}\n"
+        for warns, (action, duration) in sorted(rules.items())
+    )
+    text += f"\n⏳ Warns expire after: `{format_duration(expiry) if expiry else 'never'}`"
+
+    await update.message.reply_text(text, parse_mode="Markdown")
+
+
+async def warn_expiry_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
+
+    if not context.args:
+        return await update.message.reply_text("Usage: `/warnexpiry <7d|off>`", parse_mode="Markdown")
+
+    if context.args[0].lower() == "off":
+        seconds = None
+    else:
+        seconds = parse_duration(context.args[0])
+        if not seconds:
+            return await update.message.reply_text("❗ Invalid duration.", parse_mode="Markdown")
+
+    chat_id = update.effective_chat.id
+    set_warn_expiry(chat_id, seconds)
+    publish("warn_rules", chat_id)
 
     await update.message.reply_text(
-        f"🧹 One warning removed from {user}.",
+        f"⏳ New warns expire after: `{format_duration(seconds) if seconds else 'never'}`",
         parse_mode="Markdown"
     )
 
 
 # ============================================================
-# 📊 /warns — View user warnings
+# ⚠️ /warn — Give a warning
 # ============================================================
 
-async def warns_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def warn_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
 
-    if not context.args:
-        return await update.message.reply_text("Usage: `/warns @user`", parse_mode="Markdown")
+    user_id, label, rest = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/warn @user [reason]` or reply")
 
-    user = context.args[0].lower()
+    chat = update.effective_chat
+    reason = " ".join(rest) or None
+    warn_id, count = add_warn(chat.id, user_id, reason, ist_now().isoformat())
 
-    conn = connect()
-    cur = conn.cursor()
+    rules, expiry = get_group_rules(chat.id)
+    if expiry:
+        schedule_action(context.job_queue, "expire_warn", chat.id, user_id, expiry, ref=warn_id)
 
-    cur.execute("SELECT COUNT(*) AS c FROM warns WHERE username=?", (user,))
-    row = cur.fetchone()
-    conn.close()
+    text = f"⚠️ Warning added to {label}. Total: `{count}`"
+
+    # The highest rule reached; skipped when it (or a higher one) already
+    # fired, so rules added later or missed counts still apply exactly once
+    reached = [warns for warns in rules if warns <= count]
+    if reached and mark_escalated(chat.id, user_id, max(reached)):
+        text += "\n" + await escalate(context, chat.id, user_id, label, *rules[max(reached)])
+
+    await update.message.reply_text(text, parse_mode="Markdown")
 
-    count = row["c"]
+
+# ============================================================
+# 🧹 /dwarn — Remove 1 warning
+# ============================================================
+
+async def unwarn_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
+
+    user_id, label, _ = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/dwarn @user` or reply")
+
+    if not remove_warn(update.effective_chat.id, user_id):
+        return await update.message.reply_text(f"ℹ️ {label} has no warnings.", parse_mode="Markdown")
 
     await update.message.reply_text(
-        f"📊 {user} has `{count}` warnings.",
+        f"🧹 One warning removed from {label}.",
+        parse_mode="Markdown"
+    )
+
+
+# ============================================================
+# 📊 /warns — View user warnings
+# ============================================================
+
+async def warns_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id, label, _ = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/warns @user` or reply")
+
+    count = get_warn_count(update.effective_chat.id, user_id)
+
+    await update.message.reply_text(
+        f"📊 {label} has `{count}` warnings.",
         parse_mode="Markdown"
     )
 
@@ -86,20 +360,24 @@ async def warns_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def ban_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
 
-    if not context.args:
-        return await update.message.reply_text("Usage: `/ban @user`")
+    user_id, label, rest = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/ban @user [reason]` or reply")
 
-    user = context.args[0].lower()
+    chat = update.effective_chat
+    add_ban(chat.id, user_id, " ".join(rest) or None, update.effective_user.id, ist_now().isoformat())
+    BANNED.add((chat.id, user_id))
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("INSERT OR IGNORE INTO bans (username) VALUES (?)", (user,))
-    conn.commit()
-    conn.close()
+    try:
+        await chat.ban_member(user_id)
+    except TelegramError:
+        pass  # Private chat or no rights; the ban gate still ignores them
 
     await update.message.reply_text(
-        f"🚫 {user} has been *banned*.",
+        f"🚫 {label} has been *banned*.",
         parse_mode="Markdown"
     )
 
@@ -109,20 +387,24 @@ async def ban_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def unban_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not await ensure_bot_admin(update, context):
+        return
 
-    if not context.args:
-        return await update.message.reply_text("Usage: `/unban @user`")
+    user_id, label, _ = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/unban @user`")
 
-    user = context.args[0].lower()
+    chat = update.effective_chat
+    remove_ban(chat.id, user_id)
+    BANNED.discard((chat.id, user_id))
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM bans WHERE username=?", (user,))
-    conn.commit()
-    conn.close()
+    try:
+        await chat.unban_member(user_id, only_if_banned=True)
+    except TelegramError:
+        pass
 
     await update.message.reply_text(
-        f"🔓 {user} has been *unbanned*.",
+        f"🔓 {label} has been *unbanned*.",
         parse_mode="Markdown"
     )
 
@@ -160,7 +442,7 @@ async def mute_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = msg.reply_to_message.from_user
 
     try:
-        await msg.chat.restrict_member(user.id, permissions={"can_send_messages": False})
+        await msg.chat.restrict_member(user.id, permissions=MUTED)
         await msg.reply_text(f"🔇 Muted {format_username(user)}")
     except:
         await msg.reply_text("❗ Failed to mute user.")
@@ -179,12 +461,174 @@ async def unmute_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = msg.reply_to_message.from_user
 
     try:
-        await msg.chat.restrict_member(user.id, permissions={"can_send_messages": True})
+        await msg.chat.restrict_member(user.id, permissions=UNMUTED)
         await msg.reply_text(f"🔊 Unmuted {format_username(user)}")
     except:
         await msg.reply_text("❗ Failed to unmute user.")
 
 
+# ============================================================
+# 🚨 BULK ACTIONS /bulkban /bulkmute /bulkkick (raid response)
+# ============================================================
+
+BULK_CONCURRENCY = 10      # API calls in flight at once (OutboundLimiter still applies)
+BULK_PROGRESS_EVERY = 2    # seconds between progress edits
+BULK_MAX_TEXT = 3500
+
+BULK_USAGE = (
+    "Usage: `/bulk{action} <id|@user ...> [joined:10m] [for:24h]`\n"
+    "• `joined:10m` — everyone who joined in the last 10 minutes\n"
+    "• `for:24h` — lift the ban/mute automatically"
+)
+
+
+async def track_joins_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Remember join times so bulk actions can target a join window."""
+    members = [m.id for m in update.message.new_chat_members if not m.is_bot]
+    if members:
+        record_joins(update.effective_chat.id, members, time.time())
+
+
+def _bulk_targets(chat_id, args):
+    """Return (targets, unresolved, duration) from the command arguments.
+
+    targets maps user_id to the username it was given as, or None.
+    """
+    targets, unresolved, duration = {}, [], None
+
+    for arg in args:
+        key, _, value = arg.partition(":")
+        if key.lower() == "joined" and value:
+            seconds = parse_duration(value)
+            if seconds:
+                for uid in joined_since(chat_id, time.time() - seconds):
+                    targets.setdefault(uid, None)
+                continue
+        elif key.lower() == "for" and value:
+            duration = parse_duration(value)
+            continue
+
+        if arg.lstrip("-").isdigit():
+            targets.setdefault(int(arg), None)
+            continue
+
+        uid = resolve(arg)
+        if uid:
+            targets.setdefault(uid, arg)
+        else:
+            unresolved.append(arg)
+
+    return targets, unresolved, duration
+
+
+async def _bulk_one(context, chat_id, user_id, action, duration, admin_id):
+    if action == "ban":
+        await context.bot.ban_chat_member(chat_id, user_id)
+        add_ban(chat_id, user_id, "bulk ban", admin_id, ist_now().isoformat())
+        BANNED.add((chat_id, user_id))
+        if duration:
+            schedule_action(context.job_queue, "unban", chat_id, user_id, duration)
+    elif action == "mute":
+        await context.bot.restrict_chat_member(chat_id, user_id, MUTED)
+        if duration:
+            schedule_action(context.job_queue, "unmute", chat_id, user_id, duration)
+    elif action == "kick":
+        await context.bot.ban_chat_member(chat_id, user_id)
+        await context.bot.unban_chat_member(chat_id, user_id)
+
+
+async def _bulk_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, action):
+    if not await ensure_bot_admin(update, context):
+        return
+
+    chat = update.effective_chat
+    if chat.type not in ["group", "supergroup"]:
+        return await update.message.reply_text("❗ This command can only be used in groups.")
+
+    targets, unresolved, duration = _bulk_targets(chat.id, context.args or [])
+    targets.pop(context.bot.id, None)
+    targets.pop(update.effective_user.id, None)
+
+    if not targets:
+        return await update.message.reply_text(BULK_USAGE.format(action=action), parse_mode="Markdown")
+
+    total = len(targets)
+    results = {}
+    finished = asyncio.Event()
+    status = await update.message.reply_text(f"⏳ {action}: 0/{total}")
+
+    limit = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def run(user_id):
+        async with limit:
+            try:
+                await _bulk_one(context, chat.id, user_id, action, duration, update.effective_user.id)
+                results[user_id] = None
+            except TelegramError as e:
+                results[user_id] = str(e)
+
+    async def progress():
+        last = 0
+        while not finished.is_set():
+            try:
+                await asyncio.wait_for(finished.wait(), BULK_PROGRESS_EVERY)
+            except asyncio.TimeoutError:
+                pass
+            if len(results) != last and not finished.is_set():
+                last = len(results)
+                try:
+                    await status.edit_text(f"⏳ {action}: {last}/{total}")
+                except TelegramError:
+                    pass
+
+    reporter = asyncio.create_task(progress())
+    await asyncio.gather(*(run(uid) for uid in targets))
+    finished.set()
+    await reporter
+
+    # Summary: failures first, then successes. Usernames and API errors
+    # are user text, so they are escaped for the message and left raw in
+    # the attached report.
+    failed = [(uid, err) for uid, err in results.items() if err]
+    rows = [("❌", targets[uid] or str(uid), err) for uid, err in failed]
+    rows += [("✅", targets[uid] or str(uid), None) for uid, err in results.items() if not err]
+    rows += [("❔", arg, "unknown user") for arg in unresolved]
+
+    header = (
+        f"🚨 *Bulk {action} finished*\n{DIVIDER}\n"
+        f"• Done: `{total - len(failed)}`  • Failed: `{len(failed)}`\n\n"
+    )
+    body = "".join(
+        f"{icon} {escape_markdown(label)}" + (f" — {escape_markdown(note)}" if note else "") + "\n"
+        for icon, label, note in rows
+    )
+
+    if len(header) + len(body) <= BULK_MAX_TEXT:
+        return await status.edit_text(header + body, parse_mode="Markdown")
+
+    report = "".join(
+        f"{icon} {label}" + (f" — {note}" if note else "") + "\n"
+        for icon, label, note in rows
+    )
+    await status.edit_text(header + "📎 Full per-user report attached.", parse_mode="Markdown")
+    await update.message.reply_document(
+        document=report.encode(),
+        filename=f"bulk_{action}_report.txt"
+    )
+
+
+async def bulk_ban_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _bulk_handler(update, context, "ban")
+
+
+async def bulk_mute_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _bulk_handler(update, context, "mute")
+
+
+async def bulk_kick_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await _bulk_handler(update, context, "kick")
+
+
 # ============================================================
 # 🕵️ /info — Get user info
 # ============================================================
@@ -233,6 +677,17 @@ async def save_note_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # 📒 /notes — Show notes
 # ============================================================
 
+NOTE_PAGES = Paginator(
+    name="notes",
+    table="notes",
+    columns="note",
+    where=lambda user_id, user: ("user_id=?", (int(user_id),)),
+    header=lambda user_id: f"📒 *Notes for* `{user_id}`\n{DIVIDER}\n\n",
+    row=lambda n: f"• {escape_markdown(n['note'] or '')}\n",
+    empty="ℹ️ No notes for this user.",
+)
+
+
 async def notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     msg = update.message
 
@@ -241,22 +696,7 @@ async def notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     user = msg.reply_to_message.from_user
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("SELECT note FROM notes WHERE user_id=?", (user.id,))
-    rows = cur.fetchall()
-    conn.close()
-
-    if not rows:
-        return await msg.reply_text("ℹ️ No notes for this user.")
-
-    txt = f"📒 *Notes for {format_username(user)}*\n{DIVIDER}\n\n"
-
-    for n in rows:
-        txt += f"• {n['note']}\n"
-
-    await msg.reply_text(txt, parse_mode="Markdown")
+    await NOTE_PAGES.send(msg, update.effective_user, arg=str(user.id))
 
 
 # ============================================================
@@ -264,19 +704,17 @@ async def notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ============================================================
 
 async def clean_warns_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not context.args:
-        return await update.message.reply_text("Usage: `/clean_warns @user`")
+    if not await ensure_bot_admin(update, context):
+        return
 
-    user = context.args[0].lower()
+    user_id, label, _ = resolve_target(update, context)
+    if user_id is None:
+        return await _unresolved(update, label, "Usage: `/clean_warns @user` or reply")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM warns WHERE username=?", (user,))
-    conn.commit()
-    conn.close()
+    clear_warns(update.effective_chat.id, user_id)
 
     await update.message.reply_text(
-        f"🧹 All warnings cleared for {user}.",
+        f"🧹 All warnings cleared for {label}.",
         parse_mode="Markdown"
     )
 
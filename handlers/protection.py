@@ -0,0 +1,348 @@
+# handlers/protection.py
+# Message-level protection for groups: anti-flood, duplicate bursts and
+# escrow-admin impersonation. Runs on every group message, so the hot
+# path is pure in-memory work.
+
+import re
+import time
+import unicodedata
+from collections import deque
+
+from telegram import Update
+from telegram.ext import ContextTypes, ApplicationHandlerStop
+from telegram.error import TelegramError
+from telegram.helpers import escape_markdown
+
+from database import list_admins
+from utils import format_username
+from parsing import format_duration
+from cache import TTLCache
+from bus import subscribe
+from tenancy import tenant, is_tenant_admin
+from handlers.logs import send_log
+from handlers.groups import group_settings
+from handlers.moderation import MUTED
+
+
+# ============================================================
+# ⚙️ LIMITS
+# ============================================================
+
+FLOOD_WINDOW = 10      # seconds
+FLOOD_LIMIT = 8        # messages per FLOOD_WINDOW
+DUP_WINDOW = 60        # seconds
+DUP_LIMIT = 4          # identical messages per DUP_WINDOW
+FLOOD_MUTE = 600       # seconds a flooder stays muted
+
+HISTORY = 32           # messages kept per user
+SWEEP_EVERY = 5000     # messages between stale-entry sweeps
+
+# (chat_id, user_id) -> deque[(timestamp, content_hash)]
+_history = {}
+_seen = 0
+
+
+# ============================================================
+# 🔍 DETECTION (pure, no I/O)
+# ============================================================
+
+def _content_key(msg):
+    if msg.text:
+        return hash(msg.text)
+    if msg.caption:
+        return hash(msg.caption)
+    if msg.sticker:
+        return hash(msg.sticker.file_unique_id)
+    return None
+
+
+def _sweep(now):
+    stale = [k for k, h in _history.items() if not h or h[-1][0] < now - DUP_WINDOW]
+    for k in stale:
+        del _history[k]
+
+
+def check_message(chat_id, user_id, content, now):
+    """Record one message; return 'flood', 'duplicate' or None."""
+    global _seen
+
+    _seen += 1
+    if _seen % SWEEP_EVERY == 0:
+        _sweep(now)
+
+    key = (chat_id, user_id)
+    history = _history.get(key)
+    if history is None:
+        history = _history[key] = deque(maxlen=HISTORY)
+
+    while history and history[0][0] < now - DUP_WINDOW:
+        history.popleft()
+    history.append((now, content))
+
+    recent = 0
+    dupes = 0
+    flood_since = now - FLOOD_WINDOW
+    for ts, c in reversed(history):
+        if ts >= flood_since:
+            recent += 1
+        if content is not None and c == content:
+            dupes += 1
+
+    if recent > FLOOD_LIMIT:
+        return "flood"
+    if dupes >= DUP_LIMIT:
+        return "duplicate"
+    return None
+
+
+def forget(chat_id, user_id):
+    _history.pop((chat_id, user_id), None)
+
+
+# ============================================================
+# 🎭 ADMIN IMPERSONATION INDEX
+# ============================================================
+
+# Homoglyphs / leetspeak mapped to the Latin letter they imitate
+_CONFUSABLES = str.maketrans({
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x",
+    "і": "i", "ј": "j", "ѕ": "s", "һ": "h", "ԁ": "d", "ɡ": "g", "ӏ": "l",
+    "к": "k", "м": "m", "т": "t", "в": "b", "н": "h", "ո": "n", "ս": "u",
+    "α": "a", "ε": "e", "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "ν": "v",
+    "ι": "i", "κ": "k", "χ": "x", "ω": "w",
+    "0": "o", "1": "l", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+    "|": "l", "!": "i", "$": "s", "@": "a",
+})
+_REPEATS = re.compile(r"(.)\1+")
+
+MIN_EXACT = 3      # shorter skeletons are ignored entirely
+MIN_FUZZY = 5      # shorter skeletons only match exactly
+
+
+def skeleton(name):
+    """Reduce a name to the form a reader would confuse it with."""
+    if not name:
+        return ""
+    s = unicodedata.normalize("NFKC", name).casefold().translate(_CONFUSABLES)
+    s = "".join(c for c in unicodedata.normalize("NFKD", s) if c.isalnum())
+    s = s.replace("rn", "m").replace("vv", "w")
+    return _REPEATS.sub(r"\1", s)
+
+
+def _deletions(s):
+    """All strings one deletion away (SymSpell-style edit-distance bucket)."""
+    return {s[:i] + s[i + 1:] for i in range(len(s))}
+
+
+class _Skeletons:
+    """Exact and edit-distance-1 lookup of name skeletons."""
+
+    def __init__(self):
+        self.exact = {}
+        self.deletes = {}
+
+    def add(self, raw, label):
+        sk = skeleton(raw)
+        if len(sk) < MIN_EXACT:
+            return
+        self.exact.setdefault(sk, label)
+        if len(sk) >= MIN_FUZZY:
+            for d in _deletions(sk) | {sk}:
+                self.deletes.setdefault(d, label)
+
+    def match(self, raw):
+        sk = skeleton(raw)
+        if len(sk) < MIN_EXACT:
+            return None
+        if sk in self.exact:
+            return self.exact[sk]
+        if len(sk) >= MIN_FUZZY:
+            # edit distance <= 1 (and most transpositions)
+            for d in _deletions(sk) | {sk}:
+                if d in self.deletes:
+                    return self.deletes[d]
+        return None
+
+
+class AdminNameIndex:
+    """
+    Precomputed lookup of admin name skeletons; rebuilt on roster changes.
+    A username (near-)identical to an admin's username is an impersonation.
+    Display names are free text and shared by real people ("Alex"), so a
+    display name close to an admin's name or username is only suspicious.
+    """
+
+    def __init__(self, admins):
+        self.usernames = _Skeletons()
+        self.names = _Skeletons()
+
+        for a in admins:
+            label = f"@{a['username']}" if a["username"] else (a["name"] or str(a["user_id"]))
+            self.usernames.add(a["username"], label)
+            self.names.add(a["username"], label)
+            self.names.add(a["name"], label)
+
+    def match(self, username, full_name):
+        """(admin label, True if the username itself imitates it) or None."""
+        label = self.usernames.match(username)
+        if label:
+            return label, True
+        label = self.names.match(username) or self.names.match(full_name)
+        if label:
+            return label, False
+        return None
+
+
+ADMIN_INDEX = AdminNameIndex([])
+
+# user_id -> (username, full_name, AdminNameIndex.match() result)
+_verdicts = TTLCache(ttl=3600, maxsize=50_000)
+
+# (chat_id, user_id) already reported, so an unmutable lookalike is not re-announced
+_alerted = TTLCache(ttl=3600, maxsize=10_000)
+
+
+def rebuild_admin_index():
+    """Call at startup and whenever /addadmin or /removeadmin run."""
+    global ADMIN_INDEX
+    ADMIN_INDEX = AdminNameIndex(list_admins())
+    _verdicts.invalidate()
+
+
+subscribe("admins", lambda key: rebuild_admin_index())
+subscribe("reset", lambda key: rebuild_admin_index())
+
+
+def impersonated_admin(user, chat_id):
+    """
+    (admin label, username match) or None; cached per user until their
+    name changes or the roster changes. The chat's own admins are exempt.
+    """
+    if is_tenant_admin(user.id, chat_id):
+        return None
+
+    cached = _verdicts.get(user.id)
+    if cached and cached[0] == user.username and cached[1] == user.full_name:
+        return cached[2]
+
+    verdict = ADMIN_INDEX.match(user.username, user.full_name)
+    _verdicts.set(user.id, (user.username, user.full_name, verdict))
+    return verdict
+
+
+async def _restrict_lookalike(context, chat_id, user, label):
+    if _alerted.get((chat_id, user.id)):
+        return
+    _alerted.set((chat_id, user.id), True)
+
+    try:
+        await context.bot.restrict_chat_member(chat_id, user.id, MUTED)
+        action = "muted until an admin reviews"
+    except TelegramError:
+        action = "could not be muted"
+
+    await context.bot.send_message(
+        chat_id,
+        f"⚠️ {escape_markdown(format_username(user))} (`{user.id}`) looks like escrow admin "
+        f"{escape_markdown(label)} and was {action}.\nAlways verify admins with /adminlist.",
+        parse_mode="Markdown",
+    )
+
+
+async def _flag_lookalike(context, chat_id, user, label):
+    """Display-name resemblance: tell the admins, leave the member alone."""
+    if _alerted.get((chat_id, user.id)):
+        return
+    _alerted.set((chat_id, user.id), True)
+
+    await send_log(
+        context,
+        tenant(chat_id)["logs"],
+        f"🎭 *Possible admin lookalike*\n"
+        f"• User: {escape_markdown(format_username(user))} (`{user.id}`)\n"
+        f"• Name: {escape_markdown(user.full_name or '')}\n"
+        f"• Resembles: {escape_markdown(label)}\n"
+        f"• Chat: `{chat_id}`",
+    )
+
+
+async def _handle_lookalike(context, chat_id, user, verdict):
+    label, by_username = verdict
+    if by_username:
+        await _restrict_lookalike(context, chat_id, user, label)
+    else:
+        await _flag_lookalike(context, chat_id, user, label)
+
+
+async def impersonation_join_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Join-time check for every new member."""
+    chat_id = update.effective_chat.id
+    if not group_settings(chat_id):
+        return
+
+    for member in update.message.new_chat_members:
+        if member.is_bot:
+            continue
+        verdict = impersonated_admin(member, chat_id)
+        if verdict:
+            await _handle_lookalike(context, chat_id, member, verdict)
+
+
+# ============================================================
+# 🛡 FILTER STAGE (MessageHandler in group -1)
+# ============================================================
+
+async def flood_filter_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    msg = update.message
+    user = update.effective_user
+    if msg is None or user is None or user.is_bot:
+        return
+
+    chat_id = update.effective_chat.id
+
+    # Like welcome/farewell, protection only runs in groups set up with /setgroup
+    if not group_settings(chat_id):
+        return
+
+    verdict = impersonated_admin(user, chat_id)
+    if verdict and verdict[1]:
+        try:
+            await msg.delete()
+        except TelegramError:
+            pass
+        await _restrict_lookalike(context, chat_id, user, verdict[0])
+        raise ApplicationHandlerStop
+    if verdict:
+        await _flag_lookalike(context, chat_id, user, verdict[0])
+
+    verdict = check_message(chat_id, user.id, _content_key(msg), time.monotonic())
+    if verdict is None:
+        return
+
+    # Slow path from here on: only reached when a burst is detected
+    forget(chat_id, user.id)
+    if is_tenant_admin(user.id, chat_id):
+        return
+
+    try:
+        await msg.delete()
+    except TelegramError:
+        pass
+
+    try:
+        await context.bot.restrict_chat_member(
+            chat_id, user.id, MUTED, until_date=int(time.time()) + FLOOD_MUTE
+        )
+    except TelegramError:
+        return  # Chat admin or missing rights
+
+    # until_date lifts the mute on Telegram's side; a scheduled unmute
+    # would also undo a longer mute an admin adds meanwhile
+
+    reason = "flooding" if verdict == "flood" else "repeating the same message"
+    await context.bot.send_message(
+        chat_id,
+        f"🔇 {format_username(user)} muted for {format_duration(FLOOD_MUTE)} ({reason}).",
+    )
+
+    raise ApplicationHandlerStop
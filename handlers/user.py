@@ -1,17 +1,29 @@
 # handlers/user.py
-# User-facing commands: /start /stats /stats @user /mydeals /find /today /week /escrow /history /gstats /topuser
+# User-facing commands: /start /stats /stats @user /mydeals /find /search /today /week /escrow /history /gstats /topuser
 
-from telegram import Update
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+from datetime import timedelta
 
-from database import connect
 from utils import (
     format_username,
     ist_now,
     divider,
     build_pdf,
+    send_reply,
 )
+from database import get_daily_summaries
+from outbound import PRIORITY_LOW
+from pagination import Paginator, MAX_CALLBACK_BYTES
+from identity import resolve, usernames
+from parsing import normalize_username
+from participants import deals_of
+from search import PAGE_SIZE as SEARCH_PAGE_SIZE, parse_query, search
+from tenancy import GLOBAL_TENANT, is_tenant_admin, tenant_id, scope
+from shards import all_shards, tenant_shards, fan_out, fan_out_totals, fan_out_grouped
 
 
 # ============================================================
@@ -42,11 +54,9 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     uname = format_username(user)
+    ids_sql, params = deals_of(usernames(user.id, user.username), user.id)
 
-    conn = connect()
-    cur = conn.cursor()
-
-    cur.execute("""
+    row = fan_out_totals(f"""
         SELECT 
             COUNT(*) AS total_deals,
             SUM(amount) AS total_volume,
@@ -54,11 +64,8 @@ async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             SUM(CASE WHEN status='active' THEN 1 ELSE 0 END) AS active,
             SUM(CASE WHEN status IN ('refunded','cancelled') THEN 1 ELSE 0 END) AS cancelled
         FROM deals
-        WHERE buyer_username=? OR seller_username=? OR created_by=?
-    """, (uname, uname, user.id))
-
-    row = cur.fetchone()
-    conn.close()
+        WHERE id IN ({ids_sql})
+    """, params)
 
     text = (
         f"📊 *Participant Stats for {uname}*\n"
@@ -71,13 +78,21 @@ async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "📌 Always use *Verified Escrow Admins* for safe trades."
     )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
 
 
 # ============================================================
 # 👤 /stats @username — Other User Stats
 # ============================================================
 
+def _deals_of_tag(tag, **kwargs):
+    """deals_of() for @tag plus, if we know who that is, their id and other usernames."""
+    user_id = resolve(tag)
+    if user_id is None:
+        return deals_of(normalize_username(tag), **kwargs)
+    return deals_of(usernames(user_id, tag), user_id, **kwargs)
+
+
 async def stats_tag_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         tag = update.message.text.split()[1].lower()
@@ -87,20 +102,17 @@ async def stats_tag_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not tag.startswith("@"):
         tag = "@" + tag
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
+    ids_sql, params = _deals_of_tag(tag, roles=("buyer", "seller"))
+
+    row = fan_out_totals(f"""
         SELECT 
             COUNT(*) AS total_deals,
             SUM(amount) AS total_volume,
             SUM(CASE WHEN status IN ('completed','released') THEN 1 ELSE 0 END) AS completed,
             SUM(CASE WHEN status='active' THEN 1 ELSE 0 END) AS active
         FROM deals
-        WHERE buyer_username=? OR seller_username=?
-    """, (tag, tag))
-
-    row = cur.fetchone()
-    conn.close()
+        WHERE id IN ({ids_sql})
+    """, params)
 
     if row["total_deals"] == 0:
         return await update.message.reply_text(
@@ -122,128 +134,223 @@ async def stats_tag_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"💰 Last Escrow Worth: ₹0.00"
     )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
 
 
 # ============================================================
 # 📁 /mydeals — User's Deal List
 # ============================================================
 
-async def my_deals_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
-    uname = format_username(user)
-
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT trade_id, buyer_username, seller_username, amount, status
-        FROM deals 
-        WHERE buyer_username=? OR seller_username=? OR created_by=?
-        ORDER BY id DESC LIMIT 20
-    """, (uname, uname, user.id))
-    rows = cur.fetchall()
-    conn.close()
-
-    if not rows:
-        return await update.message.reply_text("ℹ️ You don't have any deals yet.")
+def _in_deals(ids):
+    sql, params = ids
+    return f"id IN ({sql})", params
+
+
+MY_DEALS_PAGES = Paginator(
+    name="mydeals",
+    table="deals",
+    columns="trade_id, buyer_username, seller_username, amount, status",
+    where=lambda arg, user: _in_deals(deals_of(usernames(user.id, user.username), user.id)),
+    header=lambda arg: f"🧾 *Your Deals*\n{divider()}\n\n",
+    row=lambda r: (
+        f"`#{r['trade_id']}` | "
+        f"{escape_markdown(r['buyer_username'] or '')} → {escape_markdown(r['seller_username'] or '')} | "
+        f"₹{r['amount']:.2f} | *{escape_markdown(r['status'] or '')}*\n"
+    ),
+    empty="ℹ️ You don't have any deals yet.",
+    shards=lambda arg, user: all_shards(),
+)
 
-    text = f"🧾 *Your Deals*\n{divider()}\n\n"
-    for r in rows:
-        text += (
-            f"`#{r['trade_id']}` | "
-            f"{r['buyer_username']} → {r['seller_username']} | "
-            f"₹{r['amount']:.2f} | *{r['status']}*\n"
-        )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+async def my_deals_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await MY_DEALS_PAGES.send(update.message, update.effective_user)
 
 
 # ============================================================
 # 🔍 /find — Search Active Deals by Username
 # ============================================================
 
+FIND_PAGES = Paginator(
+    name="find",
+    table="deals",
+    columns="trade_id, buyer_username, seller_username, amount",
+    where=lambda target, user: _in_deals(
+        _deals_of_tag(target, roles=("buyer", "seller"), status="active")
+    ),
+    header=lambda target: f"🔍 *Active Deals for {escape_markdown(target)}*\n{divider()}\n\n",
+    row=lambda r: (
+        f"`#{r['trade_id']}` | "
+        f"{escape_markdown(r['buyer_username'] or '')} → {escape_markdown(r['seller_username'] or '')} | "
+        f"₹{r['amount']:.2f}\n"
+    ),
+    empty="ℹ️ No active deals found.",
+    shards=lambda arg, user: all_shards(),
+)
+
+
 async def find_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if not context.args:
         return await update.message.reply_text("Usage: `/find @username`", parse_mode="Markdown")
 
-    target = context.args[0].lower()
-    if not target.startswith("@"):
-        target = "@" + target
+    # Telegram usernames are at most 32 characters
+    target = context.args[0].lower().lstrip("@")[:32]
+    target = "@" + target
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT trade_id, buyer_username, seller_username, amount
-        FROM deals
-        WHERE status='active' AND 
-        (LOWER(buyer_username)=? OR LOWER(seller_username)=?)
-        ORDER BY id DESC
-        LIMIT 25
-    """, (target, target))
-    rows = cur.fetchall()
-    conn.close()
+    await FIND_PAGES.send(
+        update.message,
+        update.effective_user,
+        arg=target,
+        empty=f"ℹ️ No active deals found for {escape_markdown(target)}.",
+    )
+
+
+# ============================================================
+# 🔎 /search — Ranked Full-Text Search (deals, or notes for admins)
+# ============================================================
+
+SEARCH_USAGE = (
+    "Usage: `/search <words>` (trade id, @user, escrower, status)\n"
+    "`/search notes <words>` searches moderation notes (admins)\n"
+    "End a word with `*` to match its prefix."
+)
 
+
+def _search_callback(kind, page, terms):
+    """sr:<d|n>:<page>:<terms>, dropping trailing terms past the 64-byte limit."""
+    terms = list(terms)
+    while True:
+        data = f"sr:{kind[0]}:{page}:{' '.join(terms)}"
+        if len(data.encode()) <= MAX_CALLBACK_BYTES or len(terms) <= 1:
+            return data[:MAX_CALLBACK_BYTES]
+        terms.pop()
+
+
+def search_page(kind, terms, page):
+    """(text, markup) for one page of /search results."""
+    rows, has_next = search(kind, terms, page)
+    query = " ".join(terms)
     if not rows:
-        return await update.message.reply_text(
-            f"ℹ️ No active deals found for {target}.", parse_mode="Markdown"
+        return f"ℹ️ Nothing found for `{query}`.", None
+
+    first = (page - 1) * SEARCH_PAGE_SIZE + 1
+    if kind == "deals":
+        text = f"🔎 *Deals matching* `{query}`\n{divider()}\n\n" + "".join(
+            f"{first + i}. `#{r['trade_id']}` | {escape_markdown(r['buyer_username'] or '')} → "
+            f"{escape_markdown(r['seller_username'] or '')} | "
+            f"₹{r['amount']:.2f} | *{escape_markdown(r['status'] or '')}*\n"
+            for i, r in enumerate(rows)
         )
-
-    text = f"🔍 *Active Deals for {target}*\n{divider()}\n\n"
-    for r in rows:
-        text += (
-            f"`#{r['trade_id']}` | "
-            f"{r['buyer_username']} → {r['seller_username']} | "
-            f"₹{r['amount']:.2f}\n"
+    else:
+        text = f"🔎 *Notes matching* `{query}`\n{divider()}\n\n" + "".join(
+            f"{first + i}. `{r['user_id']}`: {escape_markdown(r['note'] or '')}\n"
+            for i, r in enumerate(rows)
         )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    buttons = []
+    if page > 1:
+        buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=_search_callback(kind, page - 1, terms)))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Next ➡️", callback_data=_search_callback(kind, page + 1, terms)))
+    if buttons:
+        text += f"\n📄 Page {page}"
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
 
 
-# ============================================================
-# 📅 /today — Today Summary
-# ============================================================
+async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = list(context.args or [])
+    kind = "deals"
+    if args and args[0].lower() == "notes":
+        kind, args = "notes", args[1:]
+        if not is_tenant_admin(update.effective_user.id, tenant_id(update.effective_chat)):
+            return await update.message.reply_text("⛔ Admin only!")
 
-async def today_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    today = ist_now().date()
+    terms = parse_query(" ".join(args))
+    if not terms:
+        return await update.message.reply_text(SEARCH_USAGE, parse_mode="Markdown")
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT amount, status, created_at FROM deals")
-    rows = cur.fetchall()
-    conn.close()
+    text, markup = search_page(kind, terms, 1)
+    await send_reply(update.message, text, priority=PRIORITY_LOW, reply_markup=markup)
 
-    total = volume = completed = active = cancelled = 0
 
-    for r in rows:
-        dt = r["created_at"]
-        try:
-            date = dt.split("T")[0]
-        except:
-            continue
+async def search_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    try:
+        _, kind, page, terms = query.data.split(":", 3)
+        kind, page = {"d": "deals", "n": "notes"}[kind], int(page)
+    except (ValueError, KeyError):
+        return await query.answer("❗ This search has expired.")
 
-        if str(today) != date:
-            continue
+    chat_tenant = tenant_id(query.message.chat if query.message else None)
+    if kind == "notes" and not is_tenant_admin(query.from_user.id, chat_tenant):
+        return await query.answer("⛔ Admin only!", show_alert=True)
+
+    text, markup = search_page(kind, terms.split(), page)
+    await query.answer()
+    try:
+        await query.edit_message_text(text, parse_mode="Markdown", reply_markup=markup)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
 
-        total += 1
-        volume += r["amount"] or 0
 
-        if r["status"] in ("completed","released"):
-            completed += 1
-        elif r["status"] == "active":
-            active += 1
-        else:
-            cancelled += 1
+# ============================================================
+# 📅 /today — Today Summary
+# ============================================================
+
+def period_summary(chat_id, start, end):
+    """
+    Aggregate deals created in [start, end) (IST dates) for one tenant.
+    Finished days the digest has summarized (handlers/digest.py) are read
+    from daily_summaries; only the rest, normally just today, is counted.
+    """
+    today = ist_now().date()
+    stored, computed = get_daily_summaries(chat_id, start, end - timedelta(days=1))
+
+    totals = {"total": 0, "volume": 0, "completed": 0, "active": 0}
+    live_start = start
+    while live_start < min(end, today) and str(live_start) in computed:
+        row = stored.get(str(live_start))
+        if row:
+            for key in totals:
+                totals[key] += row[key] or 0
+        live_start += timedelta(days=1)
+
+    if live_start < end:
+        tenant_sql, params = scope(chat_id)
+
+        # created_at is an ISO string, so date bounds compare lexicographically
+        row = fan_out_totals(f"""
+            SELECT
+                COUNT(*) AS total,
+                SUM(amount) AS volume,
+                SUM(CASE WHEN status IN ('completed','released') THEN 1 ELSE 0 END) AS completed,
+                SUM(CASE WHEN status='active' THEN 1 ELSE 0 END) AS active
+            FROM deals
+            WHERE {tenant_sql} AND created_at >= ? AND created_at < ?
+        """, (*params, str(live_start), str(end)), tenant_shards(chat_id))
+        for key in totals:
+            totals[key] += row[key] or 0
+
+    return {
+        **totals,
+        "cancelled": totals["total"] - totals["completed"] - totals["active"],
+    }
+
+
+async def today_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    today = ist_now().date()
+    s = period_summary(tenant_id(update.effective_chat), today, today + timedelta(days=1))
 
     text = (
         f"📅 *Today's Summary*\n{divider()}\n"
-        f"• Total Deals: {total}\n"
-        f"• Volume: ₹{volume:.2f}\n"
-        f"• Completed: {completed}\n"
-        f"• Active: {active}\n"
-        f"• Cancelled: {cancelled}"
+        f"• Total Deals: {s['total']}\n"
+        f"• Volume: ₹{s['volume']:.2f}\n"
+        f"• Completed: {s['completed']}\n"
+        f"• Active: {s['active']}\n"
+        f"• Cancelled: {s['cancelled']}"
     )
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
 
 
 # ============================================================
@@ -254,40 +361,18 @@ async def week_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     now = ist_now().date()
     week_start = now - timedelta(days=6)
-
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT amount, status, created_at FROM deals")
-    rows = cur.fetchall()
-    conn.close()
-
-    total = volume = completed = active = cancelled = 0
-
-    for r in rows:
-        d = r["created_at"].split("T")[0]
-        if not (str(week_start) <= d <= str(now)):
-            continue
-
-        total += 1
-        volume += r["amount"] or 0
-
-        if r["status"] in ("completed","released"):
-            completed += 1
-        elif r["status"] == "active":
-            active += 1
-        else:
-            cancelled += 1
+    s = period_summary(tenant_id(update.effective_chat), week_start, now + timedelta(days=1))
 
     text = (
         f"📆 *Weekly Summary*\n{divider()}\n"
-        f"• Deals: {total}\n"
-        f"• Volume: ₹{volume:.2f}\n"
-        f"• Completed: {completed}\n"
-        f"• Active: {active}\n"
-        f"• Cancelled: {cancelled}"
+        f"• Deals: {s['total']}\n"
+        f"• Volume: ₹{s['volume']:.2f}\n"
+        f"• Completed: {s['completed']}\n"
+        f"• Active: {s['active']}\n"
+        f"• Cancelled: {s['cancelled']}"
     )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
 
 
 # ============================================================
@@ -297,16 +382,14 @@ async def week_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def escrow_pdf_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
+    ids_sql, params = deals_of(user_id=user.id, roles=("escrower",))
+
+    rows = fan_out(f"""
         SELECT *
         FROM deals
-        WHERE created_by=?
-        ORDER BY id DESC
-    """, (user.id,))
-    rows = cur.fetchall()
-    conn.close()
+        WHERE id IN ({ids_sql})
+    """, params)
+    rows.sort(key=lambda r: r["id"], reverse=True)
 
     if not rows:
         return await update.message.reply_text("ℹ️ You haven't escrowed any deals yet.")
@@ -323,16 +406,14 @@ async def history_pdf_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     user = update.effective_user
     uname = format_username(user)
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
+    ids_sql, params = deals_of(usernames(user.id, user.username), user.id)
+
+    rows = fan_out(f"""
         SELECT *
         FROM deals
-        WHERE buyer_username=? OR seller_username=? OR created_by=?
-        ORDER BY id DESC
-    """, (uname, uname, user.id))
-    rows = cur.fetchall()
-    conn.close()
+        WHERE id IN ({ids_sql})
+    """, params)
+    rows.sort(key=lambda r: r["id"], reverse=True)
 
     if not rows:
         return await update.message.reply_text("ℹ️ No deal history found.")
@@ -345,64 +426,78 @@ async def history_pdf_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 # 🌍 /gstats — Global Stats
 # ============================================================
 
-async def global_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def global_stats_text(chat_id=GLOBAL_TENANT):
+    tenant_sql, params = scope(chat_id)
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
+    row = fan_out_totals(f"""
         SELECT 
             COUNT(*) AS total,
             SUM(amount) AS volume,
             SUM(CASE WHEN status IN ('completed','released') THEN 1 ELSE 0 END) AS completed,
             SUM(CASE WHEN status='active' THEN 1 ELSE 0 END) AS active
         FROM deals
-    """)
-    row = cur.fetchone()
-    conn.close()
+        WHERE {tenant_sql}
+    """, params, tenant_shards(chat_id))
 
-    text = (
-        f"🌍 *Global Escrow Stats*\n{divider()}\n"
+    title = "Global Escrow Stats" if chat_id == GLOBAL_TENANT else "Group Escrow Stats"
+    return (
+        f"🌍 *{title}*\n{divider()}\n"
         f"🔢 Total Deals: {row['total']}\n"
         f"💰 Total Volume: ₹{(row['volume'] or 0):.2f}\n"
-        f"🎉 Completed: {row['completed']}\n"
-        f"⏳ Active: {row['active']}"
+        f"🎉 Completed: {row['completed'] or 0}\n"
+        f"⏳ Active: {row['active'] or 0}"
     )
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+
+async def global_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    text = global_stats_text(tenant_id(update.effective_chat))
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
 
 
 # ============================================================
 # 🏆 /topuser — Top 20 Traders
 # ============================================================
 
-async def topuser_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+def top_traders(chat_id, limit=20):
+    """[(username, volume)] of the biggest buyers and sellers by completed volume."""
+    tenant_sql, params = scope(chat_id, column="d.chat_id")
+
+    # Participants are keyed by normalized username and, once known, user
+    # id, so "@Rahul" and "rahul" (or a renamed user) count as one trader.
+    # Each shard sums its own rows; the partial sums are merged here.
+    rows = fan_out(f"""
+        SELECT p.user_id, p.username, SUM(d.amount) AS total
+        FROM deal_participants p
+        JOIN deals d ON d.id = p.deal_id
+        WHERE p.role IN ('buyer','seller')
+        AND p.status IN ('completed','released')
+        AND p.username IS NOT NULL AND p.username != ''
+        AND {tenant_sql}
+        GROUP BY p.user_id, p.username
+    """, params, tenant_shards(chat_id))
+
+    volume, names = {}, {}
+    for r in rows:
+        key = r["user_id"] or r["username"]
+        volume[key] = volume.get(key, 0) + (r["total"] or 0)
+        # Label a trader with the name carrying most of their volume
+        if r["total"] > names.get(key, (None, -1))[1]:
+            names[key] = (r["username"], r["total"])
 
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT buyer_username, seller_username, amount
-        FROM deals
-        WHERE status IN ('completed','released')
-    """)
+    ranking = sorted(volume.items(), key=lambda x: x[1], reverse=True)[:limit]
+    return [("@" + names[key][0], v) for key, v in ranking]
 
-    volume = {}
-    for r in cur.fetchall():
-        for u in (r["buyer_username"], r["seller_username"]):
-            if not u:
-                continue
-            volume[u] = volume.get(u, 0) + (r["amount"] or 0)
 
-    conn.close()
+async def topuser_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    ranking = top_traders(tenant_id(update.effective_chat))
 
-    if not volume:
+    if not ranking:
         return await update.message.reply_text("ℹ️ No completed deals yet.")
 
-    ranking = sorted(volume.items(), key=lambda x: x[1], reverse=True)[:20]
-
     text = "🏆 *Top 20 Traders*\n" + divider() + "\n\n"
     rank = 1
     for u, v in ranking:
-        text += f"#{rank} — {u} → ₹{v:.2f}\n"
+        text += f"#{rank} — {escape_markdown(u)} → ₹{v:.2f}\n"
         rank += 1
 
-    await update.message.reply_text(text, parse_mode="Markdown")
+    await send_reply(update.message, text, priority=PRIORITY_LOW)
@@ -0,0 +1,93 @@
+# identity.py
+# User identity registry
+# Maps Telegram user ids to their current and past usernames so deals
+# typed as "@Rahul_99" can be matched to the user who sends /stats as
+# rahul_99 (or after renaming to @rahul_new). Every incoming update is
+# seen by track_users_handler (group -3); new or changed (user_id,
+# username) pairs go to a write-behind buffer (writebehind.py). A crash
+# loses at most one flush interval; those users are simply recorded
+# again on their next message.
+
+import time
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from bus import subscribe
+from database import resolve_username, save_users, usernames_of
+from parsing import normalize_username
+from writebehind import WriteBehind
+
+REFRESH = 86400        # re-write an unchanged user's last_seen at most daily
+MAX_KNOWN = 200_000    # users remembered in memory before starting over
+
+KNOWN = {}  # user_id -> (username_key, seen_at) as last queued
+
+# (user_id, username, username_key, seen_at), one per user
+PENDING = WriteBehind("users", save_users, key=lambda row: row[0])
+
+# /reset_all empties users: record everyone again on their next update
+subscribe("reset", lambda key: KNOWN.clear())
+
+
+# =====================================================
+# 📌 BUFFER
+# =====================================================
+
+def see(user):
+    """Record a Telegram user; only new or changed usernames are queued."""
+    if user is None or user.is_bot:
+        return
+
+    key = normalize_username(user.username)
+    now = time.time()
+    known = KNOWN.get(user.id)
+    if known and known[0] == key and now - known[1] < REFRESH:
+        return
+
+    if len(KNOWN) >= MAX_KNOWN:
+        KNOWN.clear()
+    KNOWN[user.id] = (key, now)
+    PENDING.add((user.id, user.username, key, now))
+
+
+# =====================================================
+# 📌 LOOKUPS
+# =====================================================
+
+def resolve(username):
+    """@name -> user_id, including users seen but not yet written."""
+    key = normalize_username(username)
+    if not key:
+        return None
+    for user_id, _, pending_key, _ in PENDING.pending():
+        if pending_key == key:
+            return user_id
+    return resolve_username(key)
+
+
+def usernames(user_id, current=None):
+    """Normalized usernames of `user_id`: `current` first, then past ones."""
+    keys = [normalize_username(current)] if current else []
+    for key in usernames_of(user_id):
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+# =====================================================
+# 📌 HANDLER
+# =====================================================
+
+async def track_users_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Registered in group -3: note every user an update mentions."""
+    see(update.effective_user)
+
+    msg = update.effective_message
+    if msg is None:
+        return
+    if msg.reply_to_message:
+        see(msg.reply_to_message.from_user)
+    for member in msg.new_chat_members or ():
+        see(member)
+
@@ -0,0 +1,53 @@
+# inbound.py
+# Concurrent update processing that keeps each chat in order
+# Updates from different chats are handled concurrently (up to
+# MAX_CONCURRENT_UPDATES at once), but the updates of one chat run one
+# after another in arrival order, so "/add" then "/close", the ban gate
+# and flood history never race. Updates without a chat (inline queries)
+# are not ordered.
+
+import asyncio
+
+from telegram.ext import BaseUpdateProcessor
+
+MAX_CONCURRENT_UPDATES = 32     # handlers running at once
+MAX_PENDING_UPDATES = 10_000    # running or waiting for their chat's turn
+
+
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    """Per-chat FIFO locks in front of a global concurrency limit."""
+
+    def __init__(self, max_concurrent_updates=MAX_CONCURRENT_UPDATES):
+        # The base class semaphore is held while an update waits for its
+        # chat, so it only caps pending updates; a busy chat must not use
+        # up the handler slots, which are taken once the chat's turn comes.
+        super().__init__(MAX_PENDING_UPDATES)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chats = {}  # chat_id -> [asyncio.Lock, updates running or waiting]
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        # asyncio.Lock wakes waiters first-in first-out, and PTB starts one
+        # task per update in arrival order
+        entry = self._chats.get(chat.id)
+        if entry is None:
+            entry = self._chats[chat.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+# loadtest.py
+# End-to-end benchmark for Era Escrow Bot
+# Builds the real Application (main.build_application) against a local stub
+# of the Telegram Bot API, replays a weighted mix of commands at a target
+# rate and reports latency percentiles, throughput and DB time per command.
+#
+#   python loadtest.py                              # 20 updates/s for 30s
+#   python loadtest.py --rate 100 --duration 60 --mix add=2,status=5,stats=3
+#   python loadtest.py --workdir /tmp/escrow-bench  # reuse a dataset (datagen.py)
+#
+# Everything runs in --workdir (a fresh temp dir by default), so the bot's
+# own data/ is never touched. The outbound limiter is kept in the path but
+# not throttled unless --throttled is given, so Telegram's flood limits do
+# not hide handler cost. Latency is measured from the moment an update was
+# due (open loop), so a backlog shows up in the percentiles.
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BENCH_TOKEN = "123456:LOADTEST"
+ADMIN_ID = 1000
+TRADER_BASE = 5000
+
+# Own generator: seeding the global one would make the bot's random
+# trade ids repeat from run to run
+rng = random.Random()
+
+DEFAULT_MIX = "add=2,close=1,status=3,stats=3,today=1,topuser=1,history=0.5"
+COMMANDS = ("add", "close", "status", "stats", "today", "topuser", "history", "search", "inline")
+
+
+# =====================================================
+# 📌 FAKE BOT API
+# =====================================================
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # bursts of new connections after a stall
+
+
+class FakeBotAPI:
+    """
+    Minimal Bot API over HTTP: answers getMe, echoes a Message for every
+    send*/edit* call and True for everything else, after `latency` seconds.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _result(self, method, params):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            message_id = self._next_id
+            self._next_id += 1
+
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Escrow", "username": "escrow_bench_bot"}
+
+        if method.startswith(("send", "edit", "copy", "forward")):
+            chat_id = int(params.get("chat_id", 0) or 0)
+            return {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+                "text": params.get("text", ""),
+            }
+
+        if method.startswith("get"):
+            return []
+        return True
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                method = self.path.rsplit("/", 1)[-1]
+
+                if api.latency:
+                    time.sleep(api.latency)
+
+                payload = json.dumps({
+                    "ok": True,
+                    "result": api._result(method, _params(self.headers.get("Content-Type", ""), body)),
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+
+_MULTIPART_FIELD_RE = re.compile(rb'name="(\w+)"\r\n\r\n(.*?)\r\n--', re.S)
+
+
+def _params(content_type, body):
+    if content_type.startswith("multipart/"):
+        return {k.decode(): v.decode(errors="replace") for k, v in _MULTIPART_FIELD_RE.findall(body)}
+    if content_type.startswith("application/json"):
+        return json.loads(body or b"{}")
+    return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+
+
+# =====================================================
+# 📌 DB TIMING
+# =====================================================
+
+# Seconds spent in the database by the update being processed
+_db_time = contextvars.ContextVar("db_time", default=None)
+
+
+def _timed(fn, *args):
+    acc = _db_time.get()
+    if acc is None:
+        return fn(*args)
+    started = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        acc[0] += time.perf_counter() - started
+
+
+class _TimedCursor:
+    def __init__(self, cur):
+        self._cur = cur
+
+    def execute(self, *args):
+        _timed(self._cur.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        _timed(self._cur.executemany, *args)
+        return self
+
+    def fetchone(self):
+        return _timed(self._cur.fetchone)
+
+    def fetchall(self):
+        return _timed(self._cur.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _TimedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _TimedCursor(self._conn.cursor())
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def commit(self):
+        _timed(self._conn.commit)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def _instrument_backends():
+    """Wrap every backend's connect() so queries are charged to the update."""
+    import backends
+
+    for cls in (backends.SQLiteBackend, backends.PostgresBackend):
+        original = cls.connect
+
+        def connect(self, _original=original):
+            if _db_time.get() is None:
+                return _original(self)
+            return _TimedConnection(_timed(_original, self))
+
+        cls.connect = connect
+
+
+# =====================================================
+# 📌 DATASET
+# =====================================================
+
+def trader_username(i):
+    return f"@trader{i}"
+
+
+def bench_groups(count):
+    return [-(1_000_000_000_000 + i) for i in range(count)]
+
+
+def seed(deals, groups, traders):
+    """Insert `deals` deals spread over `groups` groups in one transaction per shard."""
+    from shards import connect_shard, shard_for
+    from database import connect
+    from participants import INSERT_PARTICIPANT, participant_rows
+    from utils import ist_now
+
+    now = ist_now()
+    rows = {}
+    catalog = connect()
+    cur = catalog.cursor()
+
+    for n in range(deals):
+        chat_id = groups[n % len(groups)]
+        trade_id = f"TID{n:07d}"
+        cur.execute(
+            "INSERT INTO deal_catalog (trade_id, chat_id, shard) VALUES (?, ?, ?) RETURNING id",
+            (trade_id, chat_id, shard_for(chat_id))
+        )
+        deal_id = cur.fetchone()["id"]
+
+        amount = float(rng.randint(100, 50_000))
+        buyer, seller = rng.sample(range(traders), 2)
+        created = (now - timedelta(minutes=rng.randint(0, 30 * 24 * 60))).isoformat()
+        status = rng.choice(("active", "completed", "completed", "released", "refunded"))
+        rows.setdefault(shard_for(chat_id), []).append((
+            deal_id, trade_id, trader_username(buyer), trader_username(seller),
+            ADMIN_ID, "@bench_admin", amount, max(amount * 0.01, 5), max(amount * 0.01, 5),
+            status, created, created, chat_id,
+        ))
+
+    catalog.commit()
+    catalog.close()
+
+    for shard, batch in rows.items():
+        conn = connect_shard(shard)
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO deals (
+                id, trade_id, buyer_username, seller_username,
+                created_by, created_by_username,
+                amount, fee, admin_earning,
+                status, created_at, updated_at, chat_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+        cur.executemany(INSERT_PARTICIPANT, [
+            p for r in batch for p in participant_rows(r[0], r[2], r[3], r[4], r[5], r[9], r[10])
+        ])
+        conn.commit()
+        conn.close()
+
+
+def has_deals():
+    from database import connect
+
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM deal_catalog LIMIT 1")
+    found = cur.fetchone() is not None
+    conn.close()
+    return found
+
+
+def active_deals(groups):
+    """Active trade ids per group of an existing dataset (--workdir reuse)."""
+    from shards import fan_out
+
+    active = {chat_id: [] for chat_id in groups}
+    for r in fan_out("SELECT trade_id, chat_id FROM deals WHERE status='active'"):
+        if r["chat_id"] in active:
+            active[r["chat_id"]].append(r["trade_id"])
+    return active
+
+
+# =====================================================
+# 📌 SYNTHETIC UPDATES
+# =====================================================
+
+class Workload:
+    """Turns a command name into a Telegram update dict."""
+
+    def __init__(self, groups, traders, active):
+        self.groups = groups
+        self.traders = traders
+        self.active = active
+        self._update_id = 0
+        self._message_id = 1_000_000
+
+    def _message(self, chat_id, user_id, username, text, reply_to=None):
+        self._message_id += 1
+        command = text.split()[0]
+        msg = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Bench {chat_id}"},
+            "from": {"id": user_id, "is_bot": False, "first_name": username, "username": username},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        }
+        if reply_to:
+            msg["reply_to_message"] = reply_to
+        return msg
+
+    def update(self, command):
+        self._update_id += 1
+        chat_id = rng.choice(self.groups)
+
+        if command in ("add", "close", "status"):
+            user_id, username = ADMIN_ID, "bench_admin"
+        else:
+            n = rng.randrange(self.traders)
+            user_id, username = TRADER_BASE + n, trader_username(n)[1:]
+
+        if command == "inline":
+            # Half full/partial trade ids, half @usernames
+            pool = self.active[chat_id]
+            if pool and rng.random() < 0.5:
+                trade_id = rng.choice(pool)
+                text = trade_id[:rng.randint(6, len(trade_id))]
+            else:
+                text = trader_username(rng.randrange(self.traders))
+            return {"update_id": self._update_id, "inline_query": {
+                "id": str(self._update_id),
+                "from": {"id": user_id, "is_bot": False, "first_name": username, "username": username},
+                "query": text,
+                "offset": "",
+            }}
+
+        if command == "add":
+            buyer, seller = rng.sample(range(self.traders), 2)
+            form = self._message(
+                chat_id, TRADER_BASE + buyer, trader_username(buyer)[1:],
+                f"DEAL INFO :\nBuyer : {trader_username(buyer)}\nSeller : {trader_username(seller)}\n"
+                f"Amount : {rng.randint(100, 50_000)}\nPayment : UPI",
+            )
+            form.pop("entities")
+            text = f"/add {rng.randint(100, 50_000)}"
+            msg = self._message(chat_id, user_id, username, text, reply_to=form)
+        elif command in ("close", "status"):
+            pool = self.active[chat_id]
+            if not pool:
+                trade_id = "TID0000000"
+            elif command == "close":
+                trade_id = pool.pop(rng.randrange(len(pool)))
+            else:
+                trade_id = rng.choice(pool)
+            msg = self._message(chat_id, user_id, username, f"/{command} #{trade_id}")
+        elif command == "search":
+            text = f"/search {trader_username(rng.randrange(self.traders))}"
+            msg = self._message(chat_id, user_id, username, text)
+        else:
+            msg = self._message(chat_id, user_id, username, f"/{command}")
+
+        return {"update_id": self._update_id, "message": msg}
+
+
+# =====================================================
+# 📌 RUNNER
+# =====================================================
+
+class Recorder:
+    def __init__(self):
+        self.latency = {}
+        self.db = {}
+        self.errors = {}
+        self.pending = {}
+
+    def done(self, command, latency, db):
+        self.latency.setdefault(command, []).append(latency)
+        self.db.setdefault(command, []).append(db)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+async def run(args, mix):
+    import perf
+    from telegram import Update
+    from main import build_application, load_state
+
+    perf.reset()
+    load_state()
+    app = build_application(updater=False, throttled=args.throttled)
+    recorder = Recorder()
+
+    process_update = app.process_update
+
+    async def timed_process_update(update):
+        command, due = recorder.pending.pop(update.update_id)
+        acc = [0.0]
+        _db_time.set(acc)
+        await process_update(update)
+        recorder.done(command, time.perf_counter() - due, acc[0])
+
+    async def count_error(update, context):
+        command = update.message.text.split()[0].lstrip("/") if update and update.message else "?"
+        recorder.errors[command] = recorder.errors.get(command, 0) + 1
+
+    app.process_update = timed_process_update
+    app.add_error_handler(count_error)
+
+    groups = bench_groups(args.groups)
+    active = active_deals(groups)
+    workload = Workload(groups, args.traders, active)
+    names, weights = zip(*mix.items())
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+
+    total = int(args.rate * args.duration)
+    started = time.perf_counter()
+    for i in range(total):
+        due = started + i / args.rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        command = rng.choices(names, weights)[0]
+        data = workload.update(command)
+        recorder.pending[data["update_id"]] = (command, due)
+        await app.update_queue.put(Update.de_json(data, app.bot))
+
+    deadline = time.perf_counter() + args.drain
+    while recorder.pending and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    await app.stop()
+    await app.shutdown()
+    if app.post_shutdown:
+        await app.post_shutdown(app)
+
+    return recorder, elapsed, app.bot.rate_limiter.metrics
+
+
+def report(recorder, elapsed, api, metrics):
+    completed = sum(len(v) for v in recorder.latency.values())
+
+    print()
+    print(f"{'command':<10}{'count':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db ms':>10}{'req/s':>9}")
+    for command in COMMANDS:
+        lat = recorder.latency.get(command)
+        if not lat:
+            continue
+        db = recorder.db[command]
+        print(
+            f"{command:<10}{len(lat):>8}{recorder.errors.get(command, 0):>6}"
+            f"{_percentile(lat, 50) * 1000:>10.1f}{_percentile(lat, 95) * 1000:>10.1f}"
+            f"{_percentile(lat, 99) * 1000:>10.1f}{sum(db) / len(db) * 1000:>10.2f}"
+            f"{len(lat) / elapsed:>9.1f}"
+        )
+
+    everything = [x for v in recorder.latency.values() for x in v]
+    if everything:
+        db_total = sum(x for v in recorder.db.values() for x in v)
+        print(
+            f"{'all':<10}{completed:>8}{sum(recorder.errors.values()):>6}"
+            f"{_percentile(everything, 50) * 1000:>10.1f}{_percentile(everything, 95) * 1000:>10.1f}"
+            f"{_percentile(everything, 99) * 1000:>10.1f}{db_total / completed * 1000:>10.2f}"
+            f"{completed / elapsed:>9.1f}"
+        )
+
+    import perf
+
+    print()
+    print("Top queries by total time:")
+    for sql, s in perf.top_queries(5):
+        print(f"  {s.latency.total * 1000:>9.0f} ms  ×{s.calls:<6} rows {s.rows:<8} {sql[:70]}")
+
+    print()
+    if recorder.pending:
+        print(f"⚠️  {len(recorder.pending)} updates still pending after the drain timeout")
+    print(f"Bot API calls: {dict(sorted(api.calls.items()))}")
+    snap = metrics.snapshot()
+    print(
+        f"Outbound: sent={snap['sent']} retried={snap['retried']} failed={snap['failed']} "
+        f"throttled={snap['throttled']} wait_max={snap['wait_max']:.2f}s"
+    )
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lstrip("/")
+        if name not in COMMANDS:
+            raise SystemExit(f"Unknown command in --mix: {name} (choose from {', '.join(COMMANDS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a synthetic command mix against the bot.")
+    parser.add_argument("--rate", type=float, default=20, help="updates per second (default 20)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load (default 30)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"command weights (default {DEFAULT_MIX})")
+    parser.add_argument("--groups", type=int, default=8, help="number of group chats (default 8)")
+    parser.add_argument("--traders", type=int, default=2000, help="distinct traders (default 2000)")
+    parser.add_argument("--seed-deals", type=int, default=5000, help="deals created before the run (default 5000)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="fake Bot API delay in ms (default 0)")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for the backlog (default 30)")
+    parser.add_argument("--throttled", action="store_true", help="apply the real outbound flood limits")
+    parser.add_argument("--workdir", help="directory holding data/ (default: fresh temp dir)")
+    parser.add_argument("--random-seed", type=int, default=1)
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rng.seed(args.random_seed)
+
+    api = FakeBotAPI(args.api_latency / 1000)
+    api.start()
+
+    # Configure the bot before its modules read config.py
+    workdir = args.workdir or tempfile.mkdtemp(prefix="escrow-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    sys.path.insert(0, HERE)
+    os.environ.update({
+        "BOT_TOKEN": BENCH_TOKEN,
+        "OWNER_ID": str(ADMIN_ID),
+        "BOT_API_URL": f"{api.url}/bot",
+        "BOT_API_FILE_URL": f"{api.url}/file/bot",
+        "WORKERS": "1",
+        "WEBHOOK_URL": "",
+    })
+    os.environ.setdefault("ESCROW_CONFIG", os.path.join(workdir, "config.env"))
+
+    import logging
+    import main  # noqa: F401  (imports every handler, configures logging)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    from database import add_admin, init_database
+    from shards import init_shards
+    from bus import init_bus
+
+    init_database()
+    init_shards()
+    init_bus()
+    add_admin(ADMIN_ID, "@bench_admin", "Bench Admin")
+    _instrument_backends()
+
+    if args.seed_deals and not has_deals():
+        t = time.perf_counter()
+        seed(args.seed_deals, bench_groups(args.groups), args.traders)
+        print(f"Seeded {args.seed_deals} deals in {time.perf_counter() - t:.1f}s")
+
+    print(f"Workdir {workdir} · {args.rate:g} updates/s for {args.duration:g}s · mix {args.mix}")
+    recorder, elapsed, metrics = asyncio.run(run(args, mix))
+    api.stop()
+    report(recorder, elapsed, api, metrics)
+
+
+if __name__ == "__main__":
+    main()
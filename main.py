@@ -1,24 +1,36 @@
 #!/usr/bin/env python3
 import logging
+from urllib.parse import urlparse
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
+    TypeHandler,
     filters
 )
+from telegram import Update
 
 # ==========================================
-# 🔐 BOT CONFIG (Inside main.py as requested)
+# 🔐 BOT CONFIG (environment / config.env, see config.py)
 # ==========================================
 
-BOT_TOKEN = "8389093783:AAFiQGG8SLs9ba7AmEHFrFMPzvqYUtOcGYU"
-OWNER_ID = 6847499628
-
-BOT_NAME = "Era Escrow Bot"
-POWERED_BY = "@LuffyBots"
+from config import (
+    BOT_TOKEN,
+    BOT_API_URL,
+    BOT_API_FILE_URL,
+    OWNER_ID,
+    BOT_NAME,
+    WORKERS,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    METRICS_LISTEN,
+    METRICS_PORT,
+)
 
-DB_PATH = "data/escrow.db"
 DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 
 LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
@@ -28,12 +40,22 @@ LOGGING_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
 # ==========================================
 
 from database import init_database
+from shards import init_shards
+from bus import init_bus
+from cluster import run_cluster
+from inbound import ChatOrderedProcessor
+from outbound import OutboundLimiter
+from perf import instrument, serve_metrics
+from identity import track_users_handler
+from writebehind import flush_on_shutdown, start as start_write_behind
 from utils import unknown_cmd_handler
+from pagination import pagination_callback_handler
 
 # Handlers
 from handlers.admin import (
     cmds_handler,
     menu_handler,
+    menu_callback_handler,
     panel_handler,
     add_admin_handler,
     remove_admin_handler,
@@ -48,6 +70,8 @@ from handlers.admin import (
     admin_earnings_handler,
     admin_compare_handler,
     top_admins_handler,
+    perf_handler,
+    slowlog_handler,
 )
 
 from handlers.deals import (
@@ -60,6 +84,9 @@ from handlers.deals import (
     ongoing_handler,
     holding_handler,
     notify_handler,
+    live_dashboard_handler,
+    stop_dashboard_handler,
+    start_dashboards,
 )
 
 from handlers.user import (
@@ -68,6 +95,8 @@ from handlers.user import (
     stats_tag_handler,
     my_deals_handler,
     find_handler,
+    search_handler,
+    search_callback_handler,
     today_handler,
     week_handler,
     escrow_pdf_handler,
@@ -77,6 +106,17 @@ from handlers.user import (
 )
 
 from handlers.moderation import (
+    ban_gate_handler,
+    load_bans,
+    restore_scheduled_actions,
+    set_warn_rule_handler,
+    remove_warn_rule_handler,
+    warn_rules_handler,
+    warn_expiry_handler,
+    bulk_ban_handler,
+    bulk_mute_handler,
+    bulk_kick_handler,
+    track_joins_handler,
     warn_handler,
     unwarn_handler,
     warns_handler,
@@ -99,8 +139,18 @@ from handlers.groups import (
     set_welcome_handler,
     set_farewell_handler,
     toggle_welcome_handler,
+    welcome_member,
+    farewell_member,
+)
+
+from handlers.protection import (
+    flood_filter_handler,
+    impersonation_join_handler,
+    rebuild_admin_index,
 )
 
+from handlers.inline import inline_deal_handler
+from handlers.digest import digest_handler, schedule_digests
 from handlers.logs import (
     test_handler,
     chatid_handler,
@@ -119,16 +169,57 @@ logger = logging.getLogger(__name__)
 
 
 # ==========================================
-# 🚀 MAIN BOT FUNCTION
+# 🧱 APPLICATION (shared by single-process and cluster workers)
 # ==========================================
 
-def main():
-
-    logger.info("📦 Initializing database...")
-    init_database()
-
-    logger.info("🤖 Starting Era Escrow Bot...")
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+def load_state():
+    """Fill this process's in-memory caches from the database."""
+    load_bans()
+    rebuild_admin_index()
+
+
+def build_application(updater=True, share=1, throttled=True):
+    """
+    Build the bot with every handler registered. Cluster workers pass
+    updater=False (updates arrive from the ingress) and share=WORKERS;
+    loadtest.py passes throttled=False to measure the handlers alone.
+    """
+    builder = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .base_url(BOT_API_URL)
+        .base_file_url(BOT_API_FILE_URL)
+        .rate_limiter(OutboundLimiter(share, throttled))
+        .concurrent_updates(ChatOrderedProcessor())
+        .post_shutdown(flush_on_shutdown)
+    )
+    if not updater:
+        builder = builder.updater(None)
+    app = builder.build()
+
+    # Timed unmute / unban / warn expiry saved before the last restart
+    restore_scheduled_actions(app.job_queue)
+
+    # Buffered passive writes (user registry, ...); the rest on post_shutdown
+    start_write_behind(app.job_queue)
+
+    # Off-peak daily / weekly digests to the log channels
+    schedule_digests(app.job_queue)
+
+    # Live dashboards of this worker's groups, edited after deal changes
+    start_dashboards(app.job_queue)
+
+    # ========== USER REGISTRY (every update, even from banned users) ==========
+    app.add_handler(TypeHandler(Update, track_users_handler), group=-3)
+
+    # ========== BAN GATE ==========
+    app.add_handler(TypeHandler(Update, ban_gate_handler), group=-2)
+
+    # ========== ANTI-FLOOD (every group message) ==========
+    app.add_handler(
+        MessageHandler(filters.ChatType.GROUPS & ~filters.StatusUpdate.ALL, flood_filter_handler),
+        group=-1
+    )
 
     # ========== USER COMMANDS ==========
     app.add_handler(CommandHandler("start", start_handler))
@@ -154,7 +245,10 @@ def main():
     app.add_handler(CommandHandler("ongoing", ongoing_handler))
     app.add_handler(CommandHandler("holding", holding_handler))
     app.add_handler(CommandHandler("notify", notify_handler))
+    app.add_handler(CommandHandler("livedash", live_dashboard_handler))
+    app.add_handler(CommandHandler("stopdash", stop_dashboard_handler))
     app.add_handler(CommandHandler("find", find_handler))
+    app.add_handler(CommandHandler("search", search_handler))
 
     # ========== ADMIN PANEL ==========
     app.add_handler(CommandHandler("cmds", cmds_handler))
@@ -177,6 +271,9 @@ def main():
     app.add_handler(CommandHandler("myearnings", admin_earnings_handler))
     app.add_handler(CommandHandler("adminwise", admin_compare_handler))
     app.add_handler(CommandHandler("topadmins", top_admins_handler))
+    app.add_handler(CommandHandler("perf", perf_handler))
+    app.add_handler(CommandHandler("slowlog", slowlog_handler))
+    app.add_handler(CommandHandler("digest", digest_handler))
 
     # ========== MODERATION ==========
     app.add_handler(CommandHandler("warn", warn_handler))
@@ -192,6 +289,17 @@ def main():
     app.add_handler(CommandHandler("notes", notes_handler))
     app.add_handler(CommandHandler("clean_warns", clean_warns_handler))
     app.add_handler(CommandHandler("clean_notes", clean_notes_handler))
+    app.add_handler(CommandHandler("setwarnrule", set_warn_rule_handler))
+    app.add_handler(CommandHandler("delwarnrule", remove_warn_rule_handler))
+    app.add_handler(CommandHandler("warnrules", warn_rules_handler))
+    app.add_handler(CommandHandler("warnexpiry", warn_expiry_handler))
+    app.add_handler(CommandHandler("bulkban", bulk_ban_handler))
+    app.add_handler(CommandHandler("bulkmute", bulk_mute_handler))
+    app.add_handler(CommandHandler("bulkkick", bulk_kick_handler))
+
+    # Join log for bulk actions (own group so other join handlers still run)
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, track_joins_handler), group=1)
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, impersonation_join_handler), group=2)
 
     # ========== GROUP MANAGEMENT ==========
     app.add_handler(CommandHandler("setgroup", set_group_handler))
@@ -200,19 +308,67 @@ def main():
     app.add_handler(CommandHandler("setwelcome", set_welcome_handler))
     app.add_handler(CommandHandler("setfarewell", set_farewell_handler))
     app.add_handler(CommandHandler("togglewelcome", toggle_welcome_handler))
+    app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, welcome_member))
+    app.add_handler(MessageHandler(filters.StatusUpdate.LEFT_CHAT_MEMBER, farewell_member))
 
     # ========== UTILITIES ==========
     app.add_handler(CommandHandler("test", test_handler))
     app.add_handler(CommandHandler("chatid", chatid_handler))
 
     # ========== CALLBACK QUERIES ==========
-    app.add_handler(CallbackQueryHandler(menu_handler))
+    app.add_handler(CallbackQueryHandler(pagination_callback_handler, pattern=r"^pg:"))
+    app.add_handler(CallbackQueryHandler(search_callback_handler, pattern=r"^sr:"))
+    app.add_handler(CallbackQueryHandler(menu_callback_handler))
+
+    # ========== INLINE MODE (@bot TID123456 / @bot @user) ==========
+    app.add_handler(InlineQueryHandler(inline_deal_handler))
 
     # UNKNOWN COMMAND
     app.add_handler(MessageHandler(filters.COMMAND, unknown_cmd_handler))
 
+    # Latency / DB time per handler for /perf and /metrics
+    instrument(app)
+
+    return app
+
+
+# ==========================================
+# 🚀 MAIN BOT FUNCTION
+# ==========================================
+
+def main():
+
+    if not BOT_TOKEN:
+        raise SystemExit("BOT_TOKEN is not set (environment or config.env)")
+    if not OWNER_ID:
+        logger.warning("⚠️ OWNER_ID is not set; owner commands are disabled")
+
+    logger.info("📦 Initializing database...")
+    init_database()
+    init_shards()
+    init_bus()
+
+    if WORKERS > 1:
+        logger.info("🤖 Starting %s with %s workers...", BOT_NAME, WORKERS)
+        run_cluster(BOT_TOKEN, WORKERS, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_SECRET)
+        return
+
+    logger.info("🤖 Starting %s...", BOT_NAME)
+    load_state()
+    app = build_application()
+    serve_metrics(METRICS_LISTEN, METRICS_PORT)
+
     logger.info("🚀 Bot is now running...")
-    app.run_polling()
+    if WEBHOOK_URL:
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET or None,
+        )
+    else:
+        app.run_polling()
 
 
 # ==========================================
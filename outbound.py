@@ -0,0 +1,243 @@
+# outbound.py
+# Central outbound messaging layer for Era Escrow Bot
+# Every Bot API call goes through OutboundLimiter: token buckets per chat
+# and globally, priority lanes, automatic RetryAfter handling and metrics.
+
+import asyncio
+import logging
+import time
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================
+# 📌 PRIORITY LANES (lower number = sent first)
+# =====================================================
+
+PRIORITY_HIGH = 0      # deal confirmations, callback answers
+PRIORITY_NORMAL = 1    # regular command replies
+PRIORITY_LOW = 2       # stats, summaries, PDF reports
+
+PRIORITY_NAMES = {
+    PRIORITY_HIGH: "high",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_LOW: "low",
+}
+
+# Endpoints that must never wait behind normal traffic
+URGENT_ENDPOINTS = {"answerCallbackQuery", "answerInlineQuery"}
+
+# Endpoints that default to the low lane when no priority is given
+BULK_ENDPOINTS = {"sendDocument", "sendPhoto"}
+
+# Only calls that post or change messages count against per-chat limits;
+# admin actions (ban, restrict, ...) are limited by the global bucket only
+CHAT_LIMITED_PREFIXES = ("send", "copy", "forward", "edit")
+
+
+# =====================================================
+# 📌 LIMITS (Telegram flood limits, with a small margin)
+# =====================================================
+
+GLOBAL_RATE = 28            # messages / second across all chats
+GLOBAL_BURST = 30
+PRIVATE_RATE = 1            # messages / second per private chat
+PRIVATE_BURST = 3
+GROUP_RATE = 20 / 60        # messages / second per group
+GROUP_BURST = 5
+
+MAX_RETRIES = 3
+POLL_INTERVAL = 0.05
+
+
+# =====================================================
+# 📌 TOKEN BUCKET
+# =====================================================
+
+class TokenBucket:
+    """Classic token bucket with priority-aware waiting."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = [0] * len(PRIORITY_NAMES)
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, now):
+        """Seconds until one token is available (0 if available now)."""
+        self._refill(now)
+        pause = self.paused_until - now
+        if self.tokens >= 1:
+            return max(pause, 0)
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Block this bucket for `seconds` (used on RetryAfter)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self, now):
+        """True when the bucket is full and nobody waits on it."""
+        self._refill(now)
+        return (
+            self.tokens >= self.burst
+            and not any(self.waiting)
+            and self.paused_until <= now
+        )
+
+    async def acquire(self, priority):
+        """Wait for a token; lower lanes yield while higher lanes wait."""
+        self.waiting[priority] += 1
+        try:
+            while True:
+                now = time.monotonic()
+                if any(self.waiting[:priority]):
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+
+                wait = self.delay(now)
+                if wait <= 0:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep(min(wait, 1.0))
+        finally:
+            self.waiting[priority] -= 1
+
+
+# =====================================================
+# 📌 DELIVERY METRICS
+# =====================================================
+
+class DeliveryMetrics:
+    """Counters describing outbound traffic."""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.by_lane = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.by_endpoint = {}
+
+    def record_wait(self, waited):
+        if waited > 0.001:
+            self.throttled += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def record_sent(self, endpoint, priority):
+        self.sent += 1
+        self.by_lane[PRIORITY_NAMES[priority]] += 1
+        self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def snapshot(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "throttled": self.throttled,
+            "wait_avg": self.wait_total / self.throttled if self.throttled else 0.0,
+            "wait_max": self.wait_max,
+            "by_lane": dict(self.by_lane),
+            "by_endpoint": dict(self.by_endpoint),
+        }
+
+
+# =====================================================
+# 📌 OUTBOUND LIMITER (plugged into ApplicationBuilder)
+# =====================================================
+
+class OutboundLimiter(BaseRateLimiter):
+    """
+    Throttles all Bot API requests. Pass a priority per call with
+    `rate_limit_args={"priority": PRIORITY_HIGH}` (see utils.send_reply).
+    """
+
+    def __init__(self, share=1, throttled=True):
+        # With N worker processes each one gets 1/N of the global budget;
+        # per-chat buckets stay whole because a chat lives in one worker.
+        # throttled=False keeps priorities, retries and metrics but never
+        # waits for tokens (load tests against a local API stub).
+        self.throttled = throttled
+        self.metrics = DeliveryMetrics()
+        self._global = TokenBucket(GLOBAL_RATE / share, max(1, GLOBAL_BURST // share))
+        self._chats = {}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        self._chats.clear()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Drop idle buckets so the dict does not grow forever
+            if len(self._chats) > 10_000:
+                now = time.monotonic()
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+
+            if str(chat_id).startswith("-"):
+                bucket = TokenBucket(GROUP_RATE, GROUP_BURST)
+            else:
+                bucket = TokenBucket(PRIVATE_RATE, PRIVATE_BURST)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    @staticmethod
+    def _priority(endpoint, rate_limit_args):
+        if endpoint in URGENT_ENDPOINTS:
+            return PRIORITY_HIGH
+        if isinstance(rate_limit_args, dict) and "priority" in rate_limit_args:
+            return min(max(int(rate_limit_args["priority"]), PRIORITY_HIGH), PRIORITY_LOW)
+        if endpoint in BULK_ENDPOINTS:
+            return PRIORITY_LOW
+        return PRIORITY_NORMAL
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = self._priority(endpoint, rate_limit_args)
+        chat_id = data.get("chat_id")
+        chat_bucket = None
+        if self.throttled and chat_id is not None and endpoint.startswith(CHAT_LIMITED_PREFIXES):
+            chat_bucket = self._chat_bucket(chat_id)
+
+        for attempt in range(MAX_RETRIES + 1):
+            started = time.monotonic()
+            if chat_bucket is not None:
+                await chat_bucket.acquire(priority)
+            if self.throttled:
+                await self._global.acquire(priority)
+            self.metrics.record_wait(time.monotonic() - started)
+
+            try:
+                result = await callback(*args, **kwargs)
+            except RetryAfter as e:
+                retry_after = float(e.retry_after)
+                logger.warning(
+                    "⏳ Flood limit on %s (chat %s): retry in %ss", endpoint, chat_id, retry_after
+                )
+                (chat_bucket or self._global).pause(retry_after)
+                if attempt == MAX_RETRIES:
+                    self.metrics.failed += 1
+                    raise
+                self.metrics.retried += 1
+                continue
+            except Exception:
+                self.metrics.failed += 1
+                raise
+
+            self.metrics.record_sent(endpoint, priority)
+            return result
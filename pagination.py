@@ -0,0 +1,198 @@
+# pagination.py
+# Keyset pagination for long list replies (/ongoing, /mydeals, /find, ...)
+# Each page fetches PAGE_SIZE + 1 rows; "next/prev" buttons carry the key
+# of the boundary row so a click reads exactly one page from the index.
+
+import hashlib
+
+from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from cache import TTLCache
+from shards import connect_shard
+from tenancy import is_tenant_admin, tenant_id
+
+PAGE_SIZE = 15
+CALLBACK_PREFIX = "pg"
+MAX_CALLBACK_BYTES = 64  # Telegram limit for callback_data
+LONG_ARG_PREFIX = "~"    # arg replaced by a digest, see _callback_data
+LONG_ARG_TTL = 86400     # seconds a digest's buttons keep working
+
+# name -> Paginator, filled as handler modules define their lists
+PAGINATORS = {}
+
+# digest -> arg, for args too long to fit in callback_data
+_long_args = TTLCache(ttl=LONG_ARG_TTL, maxsize=10_000)
+
+
+# ============================================================
+# 📄 PAGINATOR
+# ============================================================
+
+class Paginator:
+    """
+    Describes one paginated list.
+
+    where(arg, user) -> (sql, params) filters the rows; `arg` is the string
+    stored in the buttons (e.g. a username), `user` is whoever pressed.
+    Rows are ordered by `key` descending (newest first).
+
+    shards(arg, user) -> shard numbers to read (see shards.py); each shard
+    returns one page and the pages are merged on `key`, which is globally
+    unique for deals. Lists outside the deal ledger use the main file.
+    """
+
+    def __init__(self, name, table, columns, where, header, row, empty,
+                 key="id", admin_only=False, shards=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.header = header
+        self.row = row
+        self.empty = empty
+        self.key = key
+        self.admin_only = admin_only
+        self.shards = shards
+        PAGINATORS[name] = self
+
+    # --------------------------------------------------------
+    # Query one page
+    # --------------------------------------------------------
+
+    def fetch(self, arg, user, cursor=None, backwards=False):
+        """Return (rows, has_prev, has_next) for the page after/before `cursor`."""
+        sql, params = self.where(arg, user)
+        clauses = [f"({sql})"] if sql else []
+        params = list(params)
+
+        if cursor is not None:
+            clauses.append(f"{self.key} {'>' if backwards else '<'} ?")
+            params.append(cursor)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "ASC" if backwards else "DESC"
+
+        shards = self.shards(arg, user) if self.shards else [0]
+        rows = []
+        for shard in shards:
+            conn = connect_shard(shard)
+            cur = conn.cursor()
+            cur.execute(
+                f"SELECT {self.key} AS _key, {self.columns} FROM {self.table} "
+                f"{where} ORDER BY {self.key} {order} LIMIT ?",
+                (*params, PAGE_SIZE + 1),
+            )
+            rows.extend(cur.fetchall())
+            conn.close()
+
+        if len(shards) > 1:
+            rows.sort(key=lambda r: r["_key"], reverse=not backwards)
+            rows = rows[:PAGE_SIZE + 1]
+
+        more = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+
+        if backwards:
+            rows.reverse()
+            return rows, more, True
+        return rows, cursor is not None, more
+
+    # --------------------------------------------------------
+    # Render text + buttons
+    # --------------------------------------------------------
+
+    def _callback_data(self, direction, cursor, page, arg):
+        data = f"{CALLBACK_PREFIX}:{self.name}:{direction}:{cursor}:{page}:{arg or ''}"
+        if len(data.encode()) <= MAX_CALLBACK_BYTES and not (arg or "").startswith(LONG_ARG_PREFIX):
+            return data
+
+        # The arg does not fit: the button carries a digest and the arg
+        # stays in memory. After a restart the list reports it expired.
+        digest = LONG_ARG_PREFIX + hashlib.blake2b(arg.encode(), digest_size=8).hexdigest()
+        _long_args.set(digest, arg)
+        return f"{CALLBACK_PREFIX}:{self.name}:{direction}:{cursor}:{page}:{digest}"
+
+    def render(self, rows, has_prev, has_next, page, arg):
+        text = self.header(arg) + "".join(self.row(r) for r in rows)
+
+        buttons = []
+        if has_prev:
+            buttons.append(InlineKeyboardButton(
+                "⬅️ Prev", callback_data=self._callback_data("p", rows[0]["_key"], page - 1, arg)
+            ))
+        if has_next:
+            buttons.append(InlineKeyboardButton(
+                "Next ➡️", callback_data=self._callback_data("n", rows[-1]["_key"], page + 1, arg)
+            ))
+
+        if buttons:
+            text += f"\n📄 Page {page}"
+
+        markup = InlineKeyboardMarkup([buttons]) if buttons else None
+        return text, markup
+
+    def preview(self, arg=None, user=None):
+        """First page as plain text (no buttons) for dashboards."""
+        rows, _, has_next = self.fetch(arg, user)
+        if not rows:
+            return self.empty
+
+        text = self.header(arg) + "".join(self.row(r) for r in rows)
+        if has_next:
+            text += f"\n… use /{self.name} for the full list"
+        return text
+
+    # --------------------------------------------------------
+    # First page (from a command)
+    # --------------------------------------------------------
+
+    async def send(self, message, user, arg=None, empty=None):
+        rows, has_prev, has_next = self.fetch(arg, user)
+
+        if not rows:
+            return await message.reply_text(empty or self.empty, parse_mode="Markdown")
+
+        text, markup = self.render(rows, has_prev, has_next, 1, arg)
+        await message.reply_text(text, parse_mode="Markdown", reply_markup=markup)
+
+
+# ============================================================
+# 🔘 CALLBACK: pg:<list>:<n|p>:<cursor>:<page>:<arg or ~digest>
+# ============================================================
+
+async def pagination_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+
+    try:
+        _, name, direction, cursor, page, arg = query.data.split(":", 5)
+        paginator = PAGINATORS[name]
+        cursor, page = int(cursor), int(page)
+        if arg.startswith(LONG_ARG_PREFIX):
+            arg = _long_args.get(arg)
+            if arg is None:
+                raise KeyError
+    except (ValueError, KeyError):
+        return await query.answer("❗ This list has expired.")
+
+    chat_tenant = tenant_id(query.message.chat if query.message else None)
+    if paginator.admin_only and not is_tenant_admin(query.from_user.id, chat_tenant):
+        return await query.answer("⛔ Admin only!", show_alert=True)
+
+    rows, has_prev, has_next = paginator.fetch(
+        arg or None, query.from_user, cursor, backwards=(direction == "p")
+    )
+    await query.answer()
+
+    if not rows:
+        return
+
+    text, markup = paginator.render(rows, has_prev, has_next, page, arg or None)
+
+    try:
+        await query.edit_message_text(text, parse_mode="Markdown", reply_markup=markup)
+    except BadRequest as e:
+        # Double clicks re-render the same page
+        if "not modified" not in str(e).lower():
+            raise
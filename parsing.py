@@ -0,0 +1,184 @@
+# parsing.py
+# Shared command/message parsing for Era Escrow Bot
+# All patterns are compiled once at import time.
+
+import re
+
+
+# ============================================================
+# 🔧 Precompiled Patterns
+# ============================================================
+
+# One pass over a DEAL INFO message: every "<field> : <value>" pair.
+# "deal amount" must come before "deal" so the longer key wins; the
+# lookahead lets the scanner skip positions that cannot start a key.
+# Group 2 is the first non-blank text after the separator, even on a
+# later line ("Buyer :\n@rahul"), but is not consumed; group 3 is the rest
+# of the key's own line, so an empty "Deal :" never swallows the next field.
+_FIELD_RE = re.compile(
+    r"(?=[bsadtpBSADTP])\b(buyer|seller|(?:deal\s+)?amount|deal|time|payment)\s*[:\-]"
+    r"(?=\s*([^\n]*))[ \t]*([^\n]*)",
+    re.IGNORECASE,
+)
+
+_USERNAME_RE = re.compile(r"@\w+")
+_USERNAME_EDGES = re.compile(r"^[\s@]+|\s+$")
+_AMOUNT_RE = re.compile(r"(\d+(?:\.\d+)?)([kKmM]?)")
+
+_USER_FIELD_RES = {
+    key: re.compile(rf"{key}\s*[:\-]\s*(@\w+)", re.IGNORECASE)
+    for key in ("buyer", "seller")
+}
+
+_SUFFIX = {"": 1, "k": 1000, "m": 1_000_000}
+
+_DURATION_RE = re.compile(r"(\d+)\s*([smhdw]?)", re.IGNORECASE)
+_DURATION_UNITS = {"": 60, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Optional fields reported by parse_deal_form besides buyer/seller/amount
+OPTIONAL_FIELDS = ("deal", "time", "payment")
+
+
+# ============================================================
+# 🔢 Amount Parser (10k, 1m, 5.5k, 1,500 etc.)
+# ============================================================
+
+def parse_amount(s: str):
+    """Convert human amount like 10k → 10000"""
+    if not s:
+        return None
+
+    m = _AMOUNT_RE.match(s.replace(",", "").strip())
+    if not m:
+        return None
+
+    return float(m.group(1)) * _SUFFIX[m.group(2).lower()]
+
+
+# ============================================================
+# 🆔 Trade ID (#tid123456 → TID123456)
+# ============================================================
+
+def parse_trade_id(s: str):
+    return s.upper().replace("#", "")
+
+
+# ============================================================
+# ⏳ Duration (30m, 24h, 7d; bare numbers are minutes)
+# ============================================================
+
+def parse_duration(s: str):
+    """Convert '24h' → 86400 seconds. Returns None if invalid."""
+    if not s:
+        return None
+
+    m = _DURATION_RE.fullmatch(s.strip())
+    if not m:
+        return None
+
+    return int(m.group(1)) * _DURATION_UNITS[m.group(2).lower()]
+
+
+def format_duration(seconds):
+    for unit, size in (("w", 604800), ("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+# ============================================================
+# 👤 Username key (@Rahul_99 → rahul_99)
+# ============================================================
+
+def normalize_username(s):
+    """Lookup key for a Telegram username: no @, lowercase; None if empty."""
+    if not s:
+        return None
+    # "@ rahul" and " @rahul" give the same key as "@rahul"
+    s = _USERNAME_EDGES.sub("", s).lower()
+    return s or None
+
+
+# ============================================================
+# 💬 Single username field (Buyer/Seller)
+# ============================================================
+
+def extract_user(text: str, key: str):
+    pattern = _USER_FIELD_RES.get(key.lower())
+    if pattern is None:
+        pattern = re.compile(rf"{re.escape(key)}\s*[:\-]\s*(@\w+)", re.IGNORECASE)
+
+    m = pattern.search(text)
+    return m.group(1) if m else None
+
+
+# ============================================================
+# 📝 Deal Info Parser (single pass)
+# ============================================================
+
+def parse_deal_form(text: str):
+    """
+    Extract buyer, seller, amount and the optional fields in one scan.
+    The first occurrence of each field wins.
+    """
+    form = {"buyer": None, "seller": None, "amount": None}
+    for key in OPTIONAL_FIELDS:
+        form[key] = None
+
+    if not text:
+        return form
+
+    for m in _FIELD_RE.finditer(text):
+        key = m.group(1).lower()
+        if key.endswith("amount"):
+            key = "amount"
+        if form[key] is not None:
+            continue
+
+        # Required fields may sit on the next line; optional ones may not
+        value = m.group(2 if key in ("buyer", "seller", "amount") else 3).strip()
+
+        if key in ("buyer", "seller"):
+            u = _USERNAME_RE.match(value)
+            form[key] = u.group(0) if u else None
+        elif key == "amount":
+            form[key] = parse_amount(value)
+        else:
+            form[key] = value or None
+
+    return form
+
+
+# ============================================================
+# ⏱ Micro-benchmark: python parsing.py
+# ============================================================
+
+SAMPLE_FORMS = [
+    "DEAL INFO :\nBuyer : @rahul_99\nSeller : @seller_bhai\nAmount : 1500\n"
+    "Deal : Instagram account\nTime : 2 days\nPayment : UPI",
+    "buyer - @alpha\nseller - @beta\ndeal amount - 2.5k",
+    "• Buyer: @x_user\n• Seller: @y_user\n• Amount: 1,20,000\n• Payment: USDT",
+    "Buyer:@a\nSeller:@b\nAmount:1m",
+    "hello admin, please escrow this\nbuyer @nobody\namount: ten",
+]
+
+
+def _bench(number=20000):
+    import timeit
+
+    def legacy(text):
+        buyer = re.search(r"buyer\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
+        seller = re.search(r"seller\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
+        amount = re.search(r"(amount|deal amount)\s*[:\-]\s*([^\n]+)", text, re.IGNORECASE)
+        if amount:
+            amount = parse_amount(amount.group(2).strip())
+        return buyer, seller, amount
+
+    for name, fn in (("legacy", legacy), ("parse_deal_form", parse_deal_form)):
+        t = timeit.timeit(lambda: [fn(s) for s in SAMPLE_FORMS], number=number)
+        per = t / (number * len(SAMPLE_FORMS)) * 1e6
+        print(f"{name:>16}: {per:.2f} µs / message")
+
+
+if __name__ == "__main__":
+    _bench()
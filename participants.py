@@ -0,0 +1,120 @@
+# participants.py
+# Per-user index of the deal ledger
+# Every deal gets one deal_participants row per role (buyer, seller,
+# escrower) in the same shard, keyed by the normalized username and, when
+# known (identity.py), the Telegram user id. Per-user lookups (/stats, /mydeals, /find,
+# /history, /escrow) read deal ids from the (username, ...) or (user_id, ...)
+# index instead of OR-ing buyer_username/seller_username/created_by over
+# the whole deals table. status and created_at are copied from the deal so
+# filters stay inside the index; set_deal_status() keeps status in step.
+
+from parsing import normalize_username
+
+ROLES = ("buyer", "seller", "escrower")
+
+INSERT_PARTICIPANT = """
+    INSERT INTO deal_participants (deal_id, role, username, user_id, status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (deal_id, role) DO NOTHING
+"""
+
+
+# =====================================================
+# 📌 SCHEMA
+# =====================================================
+
+def create_participants_table(cur):
+    """Create the table next to `deals` and index deals that predate it."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS deal_participants (
+            deal_id INTEGER,
+            role TEXT,
+            username TEXT,
+            user_id INTEGER,
+            status TEXT,
+            created_at TEXT,
+            PRIMARY KEY (deal_id, role)
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_participants_username
+        ON deal_participants (username, status, created_at, role, deal_id)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_participants_user
+        ON deal_participants (user_id, status, created_at, role, deal_id)
+    """)
+
+    cur.execute("SELECT 1 FROM deal_participants LIMIT 1")
+    if cur.fetchone() is None:
+        for role, username, user_id in (
+            ("buyer", "buyer_username", "NULL"),
+            ("seller", "seller_username", "NULL"),
+            ("escrower", "created_by_username", "created_by"),
+        ):
+            cur.execute(f"""
+                INSERT INTO deal_participants (deal_id, role, username, user_id, status, created_at)
+                SELECT id, '{role}', LOWER(LTRIM({username}, '@')), {user_id}, status, created_at
+                FROM deals
+            """)
+
+
+# =====================================================
+# 📌 WRITES (same transaction as the deals row)
+# =====================================================
+
+def participant_rows(deal_id, buyer, seller, created_by, created_by_username, status, created_at,
+                     buyer_id=None, seller_id=None):
+    """deal_participants rows for one deal, for executemany(INSERT_PARTICIPANT)."""
+    return [
+        (deal_id, "buyer", normalize_username(buyer), buyer_id, status, created_at),
+        (deal_id, "seller", normalize_username(seller), seller_id, status, created_at),
+        (deal_id, "escrower", normalize_username(created_by_username), created_by, status, created_at),
+    ]
+
+
+def add_participants(cur, deal_id, buyer, seller, created_by, created_by_username, status, created_at,
+                     buyer_id=None, seller_id=None):
+    cur.executemany(
+        INSERT_PARTICIPANT,
+        participant_rows(
+            deal_id, buyer, seller, created_by, created_by_username, status, created_at,
+            buyer_id, seller_id
+        )
+    )
+
+
+def set_deal_status(cur, deal_id, status, updated_at):
+    cur.execute("UPDATE deals SET status=?, updated_at=? WHERE id=?", (status, updated_at, deal_id))
+    cur.execute("UPDATE deal_participants SET status=? WHERE deal_id=?", (status, deal_id))
+
+
+# =====================================================
+# 📌 LOOKUPS (SQL fragments for `deals.id IN (...)`)
+# =====================================================
+
+def deals_of(usernames=(), user_id=None, roles=ROLES, status=None):
+    """
+    (sql, params) selecting the deal ids of a user, by normalized username(s)
+    and/or user id, for use as `id IN ({sql})`.
+    """
+    if isinstance(usernames, str):
+        usernames = (usernames,)
+    usernames = [u for u in usernames if u]
+
+    role_sql = "" if roles == ROLES else f" AND role IN ({', '.join('?' * len(roles))})"
+    role_params = () if roles == ROLES else tuple(roles)
+    status_sql = " AND status=?" if status else ""
+    status_params = (status,) if status else ()
+
+    parts, params = [], []
+    for username in usernames:
+        parts.append(f"SELECT deal_id FROM deal_participants WHERE username=?{status_sql}{role_sql}")
+        params += [username, *status_params, *role_params]
+    if user_id is not None:
+        parts.append(f"SELECT deal_id FROM deal_participants WHERE user_id=?{status_sql}{role_sql}")
+        params += [user_id, *status_params, *role_params]
+
+    if not parts:
+        return "SELECT NULL WHERE 1=0", ()
+    return " UNION ".join(parts), tuple(params)
@@ -15,6 +15,8 @@ from io import BytesIO
 from datetime import datetime, timedelta, timezone
 
 from database import connect
+from identity import usernames
+from participants import deals_of
 
 
 # India time offset
@@ -139,23 +141,20 @@ def build_escrow_pdf(user_id, uname):
 
 def build_history_pdf(user_id, uname):
 
+    # Every username this user has had, plus their id
+    names = usernames(user_id, uname)
+    usertag = f"@{names[0]}" if names else uname
+    ids_sql, params = deals_of(names, user_id)
+
     conn = connect()
     cur = conn.cursor()
-
-    # username of this user
-    cur.execute("SELECT username FROM users WHERE user_id=?", (user_id,))
-    fetch = cur.fetchone()
-
-    # fallback
-    usertag = uname if not fetch else fetch["username"]
-
-    cur.execute("""
+    cur.execute(f"""
         SELECT buyer_username, seller_username, created_by_username,
                trade_id, amount, status, created_at
         FROM deals
-        WHERE buyer_username=? OR seller_username=? OR created_by=?
+        WHERE id IN ({ids_sql})
         ORDER BY id DESC
-    """, (usertag, usertag, user_id))
+    """, params)
 
     deals = cur.fetchall()
     conn.close()
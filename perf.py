@@ -0,0 +1,359 @@
+# perf.py
+# Runtime instrumentation for Era Escrow Bot
+# instrument(app) times every registered handler; track(conn) wraps the
+# connections handed out by database.connect() / shards.connect_shard() so
+# every query is timed and charged to the handler that ran it; slow ones
+# also go to slowlog.py. Results are shown by the owner-only /perf command
+# and, when METRICS_PORT is set, served in Prometheus text format on
+# METRICS_LISTEN:METRICS_PORT/metrics.
+
+import bisect
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram.ext import ApplicationHandlerStop
+
+import slowlog
+from config import SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds (Prometheus style, +Inf implied)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SLOW_SAMPLES = 50       # recent slow queries kept in memory
+MAX_QUERY_KEYS = 1000   # distinct statements tracked
+SQL_KEY_LENGTH = 120
+
+
+# =====================================================
+# 📌 COLLECTORS
+# =====================================================
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+class HandlerStats:
+    __slots__ = ("calls", "errors", "latency", "db_time", "queries")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.db_time = 0.0
+        self.queries = 0
+
+
+class QueryStats:
+    __slots__ = ("calls", "rows", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.latency = Histogram()
+
+
+HANDLERS = {}   # handler name -> HandlerStats
+QUERIES = {}    # normalized SQL -> QueryStats
+SLOW = deque(maxlen=SLOW_SAMPLES)
+
+_outbound = None
+_started = time.time()
+
+# HandlerStats of the handler currently running in this task
+_current = contextvars.ContextVar("perf_handler", default=None)
+
+
+def reset():
+    global _started
+    HANDLERS.clear()
+    QUERIES.clear()
+    SLOW.clear()
+    _started = time.time()
+
+
+_keys = {}
+
+
+def _query_key(sql):
+    key = _keys.get(sql)
+    if key is None:
+        key = " ".join(sql.split())[:SQL_KEY_LENGTH]
+        if len(_keys) < MAX_QUERY_KEYS:
+            _keys[sql] = key
+    return key
+
+
+def _record_query(sql, seconds, params=None, conn=None):
+    key = _query_key(sql)
+    stats = QUERIES.get(key)
+    if stats is None:
+        if len(QUERIES) >= MAX_QUERY_KEYS:
+            key = "(other)"
+            stats = QUERIES.setdefault(key, QueryStats())
+        else:
+            stats = QUERIES[key] = QueryStats()
+    stats.calls += 1
+    stats.latency.observe(seconds)
+
+    handler = _current.get()
+    if handler is not None:
+        handler.db_time += seconds
+        handler.queries += 1
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW.append((time.time(), key, seconds))
+        if conn is not None:
+            slowlog.record(sql, params, seconds, conn)
+    return stats
+
+
+# =====================================================
+# 📌 DATABASE
+# =====================================================
+
+class _TrackedCursor:
+    def __init__(self, cur, conn):
+        self._cur = cur
+        self._conn = conn
+        self._stats = None
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            self._cur.execute(sql, params)
+        except Exception:
+            self._stats = _record_query(sql, time.perf_counter() - started)
+            raise
+        self._stats = _record_query(sql, time.perf_counter() - started, params, self._conn)
+        return self
+
+    def executemany(self, sql, seq):
+        # Bulk writes are timed but not explained
+        started = time.perf_counter()
+        try:
+            self._cur.executemany(sql, seq)
+        finally:
+            self._stats = _record_query(sql, time.perf_counter() - started)
+        return self
+
+    def _fetched(self, rows):
+        if self._stats is not None:
+            self._stats.rows += rows
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        self._fetched(row is not None)
+        return row
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class _TrackedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _TrackedCursor(self._conn.cursor(), self._conn)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        # On SQLite this is where the write (and fsync) happens
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            _record_query("COMMIT", time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def track(conn):
+    """Wrap a DB-API connection so its queries are recorded."""
+    return _TrackedConnection(conn)
+
+
+# =====================================================
+# 📌 HANDLERS
+# =====================================================
+
+def _timed(name, callback):
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        stats = HANDLERS.get(name)
+        if stats is None:
+            stats = HANDLERS[name] = HandlerStats()
+
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.calls += 1
+            stats.latency.observe(time.perf_counter() - started)
+            _current.reset(token)
+
+    return wrapper
+
+
+def instrument(app):
+    """Time every handler registered on `app` (call after adding them)."""
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            name = getattr(handler.callback, "__name__", type(handler).__name__)
+            handler.callback = _timed(name, handler.callback)
+
+    global _outbound
+    _outbound = getattr(app.bot.rate_limiter, "metrics", None)
+
+
+def outbound_snapshot():
+    return _outbound.snapshot() if _outbound is not None else None
+
+
+def top_handlers(limit=10):
+    """(name, stats) sorted by total time spent."""
+    return sorted(HANDLERS.items(), key=lambda kv: kv[1].latency.total, reverse=True)[:limit]
+
+
+def top_queries(limit=10):
+    return sorted(QUERIES.items(), key=lambda kv: kv[1].latency.total, reverse=True)[:limit]
+
+
+def uptime():
+    return time.time() - _started
+
+
+# =====================================================
+# 📌 PROMETHEUS ENDPOINT
+# =====================================================
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", " ").replace('"', '\\"')
+
+
+def _histogram_lines(metric, labels, hist):
+    lines = []
+    cumulative = 0
+    for bound, n in zip(BUCKETS + ("+Inf",), hist.counts):
+        cumulative += n
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{metric}_sum{{{labels}}} {hist.total:.6f}")
+    lines.append(f"{metric}_count{{{labels}}} {hist.count}")
+    return lines
+
+
+def render_prometheus():
+    lines = [
+        "# HELP escrow_handler_seconds Handler latency.",
+        "# TYPE escrow_handler_seconds histogram",
+    ]
+    handlers = list(HANDLERS.items())
+    for name, s in handlers:
+        lines += _histogram_lines("escrow_handler_seconds", f'handler="{_label(name)}"', s.latency)
+
+    lines += ["# TYPE escrow_handler_errors_total counter"]
+    lines += [f'escrow_handler_errors_total{{handler="{_label(n)}"}} {s.errors}' for n, s in handlers]
+    lines += ["# TYPE escrow_handler_db_seconds_total counter"]
+    lines += [f'escrow_handler_db_seconds_total{{handler="{_label(n)}"}} {s.db_time:.6f}' for n, s in handlers]
+    lines += ["# TYPE escrow_handler_queries_total counter"]
+    lines += [f'escrow_handler_queries_total{{handler="{_label(n)}"}} {s.queries}' for n, s in handlers]
+
+    lines += [
+        "# HELP escrow_query_seconds Query latency by statement.",
+        "# TYPE escrow_query_seconds histogram",
+    ]
+    queries = list(QUERIES.items())
+    for sql, s in queries:
+        lines += _histogram_lines("escrow_query_seconds", f'query="{_label(sql)}"', s.latency)
+    lines += ["# TYPE escrow_query_rows_total counter"]
+    lines += [f'escrow_query_rows_total{{query="{_label(q)}"}} {s.rows}' for q, s in queries]
+
+    snap = outbound_snapshot()
+    if snap:
+        lines += ["# TYPE escrow_outbound_total counter"]
+        for key in ("sent", "failed", "retried", "throttled"):
+            lines.append(f'escrow_outbound_total{{result="{key}"}} {snap[key]}')
+        lines += ["# TYPE escrow_outbound_endpoint_total counter"]
+        for endpoint, n in snap["by_endpoint"].items():
+            lines.append(f'escrow_outbound_endpoint_total{{endpoint="{_label(endpoint)}"}} {n}')
+
+    lines += ["# TYPE escrow_uptime_seconds gauge", f"escrow_uptime_seconds {uptime():.0f}"]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt, *args)
+
+
+def serve_metrics(listen, port):
+    """Serve /metrics from a daemon thread (port 0 disables it)."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((listen, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("📈 Metrics on http://%s:%s/metrics", listen, port)
+    return server
@@ -0,0 +1,193 @@
+# search.py
+# Full-text search over deals and notes (/search)
+# On SQLite every shard has deals_fts, an FTS5 index over a deal's
+# trade_id, buyer, seller, escrower and status, and the main file has
+# notes_fts over note text. Both are external-content tables (the text
+# stays in deals / notes only) kept in step by triggers, so every writer
+# (/add, /close, /save, datagen.py, ...) updates them in its own
+# transaction. Matches are ranked with bm25(); a trade id or username hit
+# outranks a status hit. bm25() has to score every match, so for common
+# words ("completed", a busy escrower) only the newest CANDIDATES matches
+# are ranked, found by walking the index backwards from the newest rowid.
+# On PostgreSQL the same columns are covered by GIN indexes on
+# to_tsvector('simple', ...) and ranked with ts_rank().
+
+import re
+
+from config import SEARCH_MAX_PAGES
+
+PAGE_SIZE = 10
+TOKENIZE = "unicode61 tokenchars '_'"   # keep rahul_99 one token
+
+DEAL_COLUMNS = ("trade_id", "buyer_username", "seller_username", "created_by_username", "status")
+DEAL_WEIGHTS = (10.0, 5.0, 5.0, 3.0, 1.0)
+NOTE_COLUMNS = ("note",)
+
+MAX_TERMS = 8
+CANDIDATES = 2000
+_TERM = re.compile(r"\w+\*?")
+
+
+# =====================================================
+# 📌 SCHEMA
+# =====================================================
+
+def _pg_document(columns):
+    return " || ' ' || ".join(f"COALESCE({c}, '')" for c in columns)
+
+
+def _fts_triggers(table, columns):
+    """CREATE TRIGGER statements keeping `{table}_fts` in step with `table`."""
+    fts = f"{table}_fts"
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    delete = f"INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new});"
+    return {
+        f"{fts}_insert": f"AFTER INSERT ON {table} BEGIN {insert} END",
+        f"{fts}_delete": f"AFTER DELETE ON {table} BEGIN {delete} END",
+        f"{fts}_update": f"AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END",
+    }
+
+
+def search_triggers(table="deals"):
+    """Trigger names; datagen.py drops them for bulk loads and calls rebuild()."""
+    return list(_fts_triggers(table, DEAL_COLUMNS if table == "deals" else NOTE_COLUMNS))
+
+
+def _create_fts(cur, backend_name, table, columns):
+    if backend_name != "sqlite":
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_search ON {table} "
+            f"USING GIN (to_tsvector('simple', {_pg_document(columns)}))"
+        )
+        return
+
+    fts = f"{table}_fts"
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name=?", (fts,))
+    created = cur.fetchone() is None
+    cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {', '.join(columns)},
+            content='{table}', content_rowid='id', tokenize="{TOKENIZE}"
+        )
+    """)
+    for name, body in _fts_triggers(table, columns).items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    # Rows written before the index existed
+    if created:
+        rebuild(cur, table)
+
+
+def create_deal_search(cur, backend_name):
+    _create_fts(cur, backend_name, "deals", DEAL_COLUMNS)
+
+
+def create_note_search(cur, backend_name):
+    _create_fts(cur, backend_name, "notes", NOTE_COLUMNS)
+
+
+def rebuild(cur, table="deals"):
+    """Re-index every row of `table` (SQLite)."""
+    cur.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+# =====================================================
+# 📌 QUERIES
+# =====================================================
+
+def parse_query(text):
+    """
+    Search terms from user input: words (usernames and trade ids are one
+    word each, '@' and '#' are dropped), lowercased; "word*" is a prefix.
+    """
+    return [t.lower() for t in _TERM.findall(text or "")][:MAX_TERMS]
+
+
+def _match(terms, backend_name):
+    if backend_name != "sqlite":
+        return " ".join(t.rstrip("*") for t in terms)
+    # Every term quoted so FTS5 operators in the input stay plain text
+    return " AND ".join(
+        f'"{t.rstrip("*")}"' + ("*" if t.endswith("*") else "") for t in terms
+    )
+
+
+def _deal_sql(backend_name):
+    if backend_name != "sqlite":
+        doc = f"to_tsvector('simple', {_pg_document(DEAL_COLUMNS)})"
+        return f"""
+            SELECT id, trade_id, buyer_username, seller_username, amount, status,
+                   -ts_rank({doc}, plainto_tsquery('simple', ?)) AS score
+            FROM deals
+            WHERE {doc} @@ plainto_tsquery('simple', ?)
+            ORDER BY score, id DESC LIMIT ?
+        """
+    return f"""
+        SELECT d.id, d.trade_id, d.buyer_username, d.seller_username, d.amount, d.status,
+               bm25(deals_fts, {', '.join(map(str, DEAL_WEIGHTS))}) AS score
+        FROM deals_fts JOIN deals d ON d.id = deals_fts.rowid
+        WHERE deals_fts MATCH ? AND deals_fts.rowid >= ?
+        ORDER BY score, d.id DESC LIMIT ?
+    """
+
+
+def _note_sql(backend_name):
+    if backend_name != "sqlite":
+        doc = "to_tsvector('simple', COALESCE(note, ''))"
+        return f"""
+            SELECT id, user_id, note, -ts_rank({doc}, plainto_tsquery('simple', ?)) AS score
+            FROM notes
+            WHERE {doc} @@ plainto_tsquery('simple', ?)
+            ORDER BY score, id DESC LIMIT ?
+        """
+    return """
+        SELECT n.id, n.user_id, n.note, bm25(notes_fts) AS score
+        FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid
+        WHERE notes_fts MATCH ? AND notes_fts.rowid >= ?
+        ORDER BY score, n.id DESC LIMIT ?
+    """
+
+
+def search(kind, terms, page=1):
+    """
+    One page of ranked results: (rows, has_next). kind is "deals" (every
+    shard, merged on score) or "notes" (main file). Lower score is better.
+    """
+    # database.py creates the indexes, so these are imported on use
+    from database import BACKEND
+    from shards import all_shards, connect_shard
+
+    if not terms or page > SEARCH_MAX_PAGES:
+        return [], False
+
+    sqlite = BACKEND.name == "sqlite"
+    match = _match(terms, BACKEND.name)
+    limit = page * PAGE_SIZE + 1
+    sql = _deal_sql(BACKEND.name) if kind == "deals" else _note_sql(BACKEND.name)
+
+    rows = []
+    for shard in (all_shards() if kind == "deals" else [0]):
+        conn = connect_shard(shard)
+        try:
+            cur = conn.cursor()
+            if sqlite:
+                cur.execute(
+                    f"SELECT rowid FROM {kind}_fts WHERE {kind}_fts MATCH ? "
+                    f"ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                    (match, CANDIDATES - 1)
+                )
+                oldest = cur.fetchone()
+                cur.execute(sql, (match, oldest["rowid"] if oldest else 0, limit))
+            else:
+                cur.execute(sql, (match, match, limit))
+            rows.extend(cur.fetchall())
+        finally:
+            conn.close()
+
+    rows.sort(key=lambda r: (r["score"], -r["id"]))
+    start = (page - 1) * PAGE_SIZE
+    more = len(rows) > start + PAGE_SIZE and page < SEARCH_MAX_PAGES
+    return rows[start:start + PAGE_SIZE], more
@@ -0,0 +1,166 @@
+# shards.py
+# Storage router for the deal ledger
+# Deals are sharded by tenant (chat_id) across SHARD_COUNT SQLite files
+# (ESCROW_SHARDS, see config.py) so groups write to different files in
+# parallel. A catalog in the main file maps trade_id -> shard and hands
+# out globally unique deal ids, which keeps keyset pagination valid when
+# results from several shards merge.
+#
+# Shard 0 is the main database, so SHARD_COUNT=1 is the classic layout.
+# Changing SHARD_COUNT once deals exist moves tenants to other shards;
+# treat it as fixed for an installation. Server backends handle concurrent
+# writers themselves and always run with a single shard.
+
+from backends import SQLiteBackend
+from config import SHARD_COUNT
+from database import BACKEND, GLOBAL_TENANT, connect, create_deals_table
+from perf import track
+
+if BACKEND.name != "sqlite":
+    SHARD_COUNT = 1
+
+SHARD_PATH = "data/escrow_shard{}.db"
+
+# shard number -> backend, created on first use
+_backends = {0: BACKEND}
+
+
+# =====================================================
+# 📌 CONNECTIONS
+# =====================================================
+
+def connect_shard(shard):
+    backend = _backends.get(shard)
+    if backend is None:
+        backend = _backends[shard] = SQLiteBackend(SHARD_PATH.format(shard))
+    return track(backend.connect())
+
+
+def shard_for(chat_id):
+    """Every deal of one group lives in the same shard."""
+    return (chat_id or GLOBAL_TENANT) % SHARD_COUNT
+
+
+def all_shards():
+    return range(SHARD_COUNT)
+
+
+def tenant_shards(chat_id):
+    """Shards holding a tenant's deals; the global tenant sees all of them."""
+    if chat_id == GLOBAL_TENANT:
+        return all_shards()
+    return [shard_for(chat_id)]
+
+
+# =====================================================
+# 📌 SCHEMA + CATALOG
+# =====================================================
+
+def init_shards():
+    """Create the catalog and each shard's deals table (after init_database)."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS deal_catalog (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trade_id TEXT UNIQUE,
+            chat_id INTEGER,
+            shard INTEGER
+        )
+    """)
+
+    # Deals created before the catalog existed live in the main file
+    cur.execute("SELECT 1 FROM deal_catalog LIMIT 1")
+    if cur.fetchone() is None:
+        cur.execute("""
+            INSERT INTO deal_catalog (id, trade_id, chat_id, shard)
+            SELECT id, trade_id, chat_id, 0 FROM deals WHERE true
+            ON CONFLICT DO NOTHING
+        """)
+    conn.commit()
+    conn.close()
+
+    for shard in all_shards():
+        if shard == 0:
+            continue
+        conn = connect_shard(shard)
+        create_deals_table(conn.cursor())
+        conn.commit()
+        conn.close()
+
+
+def register_deal(trade_id, chat_id):
+    """Reserve a global deal id for a new trade. Returns (deal_id, shard)."""
+    shard = shard_for(chat_id)
+
+    conn = connect()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO deal_catalog (trade_id, chat_id, shard) VALUES (?, ?, ?) RETURNING id",
+            (trade_id, chat_id, shard)
+        )
+        deal_id = cur.fetchone()["id"]
+        conn.commit()
+    finally:
+        # A duplicate trade_id must not leave the catalog write-locked
+        conn.close()
+    return deal_id, shard
+
+
+def unregister_deal(trade_id):
+    """Undo register_deal when the shard insert fails."""
+    conn = connect()
+    conn.execute("DELETE FROM deal_catalog WHERE trade_id=?", (trade_id,))
+    conn.commit()
+    conn.close()
+
+
+def locate_deal(trade_id):
+    """Shard holding trade_id, or None for an unknown trade."""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT shard FROM deal_catalog WHERE trade_id=?", (trade_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row["shard"] if row else None
+
+
+def connect_deal(trade_id):
+    """Connection to the shard holding trade_id (main file if unknown)."""
+    shard = locate_deal(trade_id)
+    return connect_shard(shard or 0)
+
+
+# =====================================================
+# 📌 FAN-OUT
+# =====================================================
+
+def fan_out(sql, params=(), shards=None):
+    """Run one query on every shard (or `shards`) and return all rows."""
+    rows = []
+    for shard in all_shards() if shards is None else shards:
+        conn = connect_shard(shard)
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows.extend(cur.fetchall())
+        conn.close()
+    return rows
+
+
+def fan_out_totals(sql, params=(), shards=None):
+    """Sum the single-row aggregates (COUNT/SUM) of every shard."""
+    totals = {}
+    for row in fan_out(sql, params, shards):
+        for key in row.keys():
+            totals[key] = totals.get(key, 0) + (row[key] or 0)
+    return totals
+
+
+def fan_out_grouped(sql, params=(), shards=None):
+    """Merge `SELECT key, SUM(...) AS total ... GROUP BY key` across shards."""
+    merged = {}
+    for row in fan_out(sql, params, shards):
+        key, total = row[0], row[1] or 0
+        merged[key] = merged.get(key, 0) + total
+    return merged
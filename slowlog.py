@@ -0,0 +1,139 @@
+# slowlog.py
+# Slow-query log for Era Escrow Bot
+# perf.py hands over every statement slower than SLOW_QUERY_MS. Each one is
+# written as a JSON line (time, duration, SQL, parameters, query plan) to a
+# rotating file, SLOW_QUERY_LOG, which the owner reads with /slowlog.
+# The plan comes from EXPLAIN QUERY PLAN (SQLite) / EXPLAIN (PostgreSQL)
+# run on the same connection; it is captured once per statement every
+# PLAN_TTL seconds so a burst of slow queries does not double the load.
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from config import SLOW_QUERY_LOG, SLOW_QUERY_LOG_BYTES
+
+logger = logging.getLogger(__name__)
+
+PLAN_TTL = 600          # seconds a captured plan is reused for the same SQL
+LOG_BACKUPS = 3
+MAX_PARAMS = 20
+MAX_PARAM_LENGTH = 64
+
+# Statements EXPLAIN can describe
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_file_logger = None
+_plans = {}  # sql -> (captured_at, plan lines)
+
+
+def _writer():
+    global _file_logger
+    if _file_logger is None:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _file_logger = logging.getLogger("escrow.slowlog")
+        _file_logger.addHandler(handler)
+        _file_logger.setLevel(logging.INFO)
+        _file_logger.propagate = False
+    return _file_logger
+
+
+# =====================================================
+# 📌 QUERY PLANS
+# =====================================================
+
+def _sqlite_plan(conn, sql, params):
+    cur = conn.cursor()
+    cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+    depth = {0: -1}
+    lines = []
+    for row in cur.fetchall():
+        node, parent, detail = row[0], row[1], row[3]
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def _postgres_plan(conn, sql, params):
+    # A failed EXPLAIN must not abort the handler's open transaction
+    cur = conn.cursor()
+    cur.execute("SAVEPOINT slowlog_explain")
+    try:
+        cur.execute("EXPLAIN " + sql, params)
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        cur.execute("ROLLBACK TO SAVEPOINT slowlog_explain")
+        cur.execute("RELEASE SAVEPOINT slowlog_explain")
+
+
+def query_plan(conn, sql, params):
+    """Plan lines for `sql`, cached per statement; [] if not explainable."""
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+
+    cached = _plans.get(sql)
+    if cached and time.time() - cached[0] < PLAN_TTL:
+        return cached[1]
+
+    explain = _sqlite_plan if isinstance(conn, sqlite3.Connection) else _postgres_plan
+    try:
+        plan = explain(conn, sql, params)
+    except Exception as e:
+        plan = [f"(plan unavailable: {e})"]
+
+    if len(_plans) > 500:
+        _plans.clear()
+    _plans[sql] = (time.time(), plan)
+    return plan
+
+
+# =====================================================
+# 📌 LOG
+# =====================================================
+
+def _param(value):
+    if isinstance(value, (int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + "…"
+
+
+def record(sql, params, seconds, conn):
+    """Write one slow statement (called by perf.py; never raises)."""
+    try:
+        params = tuple(params or ())
+        entry = {
+            "at": round(time.time(), 3),
+            "ms": round(seconds * 1000, 1),
+            "sql": " ".join(sql.split()),
+            "params": [_param(p) for p in params[:MAX_PARAMS]],
+            "plan": query_plan(conn, sql, params),
+        }
+        _writer().info(json.dumps(entry, ensure_ascii=False))
+    except Exception:
+        logger.exception("Could not write slow query log")
+
+
+def recent(count=10):
+    """Last `count` entries of the current log file, newest first."""
+    if not os.path.exists(SLOW_QUERY_LOG):
+        return []
+
+    with open(SLOW_QUERY_LOG, encoding="utf-8") as f:
+        lines = deque(f, maxlen=count)
+
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
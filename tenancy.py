@@ -0,0 +1,73 @@
+# tenancy.py
+# Per-group tenancy for Era Escrow Bot
+# Every escrow group is a tenant with its own deal ledger, fee, log channel
+# and admin roster. Private chats act on the global tenant (GLOBAL_TENANT).
+
+from database import (
+    GLOBAL_TENANT,
+    get_fee,
+    get_logs,
+    list_admins,
+    list_group_admins,
+)
+from cache import TTLCache
+from bus import subscribe, publish
+
+TENANT_TTL = 300  # seconds a tenant's settings are reused
+
+_tenants = TTLCache(ttl=TENANT_TTL, maxsize=4096)
+
+
+def tenant_id(chat):
+    """Groups are their own tenant; everything else is global."""
+    if chat is not None and chat.type in ("group", "supergroup"):
+        return chat.id
+    return GLOBAL_TENANT
+
+
+def _load(chat_id):
+    if chat_id == GLOBAL_TENANT:
+        admins = frozenset(a["user_id"] for a in list_admins())
+    else:
+        admins = frozenset(a["user_id"] for a in list_group_admins(chat_id))
+
+    return {
+        "fee": get_fee(chat_id),
+        "logs": get_logs(chat_id),
+        "admins": admins,
+    }
+
+
+def tenant(chat_id):
+    """Cached settings dict: fee, logs and admins for one tenant."""
+    return _tenants.get_or_set(chat_id, lambda: _load(chat_id))
+
+
+def invalidate_tenant(chat_id=None):
+    """Drop one tenant (or all of them) after a settings change."""
+    publish("tenant", chat_id)
+
+
+subscribe("tenant", _tenants.invalidate)
+subscribe("reset", lambda key: _tenants.invalidate())
+
+
+def is_tenant_admin(user_id, chat_id=GLOBAL_TENANT):
+    """Global admins manage every group; group admins only their own."""
+    if user_id in tenant(GLOBAL_TENANT)["admins"]:
+        return True
+    return chat_id != GLOBAL_TENANT and user_id in tenant(chat_id)["admins"]
+
+
+def scope(chat_id, column="chat_id"):
+    """(sql, params) restricting a deals query to one tenant's rows."""
+    if chat_id == GLOBAL_TENANT:
+        return "1=1", ()
+    return f"{column}=?", (chat_id,)
+
+
+def can_manage(deal, user_id, chat_id):
+    """A group's admins only act on deals created in that group."""
+    if chat_id == GLOBAL_TENANT or deal["chat_id"] == chat_id:
+        return True
+    return user_id in tenant(GLOBAL_TENANT)["admins"]
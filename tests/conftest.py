@@ -0,0 +1,101 @@
+# tests/conftest.py
+# The bot's modules live at the repository root, not in a package.
+# The `storage` fixture runs a test against every backend. SQLite always
+# runs, in a temporary directory. PostgreSQL runs when
+# DATABASE_URL=postgresql://... is set and psycopg2 is installed; each test
+# gets its own schema, dropped afterwards, so the database's existing
+# tables are never touched.
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backends  # noqa: E402
+import database  # noqa: E402
+import shards  # noqa: E402
+from backends import SQLiteBackend, PostgresBackend  # noqa: E402
+from participants import add_participants  # noqa: E402
+
+POSTGRES_URL = os.environ.get("DATABASE_URL", "")
+if not POSTGRES_URL.startswith(("postgres://", "postgresql://")):
+    POSTGRES_URL = ""
+
+
+# ============================================================
+# 🔧 FIXTURES
+# ============================================================
+
+def _postgres_backend(schema, maxconn=4):
+    """PostgresBackend whose connections default to `schema`."""
+    sep = "&" if "?" in POSTGRES_URL else "?"
+    return PostgresBackend(f"{POSTGRES_URL}{sep}options=-csearch_path%3D{schema}", maxconn=maxconn)
+
+
+@pytest.fixture
+def postgres_schema():
+    if not POSTGRES_URL:
+        pytest.skip("set DATABASE_URL=postgresql://... to test PostgreSQL")
+    if backends.psycopg2 is None:
+        pytest.skip("psycopg2 is not installed")
+
+    schema = f"escrow_test_{uuid.uuid4().hex[:12]}"
+    admin = backends.psycopg2.connect(POSTGRES_URL)
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield schema
+    finally:
+        admin.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def storage(request, tmp_path, monkeypatch):
+    """Point database.py and shards.py at a fresh database and create the schema."""
+    monkeypatch.chdir(tmp_path)
+
+    if request.param == "sqlite":
+        backend = SQLiteBackend(database.DB_PATH)
+        shard_count = 2
+    else:
+        backend = _postgres_backend(request.getfixturevalue("postgres_schema"))
+        shard_count = 1
+
+    monkeypatch.setattr(database, "BACKEND", backend)
+    monkeypatch.setattr(shards, "SHARD_COUNT", shard_count)
+    monkeypatch.setattr(shards, "_backends", {0: backend})
+
+    database.init_database()
+    shards.init_shards()
+    yield backend
+    backend.close()
+
+
+def add_deal(trade_id, chat_id, buyer="@rahul_99", seller="@seller_bhai", amount=1500.0,
+             status="active", created_at="2026-10-18T12:00:00", buyer_id=None, seller_id=None):
+    """Insert a deal the way /add does: catalog id first, then the shard rows."""
+    deal_id, shard = shards.register_deal(trade_id, chat_id)
+    conn = shards.connect_shard(shard)
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO deals (
+            id, trade_id, buyer_username, seller_username,
+            created_by, created_by_username,
+            amount, fee, admin_earning,
+            status, created_at, updated_at, chat_id
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        deal_id, trade_id, buyer, seller, 1001, "@escrow_admin",
+        amount, amount * 0.05, amount * 0.05, status, created_at, created_at, chat_id
+    ))
+    add_participants(
+        cur, deal_id, buyer, seller, 1001, "@escrow_admin", status, created_at, buyer_id, seller_id
+    )
+    conn.commit()
+    conn.close()
+    return deal_id, shard
@@ -0,0 +1,276 @@
+# tests/test_backends.py
+# The storage layer (backends.py, database.py, shards.py, search.py) run
+# against every backend; see the `storage` fixture in conftest.py.
+
+import threading
+from datetime import date
+
+import pytest
+
+import database
+import shards
+from backends import Row, SQLiteBackend, _translate, create_backend
+from conftest import add_deal
+from tenancy import GLOBAL_TENANT
+
+# ============================================================
+# 🔤 DIALECT TRANSLATION (no database needed)
+# ============================================================
+
+def test_translate_placeholders():
+    assert _translate("SELECT * FROM deals WHERE id=? AND status=?") == (
+        "SELECT * FROM deals WHERE id=%s AND status=%s"
+    )
+
+
+def test_translate_escapes_percent():
+    assert _translate("SELECT 1 WHERE note LIKE '10%' AND id=?") == (
+        "SELECT 1 WHERE note LIKE '10%%' AND id=%s"
+    )
+
+
+def test_translate_ddl_types():
+    ddl = _translate("""
+        CREATE TABLE IF NOT EXISTS t (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER,
+            amount REAL
+        )
+    """)
+    assert "BIGSERIAL PRIMARY KEY" in ddl
+    assert "chat_id BIGINT" in ddl
+    assert "amount DOUBLE PRECISION" in ddl
+    assert _translate("ALTER TABLE deals ADD COLUMN chat_id INTEGER").endswith("BIGINT")
+
+
+def test_translate_leaves_queries_alone():
+    sql = "SELECT CAST(amount AS INTEGER) AS real FROM deals"
+    assert _translate(sql) == sql
+
+
+def test_row_interface():
+    row = Row(["id", "trade_id"], (7, "TID123456"))
+    assert row["trade_id"] == "TID123456"
+    assert row[0] == 7
+    assert row.keys() == ["id", "trade_id"]
+    assert dict(zip(row.keys(), row)) == {"id": 7, "trade_id": "TID123456"}
+    assert len(row) == 2
+
+
+def test_create_backend():
+    assert isinstance(create_backend("", "data/x.db"), SQLiteBackend)
+    assert create_backend("sqlite:///tmp/y.db", "data/x.db").path == "tmp/y.db"
+    with pytest.raises(ValueError):
+        create_backend("mysql://localhost/escrow", "data/x.db")
+
+
+# ============================================================
+# 🗄 STORAGE (every backend)
+# ============================================================
+
+def test_init_is_idempotent(storage):
+    # Startup runs the migrations on every boot
+    database.init_database()
+    shards.init_shards()
+    conn = database.connect()
+    assert {"chat_id", "trade_id"} <= database._columns(conn.cursor(), "deals")
+    conn.close()
+
+
+def test_admin_upsert_keeps_known_fields(storage):
+    database.add_admin(42, username="escrow_john")
+    database.add_admin(42, name="John")
+    admins = [dict(zip(r.keys(), r)) for r in database.list_admins()]
+    assert admins == [{"user_id": 42, "username": "escrow_john", "name": "John"}]
+    assert database.is_admin(42)
+    database.remove_admin(42)
+    assert not database.is_admin(42)
+
+
+def test_fee_falls_back_to_global(storage):
+    assert database.get_fee(-100) == (5, 5)
+    database.set_fee(3, 10)
+    assert database.get_fee(-100) == (3, 10)
+    database.set_fee(2, 4, -100)
+    database.set_fee(2.5, 4, -100)
+    assert database.get_fee(-100) == (2.5, 4)
+    assert database.get_fee() == (3, 10)
+
+
+def test_warn_counter_upsert(storage):
+    first_id, count = database.add_warn(-100, 7, "spam", 1.0)
+    assert count == 1
+    second_id, count = database.add_warn(-100, 7, "spam", 2.0)
+    assert (second_id > first_id, count) == (True, 2)
+    assert database.get_warn_count(-100, 7) == 2
+
+
+def test_register_deal_returns_unique_ids(storage):
+    first, _ = add_deal("TID100001", -100)
+    second, _ = add_deal("TID100002", -101)
+    assert second > first
+    assert shards.locate_deal("TID100002") == shards.shard_for(-101)
+
+
+def test_duplicate_trade_id_leaves_catalog_usable(storage):
+    add_deal("TID100001", -100)
+    with pytest.raises(Exception):
+        shards.register_deal("TID100001", -100)
+    # The failed insert was rolled back and its connection released
+    deal_id, _ = shards.register_deal("TID100003", -100)
+    shards.unregister_deal("TID100003")
+    assert shards.locate_deal("TID100003") is None
+    assert deal_id
+
+
+def test_fan_out_merges_shards(storage):
+    add_deal("TID100001", -100, amount=100.0)
+    add_deal("TID100002", -101, amount=250.0)
+    add_deal("TID100003", -101, amount=50.0, status="completed")
+
+    totals = shards.fan_out_totals("SELECT COUNT(*) AS total, SUM(amount) AS volume FROM deals")
+    assert totals == {"total": 3, "volume": 400.0}
+
+    grouped = shards.fan_out_grouped(
+        "SELECT chat_id, SUM(amount) AS total FROM deals GROUP BY chat_id"
+    )
+    assert grouped == {-100: 100.0, -101: 300.0}
+
+    rows = shards.fan_out("SELECT trade_id FROM deals WHERE chat_id=?", (-101,), shards.tenant_shards(-101))
+    assert sorted(r["trade_id"] for r in rows) == ["TID100002", "TID100003"]
+
+
+def test_users_and_username_history(storage):
+    database.save_users([(7, "Rahul_99", "rahul_99", 1.0)])
+    database.save_users([(7, "rahul_new", "rahul_new", 2.0), (8, "other", "other", 2.0)])
+    assert database.resolve_username("@rahul_new") == 7
+    assert database.resolve_username("@Rahul_99") == 7
+    assert database.usernames_of(7) == ["rahul_new", "rahul_99"]
+
+    # Someone else took the old name: it is theirs now
+    database.save_users([(8, "rahul_99", "rahul_99", 3.0)])
+    assert database.resolve_username("rahul_99") == 8
+    assert database.usernames_of(7) == ["rahul_new"]
+
+
+def test_daily_summaries(storage):
+    day = date(2026, 10, 18)
+    database.save_daily_summaries([str(day)], [(0, str(day), 3, 400.0, 1, 2), (-100, str(day), 1, 100.0, 0, 1)], 1.0)
+    stored, computed = database.get_daily_summaries(-100, day, day)
+    assert computed == {str(day)}
+    assert stored[str(day)]["volume"] == 100.0
+
+    database.forget_daily_summary(str(day))
+    stored, computed = database.get_daily_summaries(-100, day, day)
+    assert stored == {} and computed == set()
+
+
+def test_search_ranks_matches(storage):
+    from search import search
+
+    add_deal("TID100001", -100, buyer="@rahul_99", seller="@bob")
+    add_deal("TID100002", -101, buyer="@alice", seller="@rahul_99", status="completed")
+    add_deal("TID100003", -101, buyer="@alice", seller="@bob")
+
+    rows, more = search("deals", ["rahul_99"])
+    assert sorted(r["trade_id"] for r in rows) == ["TID100001", "TID100002"]
+    assert not more
+
+    rows, _ = search("deals", ["tid100003"])
+    assert [r["trade_id"] for r in rows] == ["TID100003"]
+
+
+def test_top_traders_by_participant(storage):
+    from handlers.user import top_traders
+
+    add_deal("TID100001", -100, buyer="@Rahul_99", seller="@bob", amount=100.0, status="completed")
+    add_deal("TID100002", -101, buyer="@alice", seller="rahul_99", amount=250.0, status="released")
+    add_deal("TID100003", -101, buyer="@alice", seller="@bob", amount=999.0)
+    # A renamed user is still one trader once their id is known
+    add_deal("TID100004", -101, buyer="@old_name", seller="@carol", buyer_id=7, amount=10.0, status="completed")
+    add_deal("TID100005", -101, buyer="@new_name", buyer_id=7, amount=30.0, status="completed")
+
+    assert top_traders(GLOBAL_TENANT) == [
+        ("@rahul_99", 350.0),
+        ("@alice", 250.0),
+        ("@bob", 100.0),
+        ("@new_name", 40.0),
+        ("@seller_bhai", 30.0),
+        ("@carol", 10.0),
+    ]
+    assert dict(top_traders(-100)) == {"@rahul_99": 100.0, "@bob": 100.0}
+
+
+def test_connections_are_released(storage):
+    """More threads than pooled connections: callers wait, nobody fails."""
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                conn = database.connect()
+                conn.cursor().execute("SELECT COUNT(*) FROM admins")
+                conn.close()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_unclosed_connection_returns_to_pool(storage):
+    """Handlers that return before close() must not leak pooled connections."""
+    for _ in range(50):
+        conn = database.connect()
+        conn.cursor().execute("SELECT 1")
+        del conn
+    conn = database.connect()
+    conn.close()
+
+
+def test_cache_events_pruned_while_polling(storage, monkeypatch):
+    import asyncio
+    import time
+
+    import bus
+
+    class JobQueue:
+        def run_repeating(self, callback, interval, name=None):
+            pass
+
+    # enable_shared() switches this process to cluster mode; undo it afterwards
+    for name in ("_shared", "_last_id", "_origin", "_keep", "_pruned_at"):
+        monkeypatch.setattr(bus, name, getattr(bus, name))
+    monkeypatch.setattr(bus, "_subscribers", {})
+
+    seen = []
+    bus.subscribe("test", seen.append)
+    bus.init_bus()
+    bus.enable_shared(JobQueue(), 1.0)
+
+    # Another worker's events: one long replayed, one new
+    conn = database.connect()
+    conn.execute(
+        "INSERT INTO cache_events (topic, key, origin, created_at) VALUES (?, ?, ?, ?)",
+        ("test", 1, -1, time.time() - 3 * bus.KEEP_POLLS)
+    )
+    conn.execute(
+        "INSERT INTO cache_events (topic, key, origin, created_at) VALUES (?, ?, ?, ?)",
+        ("test", 2, -1, time.time())
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(bus, "_pruned_at", 0.0)
+    asyncio.run(bus.poll_events(None))
+    assert seen == [1, 2]
+
+    conn = database.connect()
+    cur = conn.cursor()
+    cur.execute("SELECT key FROM cache_events")
+    assert [r["key"] for r in cur.fetchall()] == [2]
+    conn.close()
@@ -0,0 +1,47 @@
+# tests/test_deals.py
+# handlers/deals.py live dashboards, with a fake JobQueue (no network).
+
+import pytest
+
+import bus
+from handlers import deals
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def get_jobs_by_name(self, name):
+        return [job for job in self.jobs if job[1] == name]
+
+    def run_once(self, callback, when, name=None):
+        self.jobs.append((callback, name))
+
+
+@pytest.fixture
+def job_queue(monkeypatch):
+    jq = FakeJobQueue()
+    monkeypatch.setattr(deals, "_dashboard_jobs", jq)
+    monkeypatch.setattr(bus, "_shared", False)
+    return jq
+
+
+def test_owner_schedules_one_refresh(job_queue, monkeypatch):
+    monkeypatch.setattr(deals, "owns", lambda chat_id: True)
+    for _ in range(3):
+        bus.publish("dashboard", -100)
+    assert job_queue.jobs == [(deals.refresh_live_dashboards, deals.DASHBOARD_JOB)]
+
+
+def test_other_workers_ignore_the_change(job_queue, monkeypatch):
+    monkeypatch.setattr(deals, "owns", lambda chat_id: chat_id == -101)
+    bus.publish("dashboard", -100)
+    assert job_queue.jobs == []
+    bus.publish("dashboard", -101)
+    assert len(job_queue.jobs) == 1
+
+
+def test_nothing_scheduled_before_start(monkeypatch):
+    monkeypatch.setattr(deals, "_dashboard_jobs", None)
+    monkeypatch.setattr(bus, "_shared", False)
+    bus.publish("dashboard", -100)  # no JobQueue yet: must not raise
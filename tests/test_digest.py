@@ -0,0 +1,143 @@
+# tests/test_digest.py
+# handlers/digest.py: daily_summaries precompute, the weekly rollup and the
+# rendered digest cache, against seeded storage (see conftest.py).
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import database
+from conftest import add_deal
+from handlers import digest, user
+from handlers.digest import compute_daily_summaries, daily_digest, weekly_digest
+from handlers.user import period_summary
+from tenancy import GLOBAL_TENANT
+
+TODAY = date(2026, 10, 19)
+WEEK = [TODAY - timedelta(days=i) for i in range(7, 0, -1)]  # the 7 finished days
+
+
+@pytest.fixture
+def seeded(storage, monkeypatch):
+    """Two groups' deals over the past week, plus one private-chat deal."""
+    monkeypatch.setattr(user, "ist_now", lambda: datetime(2026, 10, 19, 15, 0))
+    monkeypatch.setattr(digest, "_rendered", digest.TTLCache(ttl=60))
+
+    n = 0
+    for i, day in enumerate(WEEK):
+        for chat_id, status in ((-100, "completed"), (-100, "active"), (-101, "cancelled")):
+            n += 1
+            add_deal(f"TID{100000 + n}", chat_id, amount=100.0 * (i + 1), status=status,
+                     created_at=f"{day}T10:00:00")
+    add_deal("TID200000", 0, amount=5.0, status="released", created_at=f"{WEEK[0]}T23:59:59")
+    add_deal("TID200001", -100, amount=1.0, created_at=f"{TODAY}T09:00:00")
+    return storage
+
+
+def _live(chat_id, first, last):
+    """period_summary with nothing precomputed."""
+    for day in [first + timedelta(days=i) for i in range((last - first).days)]:
+        database.forget_daily_summary(str(day))
+    return period_summary(chat_id, first, last)
+
+
+# ============================================================
+# 🧮 PRECOMPUTE
+# ============================================================
+
+def test_compute_daily_summaries(seeded):
+    saved = compute_daily_summaries(WEEK[0], WEEK[-1])
+    # Per day: global, -100 and -101; the first day's private deal only counts globally
+    assert saved == 7 * 3
+
+    stored, computed = database.get_daily_summaries(-100, WEEK[0], WEEK[-1])
+    assert computed == {str(d) for d in WEEK}
+    first = stored[str(WEEK[0])]
+    assert (first["total"], first["volume"], first["completed"], first["active"]) == (2, 200.0, 1, 1)
+
+    stored, _ = database.get_daily_summaries(GLOBAL_TENANT, WEEK[0], WEEK[0])
+    row = stored[str(WEEK[0])]
+    assert (row["total"], row["volume"], row["completed"]) == (4, 305.0, 2)
+
+
+def test_empty_days_are_marked_computed(seeded):
+    empty = WEEK[0] - timedelta(days=30)
+    assert compute_daily_summaries(empty, empty) == 1
+    _, computed = database.get_daily_summaries(-100, empty, empty)
+    assert computed == {str(empty)}
+
+
+@pytest.mark.parametrize("chat_id", [GLOBAL_TENANT, -100, -101, -999])
+def test_stored_summaries_match_live_counts(seeded, chat_id):
+    live = _live(chat_id, WEEK[0], TODAY + timedelta(days=1))
+    compute_daily_summaries(WEEK[0], WEEK[-1])
+    assert period_summary(chat_id, WEEK[0], TODAY + timedelta(days=1)) == live
+
+
+def test_forgotten_day_is_counted_live(seeded):
+    compute_daily_summaries(WEEK[0], WEEK[-1])
+    # A deal created on WEEK[2] changes after the recount
+    database.forget_daily_summary(str(WEEK[2]))
+    add_deal("TID300000", -100, amount=1000.0, status="completed", created_at=f"{WEEK[2]}T11:00:00")
+
+    s = period_summary(-100, WEEK[2], WEEK[2] + timedelta(days=1))
+    assert (s["total"], s["volume"], s["completed"]) == (3, 1600.0, 2)
+
+
+# ============================================================
+# 📰 DIGESTS
+# ============================================================
+
+def test_weekly_rollup(seeded):
+    compute_daily_summaries(WEEK[0], WEEK[-1])
+    text, pdf = weekly_digest(-100, WEEK[-1])
+
+    volume = sum(200.0 * (i + 1) for i in range(7))
+    assert "• Deals: 14\n" in text
+    assert f"• Volume: ₹{volume:.2f}\n" in text
+    assert "• Completed: 7\n" in text
+    assert "• Active: 7\n" in text
+    assert pdf[:4] == b"%PDF"
+
+
+def test_daily_digest_lists_the_day(seeded, monkeypatch):
+    compute_daily_summaries(WEEK[0], WEEK[-1])
+    listed = []
+    monkeypatch.setattr(digest, "build_pdf", lambda rows, title: listed.append((rows, title)) or b"%PDF")
+
+    text, _ = daily_digest(-101, WEEK[3])
+    [(rows, title)] = listed
+    assert [r["status"] for r in rows] == ["cancelled"]
+    assert title == f"Deals of {WEEK[3].strftime('%d %b %Y')}"
+    assert "• Cancelled: 1" in text
+
+
+def test_rendered_digest_cache(seeded, monkeypatch):
+    builds = []
+    real = digest._build_daily
+    monkeypatch.setattr(digest, "_build_daily", lambda *a: builds.append(a) or real(*a))
+
+    # Not summarized yet: counted live, never cached
+    daily_digest(-100, WEEK[-1])
+    daily_digest(-100, WEEK[-1])
+    assert len(builds) == 2
+
+    compute_daily_summaries(WEEK[0], WEEK[-1])
+    first = daily_digest(-100, WEEK[-1])
+    assert daily_digest(-100, WEEK[-1]) == first
+    assert len(builds) == 3
+
+    # Other tenants and days have their own entries
+    daily_digest(-101, WEEK[-1])
+    assert len(builds) == 4
+
+    # A deal of that day changed: rebuilt from live counts
+    database.forget_daily_summary(str(WEEK[-1]))
+    daily_digest(-100, WEEK[-1])
+    assert len(builds) == 5
+
+    # The next recount gets a new stamp
+    compute_daily_summaries(WEEK[-1], WEEK[-1])
+    daily_digest(-100, WEEK[-1])
+    daily_digest(-100, WEEK[-1])
+    assert len(builds) == 6
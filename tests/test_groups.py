@@ -0,0 +1,140 @@
+# tests/test_groups.py
+# handlers/groups.py batched welcomes and the settings cache, with fake
+# Telegram objects and a fake JobQueue (no network).
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import bus
+import database
+from handlers import groups
+
+GROUP = -100
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.deleted = []
+
+    async def send_message(self, chat_id, text):
+        self.sent.append((chat_id, text))
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def delete_message(self, chat_id, message_id):
+        self.deleted.append((chat_id, message_id))
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def run_once(self, callback, when, chat_id=None, name=None):
+        self.jobs.append(SimpleNamespace(callback=callback, chat_id=chat_id, name=name))
+
+    def run_all(self, bot):
+        jobs, self.jobs = self.jobs, []
+        for job in jobs:
+            asyncio.run(job.callback(SimpleNamespace(bot=bot, job=job)))
+
+
+def _member(user_id, username=None, is_bot=False):
+    return SimpleNamespace(id=user_id, username=username, first_name=f"User{user_id}", is_bot=is_bot)
+
+
+def _join(context, *members):
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=GROUP),
+                             message=SimpleNamespace(new_chat_members=list(members)))
+    asyncio.run(groups.welcome_member(update, context))
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = {"chat_id": GROUP, "welcome_enabled": 1, "welcome_text": None}
+    monkeypatch.setattr(groups, "group_settings", lambda chat_id: settings if chat_id == GROUP else {})
+    monkeypatch.setattr(groups, "_pending_welcomes", {})
+    monkeypatch.setattr(groups, "_last_welcome", {})
+    return settings
+
+
+@pytest.fixture
+def context():
+    return SimpleNamespace(bot=FakeBot(), job_queue=FakeJobQueue())
+
+
+# ============================================================
+# 🤝 BATCHED WELCOME
+# ============================================================
+
+def test_burst_of_joins_shares_one_welcome(settings, context):
+    _join(context, _member(1, "rahul_99"))
+    _join(context, _member(2), _member(3, "helper_bot", is_bot=True))
+    _join(context, _member(4, "alice"))
+
+    assert [job.name for job in context.job_queue.jobs] == [f"welcome:{GROUP}"]
+    assert context.bot.sent == []
+
+    context.job_queue.run_all(context.bot)
+    assert context.bot.sent == [(GROUP, "👋 Welcome @rahul_99, User2, @alice!")]
+
+
+def test_only_the_newest_welcome_stays(settings, context):
+    settings["welcome_text"] = "Hi {user}, read the rules"
+    _join(context, _member(1))
+    context.job_queue.run_all(context.bot)
+    _join(context, _member(2))
+    context.job_queue.run_all(context.bot)
+
+    assert context.bot.sent == [(GROUP, "Hi User1, read the rules"), (GROUP, "Hi User2, read the rules")]
+    assert context.bot.deleted == [(GROUP, 1)]
+
+
+def test_large_batches_are_capped(settings, context):
+    _join(context, *(_member(i) for i in range(groups.WELCOME_BATCH_MAX + 5)))
+    context.job_queue.run_all(context.bot)
+
+    [(_, text)] = context.bot.sent
+    assert text.endswith(", +5 more!")
+    assert text.count("User") == groups.WELCOME_BATCH_MAX
+
+
+def test_disabled_or_unregistered_groups_stay_quiet(settings, context):
+    settings["welcome_enabled"] = 0
+    _join(context, _member(1))
+    assert context.job_queue.jobs == []
+
+    # Switched off while a batch was waiting
+    settings["welcome_enabled"] = 1
+    _join(context, _member(2))
+    settings["welcome_enabled"] = 0
+    context.job_queue.run_all(context.bot)
+    assert context.bot.sent == []
+
+
+def test_without_job_queue_welcomes_at_once(settings):
+    context = SimpleNamespace(bot=FakeBot(), job_queue=None)
+    _join(context, _member(1, "rahul_99"))
+    assert context.bot.sent == [(GROUP, "👋 Welcome @rahul_99!")]
+
+
+# ============================================================
+# ⚙️ SETTINGS CACHE
+# ============================================================
+
+def test_settings_cache_is_invalidated_on_publish(storage, monkeypatch):
+    monkeypatch.setattr(groups, "SETTINGS_CACHE", groups.TTLCache(ttl=600))
+    monkeypatch.setattr(bus, "_shared", False)
+    monkeypatch.setitem(bus._subscribers, "group_settings", [groups.SETTINGS_CACHE.invalidate])
+
+    assert groups.group_settings(GROUP) == {}
+
+    conn = database.connect()
+    conn.execute("INSERT INTO groups (chat_id, welcome_enabled) VALUES (?, 1)", (GROUP,))
+    conn.commit()
+    conn.close()
+    assert groups.group_settings(GROUP) == {}  # still cached
+
+    bus.publish("group_settings", GROUP)
+    assert groups.group_settings(GROUP)["welcome_enabled"] == 1
@@ -0,0 +1,82 @@
+# tests/test_identity.py
+# identity.py against storage (see conftest.py): users are buffered by
+# write-behind, and lookups see them before the buffer is flushed.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import identity
+import writebehind
+from database import save_users
+from identity import resolve, see, usernames
+
+
+@pytest.fixture
+def registry(storage, monkeypatch):
+    monkeypatch.setattr(writebehind, "BUFFERS", [])
+    monkeypatch.setattr(identity, "PENDING", writebehind.WriteBehind("users", save_users, key=lambda r: r[0]))
+    monkeypatch.setattr(identity, "KNOWN", {})
+    return identity.PENDING
+
+
+def _user(user_id, username, is_bot=False):
+    return SimpleNamespace(id=user_id, username=username, is_bot=is_bot)
+
+
+def test_resolve_reads_pending_rows(registry):
+    see(_user(7, "Rahul_99"))
+    assert len(registry) == 1
+    assert resolve("@rahul_99") == 7  # not flushed yet
+
+    registry.flush()
+    assert len(registry) == 0
+    assert resolve("@Rahul_99") == 7
+    assert resolve("@nobody") is None
+    assert resolve("@") is None
+
+
+def test_pending_rows_win_over_stored_ones(registry):
+    see(_user(7, "rahul_99"))
+    registry.flush()
+
+    # Another user takes the name; the registry has not been written yet
+    see(_user(8, "rahul_99"))
+    assert resolve("rahul_99") == 8
+    registry.flush()
+    assert resolve("rahul_99") == 8
+
+
+def test_rename_keeps_history(registry):
+    see(_user(7, "rahul_99"))
+    registry.flush()
+    see(_user(7, "rahul_new"))
+    registry.flush()
+
+    assert resolve("@rahul_new") == 7
+    assert usernames(7, "Rahul_New") == ["rahul_new", "rahul_99"]
+
+
+def test_unchanged_users_are_not_requeued(registry):
+    see(_user(7, "rahul_99"))
+    registry.flush()
+    see(_user(7, "Rahul_99"))
+    see(_user(9, "helper_bot", is_bot=True))
+    see(None)
+    assert len(registry) == 0
+
+    see(_user(7, "rahul_new"))
+    see(_user(7, "rahul_newer"))
+    assert [r[2] for r in registry.pending()] == ["rahul_newer"]  # coalesced per user
+
+
+def test_track_users_handler_sees_everyone_mentioned(registry):
+    msg = SimpleNamespace(
+        reply_to_message=SimpleNamespace(from_user=_user(8, "replied_to")),
+        new_chat_members=[_user(9, "joined"), _user(10, "joinbot", is_bot=True)],
+    )
+    update = SimpleNamespace(effective_user=_user(7, "sender"), effective_message=msg)
+    asyncio.run(identity.track_users_handler(update, None))
+
+    assert sorted(r[0] for r in registry.pending()) == [7, 8, 9]
@@ -0,0 +1,64 @@
+# tests/test_inbound.py
+# inbound.ChatOrderedProcessor: concurrent across chats, ordered within one.
+
+import asyncio
+from types import SimpleNamespace
+
+from inbound import ChatOrderedProcessor
+
+
+def _update(chat_id):
+    chat = SimpleNamespace(id=chat_id) if chat_id is not None else None
+    return SimpleNamespace(effective_chat=chat)
+
+
+def _run(processor, updates):
+    """Process (chat_id, name, seconds) updates started in order; returns the finish log."""
+    log = []
+
+    async def handler(chat_id, name, seconds):
+        log.append(("start", name))
+        await asyncio.sleep(seconds)
+        log.append(("end", name))
+
+    async def main():
+        await asyncio.gather(*(
+            processor.process_update(_update(chat_id), handler(chat_id, name, seconds))
+            for chat_id, name, seconds in updates
+        ))
+
+    asyncio.run(main())
+    return log
+
+
+def test_one_chat_runs_in_order():
+    log = _run(ChatOrderedProcessor(), [
+        (-100, "add", 0.05), (-100, "close", 0), (-100, "status", 0.01),
+    ])
+    assert log == [
+        ("start", "add"), ("end", "add"),
+        ("start", "close"), ("end", "close"),
+        ("start", "status"), ("end", "status"),
+    ]
+
+
+def test_chats_run_concurrently():
+    log = _run(ChatOrderedProcessor(), [(-100, "slow", 0.05), (-101, "fast", 0)])
+    assert log.index(("end", "fast")) < log.index(("end", "slow"))
+
+
+def test_concurrency_limit():
+    processor = ChatOrderedProcessor(max_concurrent_updates=2)
+    log = _run(processor, [(-100 - i, i, 0.01) for i in range(6)])
+
+    running = peak = 0
+    for event, _ in log:
+        running += 1 if event == "start" else -1
+        peak = max(peak, running)
+    assert peak == 2
+    assert processor._chats == {}
+
+
+def test_updates_without_chat_are_not_ordered():
+    log = _run(ChatOrderedProcessor(), [(None, "inline1", 0.05), (None, "inline2", 0)])
+    assert log.index(("end", "inline2")) < log.index(("end", "inline1"))
@@ -0,0 +1,235 @@
+# tests/test_moderation.py
+# handlers/moderation.py driven with fake Telegram objects (no network);
+# warn escalation also runs against storage (see conftest.py).
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest
+from telegram.ext import ApplicationHandlerStop
+
+import database
+from handlers import moderation
+
+GROUP = -100
+
+
+class FakeStatus:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_text(self, text, parse_mode=None):
+        self.edits.append((text, parse_mode))
+
+
+class FakeMessage:
+    def __init__(self):
+        self.status = FakeStatus()
+        self.documents = []
+
+    async def reply_text(self, text, **kwargs):
+        return self.status
+
+    async def reply_document(self, document, filename):
+        self.documents.append((filename, document))
+
+
+class FakeBot:
+    id = 1
+
+    def __init__(self, failing):
+        self.failing = failing
+
+    async def ban_chat_member(self, chat_id, user_id):
+        if user_id in self.failing:
+            raise BadRequest("User_not_participant")
+
+    async def unban_chat_member(self, chat_id, user_id):
+        pass
+
+
+def _bulk(monkeypatch, args, failing=()):
+    """Run /bulkkick with `args`; returns the fake message it replied to."""
+    users = {"@under_score_1": 11, "@under_score_2": 12, "@bad_guy": 13}
+    monkeypatch.setattr(moderation, "resolve", lambda arg: users.get(arg))
+    monkeypatch.setattr(moderation, "BULK_PROGRESS_EVERY", 0.01)
+
+    async def is_admin(update, context):
+        return True
+    monkeypatch.setattr(moderation, "ensure_bot_admin", is_admin)
+
+    message = FakeMessage()
+    update = SimpleNamespace(
+        message=message,
+        effective_chat=SimpleNamespace(id=GROUP, type="supergroup"),
+        effective_user=SimpleNamespace(id=99),
+    )
+    context = SimpleNamespace(bot=FakeBot(set(failing)), args=args, job_queue=None)
+    asyncio.run(moderation._bulk_handler(update, context, "kick"))
+    return message
+
+
+# ============================================================
+# 🚨 BULK SUMMARY
+# ============================================================
+
+def test_bulk_summary_escapes_usernames_and_errors(monkeypatch):
+    message = _bulk(
+        monkeypatch,
+        ["@under_score_1", "@under_score_2", "@bad_guy", "@no_such_user", "42"],
+        failing={13},
+    )
+    text, parse_mode = message.status.edits[-1]
+    assert parse_mode == "Markdown"
+    assert "• Done: `3`  • Failed: `1`" in text
+
+    body = text.split("\n\n", 1)[1]
+    assert body.splitlines() == [
+        "❌ @bad\\_guy — User\\_not\\_participant",
+        "✅ @under\\_score\\_1",
+        "✅ @under\\_score\\_2",
+        "✅ 42",
+        "❔ @no\\_such\\_user — unknown user",
+    ]
+    assert message.documents == []
+
+
+def test_bulk_report_attachment_is_raw(monkeypatch):
+    monkeypatch.setattr(moderation, "BULK_MAX_TEXT", 0)
+    message = _bulk(monkeypatch, ["@under_score_1", "@bad_guy"], failing={13})
+
+    text, _ = message.status.edits[-1]
+    assert text.endswith("📎 Full per-user report attached.")
+    [(filename, document)] = message.documents
+    assert filename == "bulk_kick_report.txt"
+    assert document.decode().splitlines() == [
+        "❌ @bad_guy — User_not_participant",
+        "✅ @under_score_1",
+    ]
+
+
+@pytest.mark.parametrize("args", [[], ["@no_such_user"]])
+def test_bulk_without_targets_shows_usage(monkeypatch, args):
+    message = _bulk(monkeypatch, args)
+    assert message.status.edits == []
+
+
+# ============================================================
+# 📏 WARN ESCALATION
+# ============================================================
+
+@pytest.fixture
+def warn(storage, monkeypatch):
+    """warn(user_id) runs /warn; returns the list of rules applied so far."""
+    applied = []
+
+    async def is_admin(update, context):
+        return True
+
+    async def escalate(context, group_id, user_id, label, action, duration):
+        applied.append((user_id, action))
+        return action
+
+    async def reply_text(text, **kwargs):
+        pass
+
+    monkeypatch.setattr(moderation, "ensure_bot_admin", is_admin)
+    monkeypatch.setattr(moderation, "escalate", escalate)
+    monkeypatch.setattr(moderation, "RULES_CACHE", {})
+
+    def run(user_id):
+        monkeypatch.setattr(moderation, "resolve_target", lambda u, c: (user_id, f"`{user_id}`", []))
+        update = SimpleNamespace(message=SimpleNamespace(reply_text=reply_text),
+                                 effective_chat=SimpleNamespace(id=GROUP))
+        asyncio.run(moderation.warn_handler(update, SimpleNamespace(job_queue=None)))
+        return applied
+    return run
+
+
+def _rule(warns, action):
+    database.set_warn_rule(GROUP, warns, action, None)
+    moderation.RULES_CACHE.clear()
+
+
+def test_each_rule_fires_once(warn):
+    _rule(3, "mute")
+    _rule(5, "ban")
+    for _ in range(7):
+        applied = warn(7)
+    assert applied == [(7, "mute"), (7, "ban")]
+
+
+def test_rule_added_above_the_threshold_still_fires(warn):
+    for _ in range(4):
+        warn(7)
+    _rule(3, "mute")
+    assert warn(7) == [(7, "mute")]
+    assert warn(7) == [(7, "mute")]
+
+
+def test_lower_rule_does_not_fire_after_a_higher_one(warn):
+    _rule(2, "ban")
+    warn(7)
+    warn(7)
+    _rule(1, "mute")
+    assert warn(7) == [(7, "ban")]
+
+
+def test_dropping_below_a_threshold_rearms_it(warn):
+    _rule(2, "mute")
+    warn(7)
+    warn(7)
+    database.remove_warn(GROUP, 7)
+    assert warn(7) == [(7, "mute"), (7, "mute")]
+
+    # Warns of other users are counted separately
+    assert warn(8) == [(7, "mute"), (7, "mute")]
+    assert warn(8)[-1] == (8, "mute")
+
+
+# ============================================================
+# 🚫 BAN GATE
+# ============================================================
+
+def _gate(chat_id, user_id):
+    """True if ban_gate_handler stopped the update."""
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id) if chat_id else None,
+                             effective_user=SimpleNamespace(id=user_id))
+    try:
+        asyncio.run(moderation.ban_gate_handler(update, None))
+    except ApplicationHandlerStop:
+        return True
+    return False
+
+
+def test_ban_gate_is_per_group(monkeypatch):
+    monkeypatch.setattr(moderation, "BANNED", {(GROUP, 7)})
+    assert _gate(GROUP, 7)
+    assert not _gate(GROUP - 1, 7)
+    assert not _gate(GROUP, 8)
+    assert not _gate(None, 7)  # inline queries have no chat
+
+
+def test_ban_gate_loads_and_lifts_bans(storage, monkeypatch):
+    monkeypatch.setattr(moderation, "BANNED", set())
+    database.add_ban(GROUP, 7, "spam", 99, "2026-10-19T10:00:00")
+    database.add_ban(GROUP - 1, 8, "spam", 99, "2026-10-19T10:00:00")
+    moderation.load_bans()
+    assert _gate(GROUP, 7) and _gate(GROUP - 1, 8)
+
+    # A timed ban running out lifts both the row and the gate
+    class Bot:
+        async def unban_chat_member(self, chat_id, user_id, only_if_banned=False):
+            pass
+
+    action_id = database.add_scheduled_action("unban", GROUP, 7, 0.0)
+    job = SimpleNamespace(data={"id": action_id, "action": "unban", "group_id": GROUP,
+                                "user_id": 7, "ref": None})
+    asyncio.run(moderation.run_scheduled_action(SimpleNamespace(bot=Bot(), job=job)))
+
+    assert not _gate(GROUP, 7)
+    assert _gate(GROUP - 1, 8)
+    moderation.load_bans()
+    assert moderation.BANNED == {(GROUP - 1, 8)}
+    assert database.get_scheduled_actions() == []
@@ -0,0 +1,196 @@
+# tests/test_outbound.py
+# outbound.py token buckets and OutboundLimiter on a fake clock: sleeping
+# advances the clock instead of waiting, so nothing here is slow.
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import NetworkError, RetryAfter
+
+import outbound
+from outbound import (
+    GROUP_BURST,
+    GROUP_RATE,
+    MAX_RETRIES,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    OutboundLimiter,
+    TokenBucket,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        self.slept += seconds
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbound, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(outbound, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+# ============================================================
+# 🪣 TOKEN BUCKET
+# ============================================================
+
+def test_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    async def take(n):
+        for _ in range(n):
+            await bucket.acquire(PRIORITY_NORMAL)
+
+    asyncio.run(take(3))
+    assert clock.slept == 0
+
+    asyncio.run(take(4))
+    assert clock.slept == pytest.approx(2.0)  # 4 more tokens at 2/s
+
+
+def test_bucket_refill_is_capped(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    bucket.tokens = 0
+    clock.now += 60
+    assert bucket.delay(clock.now) == 0
+    assert bucket.tokens == 2
+    assert bucket.idle(clock.now)
+
+
+def test_bucket_pause(clock):
+    bucket = TokenBucket(rate=10, burst=10)
+    bucket.pause(5)
+    assert bucket.delay(clock.now) == pytest.approx(5)
+    assert not bucket.idle(clock.now)
+    clock.now += 5
+    assert bucket.delay(clock.now) == 0
+
+
+def test_higher_lanes_go_first(clock):
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.tokens = 0
+    order = []
+
+    async def send(priority, name):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    async def main():
+        # The low call queues first, but yields once the high one waits too
+        low = asyncio.create_task(send(PRIORITY_LOW, "low"))
+        high = asyncio.create_task(send(PRIORITY_HIGH, "high"))
+        await asyncio.gather(low, high)
+
+    asyncio.run(main())
+    assert order == ["high", "low"]
+
+
+# ============================================================
+# 📤 OUTBOUND LIMITER
+# ============================================================
+
+def _request(limiter, callback, endpoint="sendMessage", chat_id=-100, rate_limit_args=None):
+    return asyncio.run(limiter.process_request(
+        callback, (), {}, endpoint, {"chat_id": chat_id}, rate_limit_args
+    ))
+
+
+def test_retry_after_is_retried(clock):
+    limiter = OutboundLimiter()
+    calls = []
+
+    async def callback():
+        calls.append(clock.now)
+        if len(calls) < 3:
+            raise RetryAfter(7)
+        return "ok"
+
+    assert _request(limiter, callback) == "ok"
+    assert len(calls) == 3
+    # Each retry waited out the pause on the chat's bucket
+    assert calls[1] - calls[0] >= 7
+    assert calls[2] - calls[1] >= 7
+
+    metrics = limiter.metrics.snapshot()
+    assert (metrics["sent"], metrics["retried"], metrics["failed"]) == (1, 2, 0)
+    assert metrics["by_endpoint"] == {"sendMessage": 1}
+
+
+def test_retry_after_gives_up(clock):
+    limiter = OutboundLimiter()
+    calls = []
+
+    async def callback():
+        calls.append(clock.now)
+        raise RetryAfter(1)
+
+    with pytest.raises(RetryAfter):
+        _request(limiter, callback)
+    assert len(calls) == MAX_RETRIES + 1
+    assert limiter.metrics.failed == 1
+
+
+def test_other_errors_are_not_retried(clock):
+    limiter = OutboundLimiter()
+    calls = []
+
+    async def callback():
+        calls.append(1)
+        raise NetworkError("boom")
+
+    with pytest.raises(NetworkError):
+        _request(limiter, callback)
+    assert calls == [1]
+    assert limiter.metrics.failed == 1
+
+
+def test_group_bucket_limits_messages_not_admin_actions(clock):
+    limiter = OutboundLimiter()
+
+    async def callback():
+        return True
+
+    for _ in range(GROUP_BURST + 1):
+        _request(limiter, callback)
+    assert clock.slept == pytest.approx(1 / GROUP_RATE, rel=0.1)
+
+    slept = clock.slept
+    for _ in range(GROUP_BURST + 1):
+        _request(limiter, callback, endpoint="restrictChatMember")
+    assert clock.slept == slept  # global bucket only
+
+
+def test_unthrottled_never_waits(clock):
+    limiter = OutboundLimiter(throttled=False)
+
+    async def callback():
+        return True
+
+    for _ in range(100):
+        _request(limiter, callback)
+    assert clock.slept == 0
+    assert limiter.metrics.sent == 100
+
+
+@pytest.mark.parametrize("endpoint, args, lane", [
+    ("answerCallbackQuery", {"priority": PRIORITY_LOW}, PRIORITY_HIGH),
+    ("sendMessage", {"priority": PRIORITY_LOW}, PRIORITY_LOW),
+    ("sendMessage", {"priority": 99}, PRIORITY_LOW),
+    ("sendDocument", None, PRIORITY_LOW),
+    ("sendMessage", None, PRIORITY_NORMAL),
+])
+def test_priority_lanes(endpoint, args, lane):
+    assert OutboundLimiter._priority(endpoint, args) == lane
@@ -0,0 +1,90 @@
+# tests/test_pagination.py
+# pagination.py buttons and the list rows that render user text.
+
+import asyncio
+from types import SimpleNamespace
+
+import pagination
+from pagination import MAX_CALLBACK_BYTES, pagination_callback_handler
+from handlers.user import FIND_PAGES, MY_DEALS_PAGES
+
+
+def _rows():
+    return [
+        {"_key": 9, "trade_id": "TID100009", "buyer_username": "@rahul_99",
+         "seller_username": "@seller_bhai", "amount": 1500.0, "status": "on_hold"},
+        {"_key": 4, "trade_id": "TID100004", "buyer_username": None,
+         "seller_username": "@a*b", "amount": 10.0, "status": "active"},
+    ]
+
+
+def _buttons(markup):
+    return [b.callback_data for row in markup.inline_keyboard for b in row]
+
+
+# ============================================================
+# 🔘 CALLBACK DATA
+# ============================================================
+
+def test_short_args_ride_in_the_button():
+    _, markup = FIND_PAGES.render(_rows(), True, True, 2, "@rahul_99")
+    assert _buttons(markup) == ["pg:find:p:9:1:@rahul_99", "pg:find:n:4:3:@rahul_99"]
+
+
+def test_long_args_are_replaced_by_a_digest():
+    arg = "@" + "x" * 80
+    _, markup = FIND_PAGES.render(_rows(), False, True, 1, arg)
+    [data] = _buttons(markup)
+    assert len(data.encode()) <= MAX_CALLBACK_BYTES
+    assert data.rsplit(":", 1)[1].startswith(pagination.LONG_ARG_PREFIX)
+
+    # Same arg, same digest, so re-renders keep working
+    _, again = FIND_PAGES.render(_rows(), False, True, 1, arg)
+    assert _buttons(again) == [data]
+
+
+def _click(data, monkeypatch):
+    """Press a button; returns (fetched args, answers)."""
+    fetched, answers = [], []
+
+    def fetch(arg, user, cursor, backwards):
+        fetched.append(arg)
+        return [], False, False
+    monkeypatch.setattr(FIND_PAGES, "fetch", fetch)
+
+    async def answer(text=None, **kwargs):
+        answers.append(text)
+
+    query = SimpleNamespace(data=data, answer=answer, message=None, from_user=SimpleNamespace(id=7))
+    asyncio.run(pagination_callback_handler(SimpleNamespace(callback_query=query), None))
+    return fetched, answers
+
+
+def test_digest_resolves_on_click(monkeypatch):
+    arg = "@" + "y" * 80
+    _, markup = FIND_PAGES.render(_rows(), False, True, 1, arg)
+    fetched, answers = _click(_buttons(markup)[0], monkeypatch)
+    assert fetched == [arg]
+    assert answers == [None]
+
+
+def test_forgotten_digest_expires(monkeypatch):
+    monkeypatch.setattr(pagination, "_long_args", pagination.TTLCache(ttl=60))
+    fetched, answers = _click("pg:find:n:4:2:~0123456789abcdef", monkeypatch)
+    assert fetched == []
+    assert answers == ["❗ This list has expired."]
+
+
+# ============================================================
+# 🧾 ROWS
+# ============================================================
+
+def test_rows_escape_usernames_and_status():
+    text, _ = MY_DEALS_PAGES.render(_rows(), False, False, 1, None)
+    assert "@rahul\\_99 → @seller\\_bhai" in text
+    assert "*on\\_hold*" in text
+    assert " → @a\\*b" in text
+
+    text, _ = FIND_PAGES.render(_rows(), False, False, 1, "@rahul_99")
+    assert text.startswith("🔍 *Active Deals for @rahul\\_99*")
+    assert "@rahul_99 " not in text
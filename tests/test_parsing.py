@@ -0,0 +1,221 @@
+# tests/test_parsing.py
+# Fuzz tests for parsing.py: random and mutated DEAL INFO forms, durations
+# and usernames. Every case is seeded, so a failure always reproduces.
+
+import random
+import re
+
+import pytest
+
+from parsing import (
+    OPTIONAL_FIELDS,
+    SAMPLE_FORMS,
+    format_duration,
+    normalize_username,
+    parse_amount,
+    parse_deal_form,
+    parse_duration,
+)
+
+CASES = 3000
+
+# Characters that tend to break regex-based parsers
+NOISE = ":-@#*•_\n\t \r\u00a0\u200b0123456789kKmM.,aZ€₹😀" + "".join(OPTIONAL_FIELDS)
+
+
+def legacy_parse_deal_form(text):
+    """The parser parsing.py replaced: three independent searches."""
+    buyer = re.search(r"buyer\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
+    seller = re.search(r"seller\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
+    amount = re.search(r"(amount|deal amount)\s*[:\-]\s*([^\n]+)", text, re.IGNORECASE)
+    return {
+        "buyer": buyer.group(1) if buyer else None,
+        "seller": seller.group(1) if seller else None,
+        "amount": parse_amount(amount.group(2).strip()) if amount else None,
+    }
+
+
+# ============================================================
+# 🎲 GENERATORS
+# ============================================================
+
+def _username(rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCXYZ0123456789_"
+    return "@" + "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 20)))
+
+
+def _amount(rng):
+    """(text, value) with value None when the text is not an amount."""
+    return rng.choice([
+        ("1500", 1500.0),
+        ("2.5k", 2500.0),
+        ("1,20,000", 120000.0),
+        ("1m", 1_000_000.0),
+        ("10K", 10000.0),
+        ("99.99", 99.99),
+        (" 750 ", 750.0),
+        ("ten", None),
+        ("", None),
+    ])
+
+
+def _key(rng, key):
+    return rng.choice([key, key.upper(), key.title()])
+
+
+def _separator(rng):
+    return rng.choice([":", " : ", "-", " - ", ": ", "  :  ", "\t:\t"])
+
+
+def random_form(rng):
+    """(text, expected) for a DEAL INFO message in one of many layouts."""
+    amount_text, amount = _amount(rng)
+    fields = {
+        "buyer": (_username(rng),) * 2,
+        "seller": (_username(rng),) * 2,
+        "amount": (amount_text, amount),
+        "deal": rng.choice([("Instagram account",) * 2, ("BGMI id",) * 2, ("", None)]),
+        "time": rng.choice([("2 days",) * 2, ("1h",) * 2]),
+        "payment": rng.choice([("UPI",) * 2, ("USDT",) * 2]),
+    }
+    expected = {key: None for key in fields}
+
+    lines = list(fields)
+    rng.shuffle(lines)
+    out = [rng.choice(["DEAL INFO :", "", "hello admin, please escrow this"])]
+    for key in lines:
+        if rng.random() < 0.1:
+            continue
+        text, value = fields[key]
+        label = "Deal Amount" if key == "amount" and rng.random() < 0.5 else key
+        bullet = rng.choice(["", "• ", "- ", "* ", "  "])
+        out.append(f"{bullet}{_key(rng, label)}{_separator(rng)}{text}")
+        expected[key] = value
+    return "\n".join(out), expected
+
+
+def mutate(rng, text):
+    """Insert, delete, duplicate or swap characters and lines at random."""
+    chars = list(text)
+    for _ in range(rng.randint(1, 8)):
+        op = rng.randrange(4)
+        pos = rng.randint(0, len(chars))
+        if op == 0:
+            chars.insert(pos, rng.choice(NOISE))
+        elif op == 1 and chars:
+            del chars[min(pos, len(chars) - 1)]
+        elif op == 2 and chars:
+            chars[pos:pos] = chars[max(0, pos - 10):pos]
+        else:
+            lines = "".join(chars).split("\n")
+            rng.shuffle(lines)
+            chars = list("\n".join(lines))
+    return "".join(chars)
+
+
+# ============================================================
+# 📝 DEAL INFO FORMS
+# ============================================================
+
+def test_valid_forms_round_trip():
+    rng = random.Random(30)
+    for _ in range(CASES):
+        text, expected = random_form(rng)
+        assert parse_deal_form(text) == expected, text
+
+
+def test_matches_legacy_parser():
+    """_FIELD_RE finds the same buyer, seller and amount as the old searches."""
+    rng = random.Random(31)
+    forms = [random_form(rng)[0] for _ in range(CASES)] + SAMPLE_FORMS
+    for text in forms:
+        form = parse_deal_form(text)
+        assert {k: form[k] for k in ("buyer", "seller", "amount")} == legacy_parse_deal_form(text), text
+
+
+def test_value_on_next_line():
+    form = parse_deal_form("Buyer :\n@rahul_99\nSeller:\n\n@seller_bhai\nAmount -\n2k\nDeal :\nTime : 1h")
+    assert form["buyer"] == "@rahul_99"
+    assert form["seller"] == "@seller_bhai"
+    assert form["amount"] == 2000.0
+    assert form["deal"] is None
+    assert form["time"] == "1h"
+
+
+def test_empty_field_does_not_swallow_next_line():
+    form = parse_deal_form("Deal :\nBuyer : @a\nPayment -\nSeller - @b\nDeal Amount: 5k")
+    assert (form["buyer"], form["seller"], form["amount"]) == ("@a", "@b", 5000.0)
+    assert form["deal"] is None and form["payment"] is None
+
+
+def test_mutated_forms_never_raise():
+    rng = random.Random(32)
+    for _ in range(CASES):
+        text = mutate(rng, random_form(rng)[0])
+        form = parse_deal_form(text)
+        assert set(form) == {"buyer", "seller", "amount", *OPTIONAL_FIELDS}
+        for key in ("buyer", "seller"):
+            assert form[key] is None or re.fullmatch(r"@\w+", form[key]), (text, form)
+        assert form["amount"] is None or form["amount"] >= 0, (text, form)
+
+
+def test_random_text_never_raises():
+    rng = random.Random(33)
+    for _ in range(CASES):
+        text = "".join(rng.choice(NOISE) for _ in range(rng.randint(0, 200)))
+        parse_deal_form(text)
+
+
+@pytest.mark.parametrize("text", [None, "", "\n", ":", "buyer", "buyer:", "amount:" * 1000])
+def test_degenerate_forms(text):
+    form = parse_deal_form(text)
+    assert form["buyer"] is None and form["amount"] is None
+
+
+# ============================================================
+# ⏳ DURATIONS
+# ============================================================
+
+def test_durations_round_trip():
+    rng = random.Random(34)
+    for _ in range(CASES):
+        seconds = rng.randint(1, 10**7)
+        assert parse_duration(format_duration(seconds)) == seconds
+
+
+@pytest.mark.parametrize("text, seconds", [
+    ("30", 1800), ("30m", 1800), ("45s", 45), ("24h", 86400), ("7d", 604800),
+    ("2w", 1209600), (" 1H ", 3600), ("10 m", 600),
+])
+def test_duration_units(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+def test_random_durations_never_raise():
+    rng = random.Random(35)
+    alphabet = "0123456789smhdwSMHDW -+.:xy\t\n٣"
+    for _ in range(CASES):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        result = parse_duration(text)
+        assert result is None or (isinstance(result, int) and result >= 0), text
+
+
+# ============================================================
+# 👤 USERNAMES
+# ============================================================
+
+def test_usernames_normalize():
+    assert normalize_username("@Rahul_99") == "rahul_99"
+    assert normalize_username(" rahul_99 ") == "rahul_99"
+    assert normalize_username("@") is None
+    assert normalize_username("") is None
+    assert normalize_username(None) is None
+
+
+def test_random_usernames_never_raise_and_are_stable():
+    rng = random.Random(36)
+    for _ in range(CASES):
+        text = "".join(rng.choice(NOISE) for _ in range(rng.randint(0, 40)))
+        key = normalize_username(text)
+        assert key is None or (key == key.lower() and not key.startswith("@") and key.strip() == key)
+        assert normalize_username(key) == key
@@ -0,0 +1,273 @@
+# tests/test_protection.py
+# handlers/protection.py: the anti-flood sliding window, the admin
+# lookalike index and the filter stage around them, driven with fake
+# Telegram objects (no network).
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.ext import ApplicationHandlerStop
+
+from handlers import protection
+from handlers.protection import (
+    DUP_LIMIT,
+    DUP_WINDOW,
+    FLOOD_LIMIT,
+    FLOOD_WINDOW,
+    _content_key,
+    check_message,
+)
+
+GROUP = -100
+
+
+@pytest.fixture(autouse=True)
+def clean_history(monkeypatch):
+    monkeypatch.setattr(protection, "_history", {})
+    monkeypatch.setattr(protection, "_seen", 0)
+
+
+# ============================================================
+# 🪟 SLIDING WINDOW
+# ============================================================
+
+def test_burst_threshold():
+    now = 1000.0
+    for i in range(FLOOD_LIMIT):
+        assert check_message(GROUP, 1, i, now + i * 0.1) is None
+    assert check_message(GROUP, 1, "one more", now + FLOOD_LIMIT * 0.1) == "flood"
+
+
+def test_burst_window_slides():
+    now = 1000.0
+    for i in range(FLOOD_LIMIT):
+        check_message(GROUP, 1, i, now)
+    # The first burst has left the window
+    assert check_message(GROUP, 1, "later", now + FLOOD_WINDOW + 0.1) is None
+
+
+def test_duplicate_content():
+    now = 1000.0
+    step = FLOOD_WINDOW  # slow enough never to count as a flood
+    for i in range(DUP_LIMIT - 1):
+        assert check_message(GROUP, 1, "same", now + i * step) is None
+    assert check_message(GROUP, 1, "same", now + (DUP_LIMIT - 1) * step) == "duplicate"
+
+
+def test_duplicates_expire():
+    now = 1000.0
+    for i in range(DUP_LIMIT - 1):
+        check_message(GROUP, 1, "same", now + i)
+    assert check_message(GROUP, 1, "same", now + DUP_WINDOW + DUP_LIMIT) is None
+
+
+def test_content_key():
+    sticker = SimpleNamespace(file_unique_id="AgADx")
+    assert _content_key(FakeMessage("hi")) == _content_key(FakeMessage("hi"))
+    assert _content_key(FakeMessage("hi")) != _content_key(FakeMessage("hi!"))
+    assert _content_key(FakeMessage(None, caption="hi")) == _content_key(FakeMessage("hi"))
+    assert _content_key(FakeMessage(None, sticker=sticker)) is not None
+    assert _content_key(FakeMessage(None)) is None
+
+
+def test_messages_without_content_are_never_duplicates():
+    # Service messages without text, caption or sticker have no content key
+    now = 1000.0
+    for i in range(DUP_LIMIT + 1):
+        assert check_message(GROUP, 1, None, now + i * FLOOD_WINDOW) is None
+
+
+def test_users_and_chats_are_separate():
+    now = 1000.0
+    for i in range(FLOOD_LIMIT):
+        check_message(GROUP, 1, i, now)
+    assert check_message(GROUP, 2, "x", now) is None
+    assert check_message(GROUP - 1, 1, "x", now) is None
+    assert check_message(GROUP, 1, "x", now) == "flood"
+
+
+# ============================================================
+# 🛡 FILTER STAGE
+# ============================================================
+
+class FakeBot:
+    def __init__(self):
+        self.calls = []
+
+    async def restrict_chat_member(self, chat_id, user_id, permissions, until_date=None):
+        self.calls.append(("restrict", chat_id, user_id, until_date))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send", chat_id, text))
+
+
+class FakeMessage:
+    def __init__(self, text, caption=None, sticker=None):
+        self.text = text
+        self.caption = caption
+        self.sticker = sticker
+        self.deleted = False
+
+    async def delete(self):
+        self.deleted = True
+
+
+def _update(user_id, text):
+    user = SimpleNamespace(id=user_id, is_bot=False, username=f"user_{user_id}",
+                           full_name=f"User {user_id}", first_name="User")
+    return SimpleNamespace(message=FakeMessage(text), effective_user=user,
+                           effective_chat=SimpleNamespace(id=GROUP))
+
+
+def _flood(bot, user_id, count):
+    """Send `count` messages; returns how many the filter stopped."""
+    context = SimpleNamespace(bot=bot, job_queue=None)
+    stopped = 0
+    for i in range(count):
+        try:
+            asyncio.run(protection.flood_filter_handler(_update(user_id, f"msg {i}"), context))
+        except ApplicationHandlerStop:
+            stopped += 1
+    return stopped
+
+
+@pytest.fixture
+def registered_groups(monkeypatch):
+    monkeypatch.setattr(protection, "group_settings", lambda chat_id: {"chat_id": chat_id})
+
+
+@pytest.fixture
+def registered(registered_groups, monkeypatch):
+    monkeypatch.setattr(protection, "impersonated_admin", lambda user, chat_id: None)
+
+
+def test_flooder_is_muted_once_until_date(registered, monkeypatch):
+    monkeypatch.setattr(protection, "is_tenant_admin", lambda user_id, chat_id: False)
+    bot = FakeBot()
+    assert _flood(bot, 7, FLOOD_LIMIT + 1) == 1
+
+    restricts = [c for c in bot.calls if c[0] == "restrict"]
+    assert len(restricts) == 1
+    # Telegram lifts the mute itself; nothing is scheduled (job_queue=None)
+    assert restricts[0][3] is not None
+
+
+def test_group_admins_are_exempt(registered, monkeypatch):
+    monkeypatch.setattr(protection, "is_tenant_admin", lambda user_id, chat_id: user_id == 7)
+    bot = FakeBot()
+    assert _flood(bot, 7, FLOOD_LIMIT * 2) == 0
+    assert bot.calls == []
+
+
+def test_unregistered_groups_are_ignored(monkeypatch):
+    monkeypatch.setattr(protection, "group_settings", lambda chat_id: {})
+    monkeypatch.setattr(protection, "is_tenant_admin", lambda user_id, chat_id: False)
+    bot = FakeBot()
+    assert _flood(bot, 7, FLOOD_LIMIT * 2) == 0
+    assert bot.calls == []
+
+
+# ============================================================
+# 🎭 ADMIN IMPERSONATION
+# ============================================================
+
+ADMINS = [
+    {"user_id": 1, "username": "escrow_rahul", "name": "Rahul Sharma"},
+    {"user_id": 2, "username": "bob", "name": None},
+]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Escrow_Rahul", "escrowrahul"),
+    ("еscrоw_rаhul", "escrowrahul"),    # Cyrillic е, о, а
+    ("3scr0w_rahul", "escrowrahul"),    # leetspeak
+    ("escrow__rahhul", "escrowrahul"),  # doubled letters
+    ("ｅｓｃｒｏｗ", "escrow"),          # fullwidth
+    ("rnod", "mod"),
+    ("", ""),
+    (None, ""),
+])
+def test_skeleton(name, expected):
+    assert protection.skeleton(name) == expected
+
+
+@pytest.mark.parametrize("username, full_name, expected", [
+    ("escrow_rahul", None, ("@escrow_rahul", True)),
+    ("еscrow_rаhul", None, ("@escrow_rahul", True)),   # homoglyphs
+    ("escrow_rahu1_", None, ("@escrow_rahul", True)),  # 1 → l
+    ("escrow_rahux", None, ("@escrow_rahul", True)),   # one substitution
+    ("escrowrahu", None, ("@escrow_rahul", True)),     # one deletion
+    ("escrow_raaahul", None, ("@escrow_rahul", True)),
+    ("bob", None, ("@bob", True)),
+    ("bo6", None, None),                               # short names match exactly only
+    ("someone", "Rahul Sharma", ("@escrow_rahul", False)),
+    ("someone", "R4hul Sh4rma", ("@escrow_rahul", False)),
+    ("someone", "Escrow Rahul", ("@escrow_rahul", False)),
+    ("someone", "Alice", None),
+    ("escrow_support", None, None),
+    (None, None, None),
+])
+def test_admin_name_index(username, full_name, expected):
+    assert protection.AdminNameIndex(ADMINS).match(username, full_name) == expected
+
+
+def _member(user_id, username, full_name="Someone"):
+    return SimpleNamespace(id=user_id, is_bot=False, username=username,
+                           full_name=full_name, first_name=full_name)
+
+
+@pytest.fixture
+def admin_index(monkeypatch):
+    monkeypatch.setattr(protection, "ADMIN_INDEX", protection.AdminNameIndex(ADMINS))
+    monkeypatch.setattr(protection, "_verdicts", protection.TTLCache(ttl=60))
+    monkeypatch.setattr(protection, "_alerted", protection.TTLCache(ttl=60))
+    monkeypatch.setattr(protection, "is_tenant_admin", lambda user_id, chat_id: user_id == 1)
+
+
+def test_impersonated_admin_exempts_and_caches(admin_index):
+    # The admin themselves, even under a lookalike name
+    assert protection.impersonated_admin(_member(1, "escrow_rahul"), GROUP) is None
+
+    member = _member(7, "escr0w_rahul")
+    assert protection.impersonated_admin(member, GROUP) == ("@escrow_rahul", True)
+    assert protection._verdicts.get(7)[2] == ("@escrow_rahul", True)
+
+    # A rename is re-checked rather than served from the cache
+    member.username = "honest_trader"
+    assert protection.impersonated_admin(member, GROUP) is None
+
+
+def test_lookalike_username_is_muted_once(admin_index, registered_groups):
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot, job_queue=None)
+    user = _member(7, "escr0w_rahul")
+
+    for _ in range(2):
+        update = SimpleNamespace(message=FakeMessage("pay me"), effective_user=user,
+                                 effective_chat=SimpleNamespace(id=GROUP))
+        with pytest.raises(ApplicationHandlerStop):
+            asyncio.run(protection.flood_filter_handler(update, context))
+        assert update.message.deleted
+
+    assert [c[0] for c in bot.calls] == ["restrict", "send"]
+    assert "@escrow\\_rahul" in bot.calls[1][2]
+
+
+def test_lookalike_display_name_is_only_logged(admin_index, registered_groups, monkeypatch):
+    logged = []
+
+    async def send_log(context, chat_id, text):
+        logged.append(text)
+
+    monkeypatch.setattr(protection, "send_log", send_log)
+    monkeypatch.setattr(protection, "tenant", lambda chat_id: {"logs": -500})
+
+    bot = FakeBot()
+    update = SimpleNamespace(message=FakeMessage("hi"), effective_user=_member(7, "x_y_z", "Rahul Sharma"),
+                             effective_chat=SimpleNamespace(id=GROUP))
+    asyncio.run(protection.flood_filter_handler(update, SimpleNamespace(bot=bot, job_queue=None)))
+
+    assert bot.calls == [] and not update.message.deleted
+    [text] = logged
+    assert "Possible admin lookalike" in text and "x\\_y\\_z" in text
@@ -0,0 +1,81 @@
+# tests/test_shards.py
+# shards.py routing and the deal catalog, against storage (see conftest.py).
+# SQLite runs with two shards; server backends always use one.
+
+import os
+
+import pytest
+
+import database
+import shards
+from conftest import add_deal
+from tenancy import GLOBAL_TENANT
+
+
+@pytest.mark.parametrize("shard_count", [1, 2, 5])
+def test_shard_for(monkeypatch, shard_count):
+    monkeypatch.setattr(shards, "SHARD_COUNT", shard_count)
+    chats = [-1001234567890 - i for i in range(50)]
+    for chat_id in chats:
+        assert 0 <= shards.shard_for(chat_id) < shard_count
+        assert shards.shard_for(chat_id) == shards.shard_for(chat_id)
+        assert shards.tenant_shards(chat_id) == [shards.shard_for(chat_id)]
+    assert {shards.shard_for(c) for c in chats} == set(range(shard_count))
+
+    # Private-chat deals belong to the global tenant, which reads every shard
+    assert shards.shard_for(None) == shards.shard_for(GLOBAL_TENANT) == 0
+    assert list(shards.tenant_shards(GLOBAL_TENANT)) == list(range(shard_count))
+
+
+def test_catalog_round_trip(storage):
+    deals = {}
+    for n, chat_id in enumerate([-100, -101, -102, -103, GLOBAL_TENANT]):
+        trade_id = f"TID10000{n}"
+        deals[trade_id] = add_deal(trade_id, chat_id, amount=100.0 * (n + 1))
+
+    for trade_id, (deal_id, shard) in deals.items():
+        assert shards.locate_deal(trade_id) == shard
+        conn = shards.connect_deal(trade_id)
+        cur = conn.cursor()
+        cur.execute("SELECT id, trade_id FROM deals WHERE trade_id=?", (trade_id,))
+        assert tuple(cur.fetchone()) == (deal_id, trade_id)
+        conn.close()
+
+    assert shards.locate_deal("TID999999") is None
+    rows = shards.fan_out("SELECT id FROM deals")
+    assert sorted(r["id"] for r in rows) == sorted(d for d, _ in deals.values())
+
+
+def test_groups_write_to_their_own_file(storage):
+    if shards.SHARD_COUNT < 2:
+        pytest.skip("server backends run with a single shard")
+
+    odd = next(c for c in range(-100, -110, -1) if shards.shard_for(c) == 1)
+    add_deal("TID100001", odd)
+    assert os.path.exists(shards.SHARD_PATH.format(1))
+
+    conn = database.connect()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) AS n FROM deals")
+    assert cur.fetchone()["n"] == 0  # not in the main file
+    conn.close()
+    assert [r["trade_id"] for r in shards.fan_out("SELECT trade_id FROM deals", shards=[1])] == ["TID100001"]
+
+
+def test_legacy_deals_are_cataloged(storage):
+    """Deals written before the catalog existed are found in the main file."""
+    conn = database.connect()
+    conn.execute("DELETE FROM deal_catalog")
+    conn.execute(
+        "INSERT INTO deals (id, trade_id, amount, status, created_at, chat_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (41, "TID000041", 10.0, "active", "2026-01-01T00:00:00", -101)
+    )
+    conn.commit()
+    conn.close()
+
+    shards.init_shards()
+    assert shards.locate_deal("TID000041") == 0
+
+    # New ids continue after the legacy ones
+    deal_id, _ = shards.register_deal("TID100001", -100)
+    assert deal_id > 41
@@ -0,0 +1,94 @@
+# tests/test_tenancy.py
+# tenancy.py against storage (see conftest.py): tenant resolution, admin
+# rosters, per-tenant settings and deal scoping.
+
+from types import SimpleNamespace
+
+import pytest
+
+import bus
+import database
+import tenancy
+from conftest import add_deal
+from handlers.admin import _earnings
+from tenancy import GLOBAL_TENANT, can_manage, is_tenant_admin, scope, tenant, tenant_id
+
+GROUP = -100
+OTHER = -101
+
+
+@pytest.fixture
+def tenants(storage, monkeypatch):
+    """A global admin (1), an admin of GROUP (2) and nobody (3)."""
+    monkeypatch.setattr(tenancy, "_tenants", tenancy.TTLCache(ttl=300))
+    monkeypatch.setattr(bus, "_shared", False)
+    monkeypatch.setitem(bus._subscribers, "tenant", [tenancy._tenants.invalidate])
+
+    database.add_admin(1, username="global_admin")
+    database.add_group_admin(GROUP, 2)
+    return storage
+
+
+@pytest.mark.parametrize("chat, expected", [
+    (SimpleNamespace(id=GROUP, type="supergroup"), GROUP),
+    (SimpleNamespace(id=GROUP, type="group"), GROUP),
+    (SimpleNamespace(id=7, type="private"), GLOBAL_TENANT),
+    (SimpleNamespace(id=-1007, type="channel"), GLOBAL_TENANT),
+    (None, GLOBAL_TENANT),
+])
+def test_tenant_id(chat, expected):
+    assert tenant_id(chat) == expected
+
+
+def test_is_tenant_admin(tenants):
+    # Global admins manage every group
+    assert is_tenant_admin(1) and is_tenant_admin(1, GROUP) and is_tenant_admin(1, OTHER)
+    # Group admins only their own group, never the global tenant
+    assert is_tenant_admin(2, GROUP)
+    assert not is_tenant_admin(2, OTHER)
+    assert not is_tenant_admin(2)
+    assert not is_tenant_admin(3, GROUP)
+
+
+def test_roster_changes_need_invalidation(tenants):
+    assert not is_tenant_admin(3, GROUP)
+    database.add_group_admin(GROUP, 3)
+    assert not is_tenant_admin(3, GROUP)  # cached
+
+    tenancy.invalidate_tenant(GROUP)
+    assert is_tenant_admin(3, GROUP)
+
+
+def test_group_settings_fall_back_to_global(tenants):
+    database.set_fee(3, 10)
+    database.set_fee(2, 4, GROUP)
+    tenancy.invalidate_tenant()
+
+    assert tenant(GROUP)["fee"] == (2, 4)
+    assert tenant(OTHER)["fee"] == (3, 10)
+    assert tenant(GLOBAL_TENANT)["admins"] == frozenset({1})
+    assert tenant(GROUP)["admins"] == frozenset({2})
+
+
+def test_scope(tenants):
+    assert scope(GLOBAL_TENANT) == ("1=1", ())
+    assert scope(GROUP) == ("chat_id=?", (GROUP,))
+    assert scope(GROUP, column="d.chat_id") == ("d.chat_id=?", (GROUP,))
+
+    add_deal("TID100001", GROUP, amount=100.0)
+    add_deal("TID100002", OTHER, amount=200.0)
+    add_deal("TID100003", GLOBAL_TENANT, amount=400.0)
+
+    # 5% admin earning each, all created by 1001 (see add_deal)
+    assert _earnings(GROUP) == {1001: 5.0}
+    assert _earnings(OTHER) == {1001: 10.0}
+    assert _earnings(GLOBAL_TENANT) == {1001: 35.0}
+    assert _earnings(GROUP, admin_id=42) == {}
+
+
+def test_can_manage(tenants):
+    deal = {"chat_id": GROUP}
+    assert can_manage(deal, 2, GROUP)
+    assert can_manage(deal, 3, GLOBAL_TENANT)  # private chats are gated by is_tenant_admin
+    assert not can_manage(deal, 2, OTHER)
+    assert can_manage(deal, 1, OTHER)
@@ -0,0 +1,124 @@
+# tests/test_writebehind.py
+# writebehind.py buffers: when they flush and what survives a failed write.
+
+import asyncio
+
+import pytest
+
+import writebehind
+from writebehind import WriteBehind, flush_all, flush_job, flush_on_shutdown
+
+
+class Store:
+    """write() for a buffer; fails while `broken` is set."""
+
+    def __init__(self):
+        self.batches = []
+        self.broken = False
+
+    def __call__(self, rows):
+        if self.broken:
+            raise RuntimeError("database is locked")
+        self.batches.append(rows)
+
+
+@pytest.fixture(autouse=True)
+def buffers(monkeypatch):
+    monkeypatch.setattr(writebehind, "BUFFERS", [])
+
+
+def test_flush_on_row_limit():
+    store = Store()
+    buffer = WriteBehind("t", store, max_rows=3)
+    buffer.add(1)
+    buffer.add(2)
+    assert store.batches == []
+    buffer.add(3)
+    assert store.batches == [[1, 2, 3]]
+    assert (len(buffer), buffer.written) == (0, 3)
+
+
+def test_rows_keep_order_or_coalesce_by_key():
+    store = Store()
+    plain = WriteBehind("plain", store)
+    for row in ("a", "b", "a"):
+        plain.add(row)
+    keyed = WriteBehind("keyed", store, key=lambda row: row[0])
+    for row in ((7, "old"), (8, "x"), (7, "new")):
+        keyed.add(row)
+
+    assert plain.pending() == ["a", "b", "a"]
+    assert keyed.pending() == [(8, "x"), (7, "new")]
+
+
+def test_interval_job_and_shutdown_flush_every_buffer():
+    store = Store()
+    first, second = WriteBehind("first", store), WriteBehind("second", store)
+
+    class JobQueue:
+        def run_repeating(self, callback, interval, name=None):
+            self.job = (callback, interval, name)
+
+    jq = JobQueue()
+    writebehind.start(jq, interval_ms=250)
+    assert jq.job == (flush_job, 0.25, "write_behind")
+
+    first.add(1)
+    second.add(2)
+    asyncio.run(flush_job(None))
+    assert store.batches == [[1], [2]]
+
+    first.add(3)
+    asyncio.run(flush_on_shutdown(None))
+    assert store.batches == [[1], [2], [3]]
+    assert len(first) == len(second) == 0
+
+
+def test_failed_write_keeps_rows():
+    store = Store()
+    buffer = WriteBehind("t", store, key=lambda row: row[0])
+    buffer.add((7, "old"))
+    buffer.add((8, "x"))
+
+    store.broken = True
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.failures == 1
+
+    # Newer rows queued after the failure win their key
+    buffer.add((7, "new"))
+    store.broken = False
+    assert buffer.flush() == 2
+    assert store.batches == [[(8, "x"), (7, "new")]]
+
+
+def test_row_limit_flush_failure_does_not_raise():
+    store = Store()
+    store.broken = True
+    buffer = WriteBehind("t", store, max_rows=2)
+    buffer.add(1)
+    buffer.add(2)  # flush fails inside add(); the caller is not affected
+    assert buffer.pending() == [1, 2]
+
+
+def test_overflow_drops_oldest(monkeypatch):
+    monkeypatch.setattr(writebehind, "WRITE_BEHIND_MAX_PENDING", 3)
+    store = Store()
+    store.broken = True
+    buffer = WriteBehind("t", store)
+    for row in range(5):
+        buffer.add(row)
+
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.pending() == [2, 3, 4]
+
+
+def test_one_failing_buffer_does_not_block_others():
+    good, bad = Store(), Store()
+    bad.broken = True
+    WriteBehind("bad", bad).add(1)
+    WriteBehind("good", good).add(2)
+
+    assert flush_all() == 1
+    assert good.batches == [[2]]
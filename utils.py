@@ -1,16 +1,21 @@
 # utils.py — Full Utility Module for Era Escrow Bot
 # Works with ALL your handlers. Zero missing functions.
 
-import re
 import random
 from datetime import datetime, timezone, timedelta
 from io import BytesIO
 
+from telegram.error import TelegramError
+
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 
+from tenancy import is_tenant_admin, tenant_id
+from outbound import PRIORITY_NORMAL
+from parsing import parse_amount, parse_deal_form  # re-exported for handlers
+
 
 # ============================================================
 # 🕒 IST Time & Formatting
@@ -50,74 +55,57 @@ def format_username(user):
 # ━━━━━━━━━ Divider
 # ============================================================
 
-def divider():
-    return "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
+DIVIDER = "━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 
 
-# ============================================================
-# 🧹 Reply + Delete Command
-# ============================================================
-
-async def reply_and_clean(message, text, parse_mode="Markdown"):
-    """Reply to a message and delete the user's command."""
-    try:
-        target = message.reply_to_message or message
-        await target.reply_text(text, parse_mode=parse_mode)
-        await message.delete()
-    except:
-        await message.reply_text(text, parse_mode=parse_mode)
+def divider():
+    return DIVIDER
 
 
 # ============================================================
-# 🔢 Amount Parser (10k, 1m, 5.5k, etc.)
+# 🔐 Bot Admin Guard
 # ============================================================
 
-def parse_amount(s: str):
-    """Convert human amount like 10k → 10000"""
-    if not s:
-        return None
-
-    s = s.replace(",", "").strip()
-    m = re.match(r"(\d+(?:\.\d+)?)([kKmM]?)", s)
-    if not m:
-        return None
-
-    num = float(m.group(1))
-    suffix = m.group(2).lower()
+async def ensure_bot_admin(update, context):
+    """Return True for admins of this chat's tenant, otherwise refuse."""
+    if is_tenant_admin(update.effective_user.id, tenant_id(update.effective_chat)):
+        return True
 
-    if suffix == "k":
-        num *= 1000
-    elif suffix == "m":
-        num *= 1_000_000
-
-    return num
+    await update.effective_message.reply_text("⛔ *Admin only command!*", parse_mode="Markdown")
+    return False
 
 
 # ============================================================
-# 📝 Deal Info Parser (Buyer/Seller/Amount)
+# 📤 Prioritised Reply (goes through outbound.OutboundLimiter)
 # ============================================================
 
-def parse_deal_form(text: str):
-    """Extract buyer, seller, and amount from message text."""
-    buyer = seller = None
-    amount = None
+async def send_reply(message, text, parse_mode="Markdown", priority=PRIORITY_NORMAL, **kwargs):
+    """Reply to `message` in its chat using the given outbound lane."""
+    return await message.get_bot().send_message(
+        chat_id=message.chat_id,
+        text=text,
+        parse_mode=parse_mode,
+        reply_to_message_id=message.message_id,
+        allow_sending_without_reply=True,
+        rate_limit_args={"priority": priority},
+        **kwargs
+    )
 
-    # Buyer
-    b = re.search(r"buyer\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
-    if b:
-        buyer = b.group(1)
 
-    # Seller
-    s = re.search(r"seller\s*[:\-]\s*(@\w+)", text, re.IGNORECASE)
-    if s:
-        seller = s.group(1)
+# ============================================================
+# 🧹 Reply + Delete Command
+# ============================================================
 
-    # Amount
-    a = re.search(r"(amount|deal amount)\s*[:\-]\s*([^\n]+)", text, re.IGNORECASE)
-    if a:
-        amount = parse_amount(a.group(2).strip())
+async def reply_and_clean(message, text, parse_mode="Markdown", priority=PRIORITY_NORMAL):
+    """Reply to a message and delete the user's command."""
+    target = message.reply_to_message or message
+    await send_reply(target, text, parse_mode=parse_mode, priority=priority)
 
-    return {"buyer": buyer, "seller": seller, "amount": amount}
+    # Deleting needs admin rights; the reply above is already delivered
+    try:
+        await message.delete()
+    except TelegramError:
+        pass
 
 
 # ============================================================
@@ -192,6 +180,35 @@ def build_pdf(rows, title="Deal History"):
     return pdf
 
 
+def build_summary_pdf(rows, title):
+    """PDF table of per-day totals (dicts with day/total/volume/completed/active/cancelled)."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(f"<b>{title}</b>", styles["Title"]), Spacer(1, 12)]
+
+    table_data = [["Date", "Deals", "Volume", "Completed", "Active", "Cancelled"]]
+    for r in rows:
+        table_data.append([
+            r["day"], r["total"], f"₹{float(r['volume']):.2f}", r["completed"], r["active"], r["cancelled"],
+        ])
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ]))
+    story += [table, Spacer(1, 10), Paragraph("<i>Generated by Era Escrow Bot</i>", styles["Italic"])]
+
+    doc.build(story)
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
+
+
 # ============================================================
 # ❓ Unknown Command Handler
 # ============================================================
@@ -0,0 +1,120 @@
+# writebehind.py
+# Write-behind buffers for high-rate passive writes
+# Some writes happen for almost every incoming update (users seen by
+# identity.py, counters, ...). Doing each one synchronously would mean a
+# SQLite transaction and fsync per message, so they are queued in memory
+# instead and written in one transaction per buffer:
+#   • every WRITE_BEHIND_FLUSH_MS, by flush_job (see start()),
+#   • as soon as a buffer holds WRITE_BEHIND_MAX_ROWS rows,
+#   • on shutdown, by flush_on_shutdown (Application.post_shutdown).
+#
+# Guarantees:
+#   • Rows added before a clean shutdown (polling/webhook stop, SIGTERM,
+#     cluster worker exit) are written.
+#   • A crash or SIGKILL loses at most the rows of the last
+#     WRITE_BEHIND_FLUSH_MS (or WRITE_BEHIND_MAX_ROWS rows per buffer), so
+#     only data that is re-derived from later updates belongs here — never
+#     deals, bans or anything a command reports back as saved.
+#   • A failed write keeps its rows queued for the next flush; past
+#     WRITE_BEHIND_MAX_PENDING rows the oldest are dropped with a warning.
+#   • Rows with the same key (if the buffer has one) are coalesced, last
+#     one wins; otherwise rows are written in the order they were added.
+#   • Buffers live in one process: other cluster workers see the rows once
+#     they are flushed.
+
+import logging
+
+from config import WRITE_BEHIND_FLUSH_MS, WRITE_BEHIND_MAX_ROWS, WRITE_BEHIND_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+BUFFERS = []
+
+
+class WriteBehind:
+    """
+    Rows for `write(rows)`, which must store them in a single transaction.
+    With `key`, rows are coalesced by key(row).
+    """
+
+    def __init__(self, name, write, key=None, max_rows=WRITE_BEHIND_MAX_ROWS):
+        self.name = name
+        self.write = write
+        self.key = key
+        self.max_rows = max_rows
+        self._rows = {}
+        self._seq = 0
+        self.written = 0
+        self.failures = 0
+        BUFFERS.append(self)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row):
+        if self.key is not None:
+            key = self.key(row)
+            self._rows.pop(key, None)
+        else:
+            self._seq += 1
+            key = self._seq
+        self._rows[key] = row
+
+        if len(self._rows) >= self.max_rows:
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write-behind %s: flush failed, rows kept", self.name)
+
+    def pending(self):
+        """Rows not yet written, oldest first."""
+        return list(self._rows.values())
+
+    def flush(self):
+        """Write everything queued; returns the number of rows written."""
+        if not self._rows:
+            return 0
+
+        batch, self._rows = self._rows, {}
+        try:
+            self.write(list(batch.values()))
+        except Exception:
+            self.failures += 1
+            # Back in front of anything queued meanwhile (newer rows win a key)
+            batch.update(self._rows)
+            self._rows = batch
+            overflow = len(self._rows) - WRITE_BEHIND_MAX_PENDING
+            if overflow > 0:
+                for k in list(self._rows)[:overflow]:
+                    del self._rows[k]
+                logger.warning("Write-behind %s: dropped %s rows", self.name, overflow)
+            raise
+
+        self.written += len(batch)
+        return len(batch)
+
+
+def flush_all():
+    """Flush every buffer; one failing buffer does not stop the others."""
+    total = 0
+    for buffer in BUFFERS:
+        try:
+            total += buffer.flush()
+        except Exception:
+            logger.exception("Write-behind %s: flush failed, rows kept", buffer.name)
+    return total
+
+
+async def flush_job(context):
+    flush_all()
+
+
+async def flush_on_shutdown(app):
+    written = flush_all()
+    if written:
+        logger.info("💾 Wrote %s buffered rows on shutdown", written)
+
+
+def start(job_queue, interval_ms=WRITE_BEHIND_FLUSH_MS):
+    """Flush all buffers every `interval_ms` on `job_queue`."""
+    job_queue.run_repeating(flush_job, interval_ms / 1000, name="write_behind")